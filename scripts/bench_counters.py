@@ -0,0 +1,82 @@
+# scripts/bench_counters.py
+"""
+Stress multi-proceso de los contadores SSCC.
+
+Lanza N procesos que reservan secuencias (sueltas y en bloque) contra el mismo
+estado y comprueba que no hay duplicados. Informa de asignaciones/seg por backend.
+
+Uso:
+    python scripts/bench_counters.py --procs 8 --ops 300 --block 5
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+from collections import Counter
+from multiprocessing import get_context
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from src.core.counters import reserve_block  # noqa: E402
+
+
+def _worker(args: tuple[str, str, int, int]) -> tuple[list[int], int]:
+    backend, path, ops, block = args
+    seqs: list[int] = []
+    errors = 0
+    for i in range(ops):
+        n = block if i % 2 else 1
+        try:
+            seqs.extend(reserve_block("UE", n, path, backend))
+        except Exception:
+            errors += 1
+    return seqs, errors
+
+
+def run(backend: str, procs: int, ops: int, block: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "counters.json")
+        reserve_block("UE", 0, path, backend)
+        ctx = get_context("spawn")
+        t0 = time.perf_counter()
+        with ctx.Pool(procs) as pool:
+            results = pool.map(_worker, [(backend, path, ops, block)] * procs)
+        elapsed = time.perf_counter() - t0
+
+    seqs = [s for r, _ in results for s in r]
+    errors = sum(e for _, e in results)
+    dups = sum(c - 1 for c in Counter(seqs).values() if c > 1)
+    return {
+        "backend": backend,
+        "allocations": len(seqs),
+        "reserve_calls": procs * ops - errors,
+        "errors": errors,
+        "duplicates": dups,
+        "gap_free": not dups and sorted(seqs) == list(range(1, len(seqs) + 1)),
+        "seconds": round(elapsed, 3),
+        "alloc_per_s": round(len(seqs) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Stress multi-proceso de contadores SSCC")
+    p.add_argument("--procs", type=int, default=8)
+    p.add_argument("--ops", type=int, default=300, help="reservas por proceso")
+    p.add_argument("--block", type=int, default=5, help="tamaño de bloque en reservas alternas")
+    p.add_argument("--backend", choices=["json", "sqlite", "both"], default="both")
+    args = p.parse_args()
+
+    backends = ["json", "sqlite"] if args.backend == "both" else [args.backend]
+    for b in backends:
+        r = run(b, args.procs, args.ops, args.block)
+        print(
+            f"{r['backend']:>6}: {r['allocations']} SSCC en {r['seconds']}s "
+            f"({r['alloc_per_s']}/s) · duplicados={r['duplicates']} · errores={r['errors']} · sin huecos={r['gap_free']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
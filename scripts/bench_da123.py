@@ -0,0 +1,127 @@
+# scripts/bench_da123.py
+"""
+Benchmark de montaje + CSV del DA-123: implementación anterior (DataFrame de 123
+listas de "", mask por columna y to_csv) frente a TemplateSchema.assemble +
+write_da_csv (columnar, constantes como escalares, CSV por bloques).
+
+PO sintético replicando data/input/pos/PO_AirSupply.csv hasta N líneas. Sin SSCC
+(no toca los contadores). Cada caso corre en un proceso aparte: una pasada cronometrada
+y otra bajo tracemalloc para el pico de memoria del montaje + escritura (el PO de
+389 columnas ya fija el pico de RSS, que no serviría). Se comprueba que ambos CSV son
+idénticos byte a byte.
+
+Uso:
+    python scripts/bench_da123.py --rows 10000 100000
+"""
+from __future__ import annotations
+import argparse
+import filecmp
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+PO_CSV = BASE / "data/input/pos/PO_AirSupply.csv"
+TEMPLATE = BASE / "data/templates/DA_123_template.csv"
+TODAY = datetime(2025, 10, 1)
+
+
+def make_po(rows: int):
+    import numpy as np
+    import pandas as pd
+    base = pd.read_csv(PO_CSV, sep=";", dtype=str, na_filter=False)
+    df = base.iloc[np.arange(rows) % len(base)].reset_index(drop=True)
+    if "PO Line" in df.columns:
+        df["PO Line"] = (np.arange(rows) + 1).astype(str).astype(object)
+    return df
+
+
+def legacy_da123(df_po, schema):
+    """Montaje anterior (streamlit_app antes del motor columnar), sin SSCC."""
+    import pandas as pd
+    from src.core.da_template import _norm
+    template_cols = schema.columns
+
+    def pick(candidates, default_val):
+        for c in candidates:
+            if c in df_po.columns:
+                return df_po[c].astype(str).fillna("")
+            for col in df_po.columns:
+                if _norm(col) == _norm(c):
+                    return df_po[col].astype(str).fillna("")
+        return pd.Series([default_val if default_val is not None else ""] * len(df_po))
+
+    target = pd.DataFrame({col: [""] * len(df_po) for col in template_cols})
+    commons = [c for c in template_cols if c in df_po.columns]
+    if commons:
+        target[commons] = df_po[commons].astype(str).fillna("")
+    for dest, val in schema.constants.items():
+        target[dest] = val
+    auto = {
+        "AUTO_DESPATCH": (TODAY + timedelta(days=1)).strftime("%Y-%m-%d"),
+        "AUTO_ETA": (TODAY + timedelta(days=2)).strftime("%Y-%m-%d"),
+    }
+    for dest, candidates, default_val in schema.plan:
+        series = pick(candidates, auto.get(default_val, default_val))
+        target[dest] = target[dest].mask(target[dest].eq(""), series.astype(str))
+    return target
+
+
+def _child(args: tuple[str, int, str], q) -> None:
+    mode, rows, out = args
+    from src.core.da_template import compile_template
+    from src.io.writers_da import write_da_csv
+    schema = compile_template(TEMPLATE)
+    df_po = make_po(rows)
+
+    def run() -> None:
+        if mode == "anterior":
+            legacy_da123(df_po, schema).to_csv(out, index=False, sep=";", encoding="utf-8-sig")
+        else:
+            write_da_csv(schema.assemble(df_po, today=TODAY), out)
+
+    t0 = time.perf_counter()
+    run()
+    secs = time.perf_counter() - t0
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    q.put((secs, peak))
+
+
+def measure(mode: str, rows: int, out: str) -> tuple[float, float]:
+    ctx = get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=((mode, rows, out), q))
+    p.start()
+    res = q.get()
+    p.join()
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark montaje DA-123")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'líneas':>8} | {'motor':>9} | {'tiempo (s)':>10} | {'pico (MB)':>10}")
+        for n in args.rows:
+            outs = {}
+            for mode in ["anterior", "columnar"]:
+                outs[mode] = str(Path(tmp) / f"{mode}_{n}.csv")
+                secs, peak = measure(mode, n, outs[mode])
+                print(f"{n:>8,} | {mode:>9} | {secs:>10.2f} | {peak:>10.1f}")
+            same = filecmp.cmp(outs["anterior"], outs["columnar"], shallow=False)
+            print(f"{'':>8} | CSV idéntico: {'sí' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# scripts/bench_dates.py
+"""
+Benchmark del parseo de fechas: pd.to_datetime(dayfirst=True) con inferencia de formato
+(lo que hacían warehouse_match y limpiar.py) frente a src.io.dates.parse_dates
+(formatos explícitos por origen, vías rápidas ISO / serial Excel, caché de valores únicos).
+
+Por formato de entrada mide tiempo y comprueba el resultado contra to_datetime con el
+formato exacto; "correcto" = nº de fechas iguales a la referencia.
+
+Uso:
+    python scripts/bench_dates.py --rows 500000 --distinct 200000
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from src.io.dates import parse_dates  # noqa: E402
+
+CASES = [
+    ("dd/mm/aaaa hh:mm:ss", "%d/%m/%Y %H:%M:%S"),
+    ("dd/mm/aaaa", "%d/%m/%Y"),
+    ("dd.mm.aaaa", "%d.%m.%Y"),
+    ("ISO", "%Y-%m-%d %H:%M:%S"),
+    # desfases +01:00 / +02:00 mezclados (cambio de hora): referencia en hora local sin zona
+    ("ISO zona mixta", "%Y-%m-%dT%H:%M:%S%z"),
+]
+
+
+def make_column(n_rows: int, n_distinct: int, fmt: str) -> pd.Series:
+    rng = np.random.default_rng(0)
+    ts = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 300_000_000, n_distinct), unit="s")
+    if fmt.endswith("%z"):
+        offsets = np.where(rng.integers(0, 2, n_distinct) == 0, "+01:00", "+02:00")
+        pool = np.asarray(ts.strftime(fmt[:-2]), dtype=object) + offsets.astype(object)
+    else:
+        pool = np.asarray(ts.strftime(fmt), dtype=object)
+    return pd.Series(pool[rng.integers(0, n_distinct, n_rows)], dtype=object)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark parseo de fechas")
+    p.add_argument("--rows", type=int, default=500_000)
+    p.add_argument("--distinct", type=int, default=200_000)
+    args = p.parse_args()
+    warnings.simplefilter("ignore", UserWarning)  # aviso de dayfirst con texto ISO
+    warnings.simplefilter("ignore", FutureWarning)  # aviso de zonas mixtas sin utc=True
+
+    print(f"{'formato':>20} | {'versión':>12} | {'tiempo (s)':>10} | correcto")
+    for name, fmt in CASES:
+        s = make_column(args.rows, args.distinct, fmt)
+        # con zona: la referencia es la hora local del texto (sin el desfase)
+        ref = pd.to_datetime(s.str[:-6], format=fmt[:-2]) if fmt.endswith("%z") else pd.to_datetime(s, format=fmt)
+        for label, fn in [("inferencia", lambda: pd.to_datetime(s, dayfirst=True, errors="coerce")),
+                          ("parse_dates", lambda: parse_dates(s, "navision"))]:
+            try:
+                out, secs = timed(fn)
+            except (ValueError, TypeError) as e:
+                print(f"{name:>20} | {label:>12} | {'error':>10} | {type(e).__name__}")
+                continue
+            # sin dtype datetime (p. ej. object con zonas mixtas) no cuenta como correcto
+            ok = int((out == ref).sum()) if pd.api.types.is_datetime64_dtype(out) else 0
+            print(f"{name:>20} | {label:>12} | {secs:>10.2f} | {ok:,}/{len(s):,}")
+
+
+if __name__ == "__main__":
+    main()
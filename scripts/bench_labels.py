@@ -0,0 +1,106 @@
+# scripts/bench_labels.py
+"""
+Benchmark del motor de etiquetas GS1-128: etiquetas/segundo por fase
+(modelo desde tablas de packing, codificación Code 128, PDF vectorial, ráster) y pico de
+memoria (tracemalloc) del PDF: crece con las columnas de entrada, no con las páginas.
+
+Ráster: página completa rasterizada por etiqueta ("sin plantilla") frente a fondo cacheado
+por plantilla + campos variables, y PDF ráster con 1 y con --workers procesos.
+
+No reserva SSCC: las tablas UE/UX se generan con make_sscc_many sobre secuencias ficticias.
+
+Uso:
+    python scripts/bench_labels.py --labels 2000 5000 --raster-max 1000 --workers 4
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from src.core.labels import encode_gs1_128, iter_labels  # noqa: E402
+from src.core.sscc import make_sscc_many  # noqa: E402
+from src.io.writers_labels import _draw, _geometry, _idat, label_ops, raster_label, write_labels_pdf  # noqa: E402
+
+
+def make_packing(n_labels: int, boxes_per_pallet: int = 20) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Tablas como plan_packing_frames: ~n_labels etiquetas entre UX y UE, 50 lotes distintos."""
+    n_ux = max(n_labels // (boxes_per_pallet + 1), 1)
+    n_ue = max(n_labels - n_ux, 1)
+    rng = np.random.default_rng(0)
+    ux_sscc = make_sscc_many("154965", np.arange(n_ux), "26").to_numpy()
+    pallet = np.minimum(np.arange(n_ue) // boxes_per_pallet, n_ux - 1)
+    lots = np.array([f"L{2024 + i % 3}-{i:03d}" for i in range(50)], dtype=object)
+    exps = pd.date_range("2026-01-31", periods=50, freq="MS").strftime("%d/%m/%Y").to_numpy()
+    lot_of_pallet = rng.integers(0, 50, n_ux)
+    ue = pd.DataFrame({
+        "item_as": "D5734000900000", "codigo_navision": "NAV-001", "desc_navision": "Tornillo cabeza hexagonal",
+        "qty": 10.0, "lote": lots[lot_of_pallet[pallet]], "exp_date": exps[lot_of_pallet[pallet]],
+        "sscc": make_sscc_many("154965", np.arange(n_ue) + 500_000, "26").to_numpy(), "ux_sscc": ux_sscc[pallet],
+    })
+    ux = pd.DataFrame({"sscc": ux_sscc, "item_as": "D5734000900000", "codigo_navision": "NAV-001",
+                       "desc_navision": "Tornillo cabeza hexagonal", "boxes": np.bincount(pallet, minlength=n_ux)})
+    return ue, ux
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def peak_mb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark etiquetas GS1-128")
+    p.add_argument("--labels", type=int, nargs="+", default=[2_000, 5_000])
+    p.add_argument("--raster-max", type=int, default=1_000, help="Máximo de etiquetas para las fases ráster")
+    p.add_argument("--workers", type=int, default=4, help="Procesos del PDF ráster en paralelo")
+    p.add_argument("--page", default="A6")
+    p.add_argument("--dpi", type=int, default=300)
+    args = p.parse_args()
+
+    print(f"{'etiquetas':>9} | {'fase':>14} | {'tiempo (s)':>10} | {'etiq/s':>9} | {'pico (MB)':>9}")
+    for n in args.labels:
+        ue, ux = make_packing(n)
+        labels, secs = timed(lambda: list(iter_labels(ue, ux)))
+        total = len(labels)
+        print(f"{total:>9,} | {'modelo':>14} | {secs:>10.3f} | {total / secs:>9,.0f} | {'-':>9}")
+        _, secs = timed(lambda: [encode_gs1_128(f) for lab in labels for f in lab.symbols()])
+        print(f"{total:>9,} | {'código':>14} | {secs:>10.3f} | {total / secs:>9,.0f} | {'-':>9}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf = Path(tmp) / "labels.pdf"
+            _, secs = timed(lambda: write_labels_pdf(iter_labels(ue, ux), pdf, args.page, args.dpi))
+            peak = peak_mb(lambda: write_labels_pdf(iter_labels(ue, ux), pdf, args.page, args.dpi))
+            print(f"{total:>9,} | {'pdf':>14} | {secs:>10.3f} | {total / secs:>9,.0f} | {peak:>9.1f}")
+
+            m = min(total, args.raster_max)
+            size = _geometry(args.page, args.dpi)["size"]
+            blank = lambda: np.zeros(size[::-1], dtype=bool)  # noqa: E731
+            _, secs = timed(lambda: [_idat(_draw(blank(), label_ops(lab, args.page, args.dpi))) for lab in labels[:m]])
+            print(f"{m:>9,} | {'sin plantilla':>14} | {secs:>10.3f} | {m / secs:>9,.0f} | {'-':>9}")
+            _, secs = timed(lambda: [_idat(raster_label(lab, args.page, args.dpi)) for lab in labels[:m]])
+            print(f"{m:>9,} | {'plantilla':>14} | {secs:>10.3f} | {m / secs:>9,.0f} | {'-':>9}")
+            for w in sorted({1, args.workers}):
+                run = lambda: write_labels_pdf(labels[:m], pdf, args.page, args.dpi, raster=True, workers=w)  # noqa: E731
+                _, secs = timed(run)
+                peak = peak_mb(run)
+                print(f"{m:>9,} | {f'pdf ráster x{w}':>14} | {secs:>10.3f} | {m / secs:>9,.0f} | {peak:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# scripts/bench_sales_order.py
+"""
+Benchmark de la orden de venta AirSupply → Navision: ruta clásica vs --stream.
+
+Genera un CSV AirSupply sintético con la cabecera real (todas las columnas) y
+ejecuta cada modo en un proceso aparte para medir tiempo y pico de memoria (RSS).
+
+Uso:
+    python scripts/bench_sales_order.py --rows 50000 200000 --out-ext .csv
+"""
+from __future__ import annotations
+import argparse
+import csv
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+PO_TEMPLATE = BASE / "data" / "input" / "pos" / "PO_AirSupply.csv"
+MAP_FILE = BASE / "data" / "mappings" / "referencias_cruzadas_fake.csv"
+CFG_FILE = BASE / "config" / "config.yaml"
+
+
+def make_po(path: Path, rows: int) -> None:
+    with open(PO_TEMPLATE, encoding="utf-8", newline="") as f:
+        header, sample = list(csv.reader(f, delimiter=";"))[:2]
+    items = ["A12345", "B56789", "SIN-MAP"]
+    i_item = header.index("Item Number") if "Item Number" in header else None
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";", quoting=csv.QUOTE_ALL)
+        w.writerow(header)
+        for i in range(rows):
+            row = list(sample)
+            if i_item is not None:
+                row[i_item] = items[i % len(items)]
+            w.writerow(row)
+
+
+def _child(args: tuple[str, str, bool, int], q) -> None:
+    from src.app.main import run
+    po, out, stream, chunksize = args
+    t0 = time.perf_counter()
+    run(po, str(MAP_FILE), out, str(CFG_FILE), stream=stream, chunksize=chunksize)
+    q.put((time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def measure(po: str, out: str, stream: bool, chunksize: int) -> tuple[float, float]:
+    ctx = get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=((po, out, stream, chunksize), q))
+    p.start()
+    res = q.get()
+    p.join()
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark orden de venta (clásico vs --stream)")
+    p.add_argument("--rows", type=int, nargs="+", default=[20_000, 100_000])
+    p.add_argument("--chunksize", type=int, default=50_000)
+    p.add_argument("--out-ext", default=".xlsx", choices=[".xlsx", ".csv"])
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'filas':>9} | {'modo':>8} | {'tiempo (s)':>10} | {'pico RSS (MB)':>13}")
+        for n in args.rows:
+            po = Path(tmp) / f"po_{n}.csv"
+            make_po(po, n)
+            for stream in (False, True):
+                out = str(Path(tmp) / f"out_{n}_{int(stream)}{args.out_ext}")
+                secs, rss = measure(str(po), out, stream, args.chunksize)
+                print(f"{n:>9,} | {'stream' if stream else 'clásico':>8} | {secs:>10.2f} | {rss:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# scripts/bench_warehouse_match.py
+"""
+Benchmark de match_po_to_warehouse con almacenes sintéticos de 1k a 1M filas.
+
+Compara el motor vectorizado (join con el último movimiento por item) con el
+recorrido clásico por línea (filtro + sort del almacén por cada línea del PO).
+
+Uso:
+    python scripts/bench_warehouse_match.py --po-lines 500 --sizes 1000 10000 100000 1000000
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from src.core import warehouse_match as wm  # noqa: E402
+
+
+def make_inputs(n_wh: int, n_po: int, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    items = np.array([f"GEC-{i:06d}" for i in range(max(n_po * 4, n_wh // 20, 100))])
+    wh = pd.DataFrame({
+        "Tipo documento": rng.choice(["Albarán venta", "Compra", "Ajuste"], n_wh),
+        "Nº documento": np.char.add("25-", np.arange(n_wh).astype(str)),
+        "PN GECI": rng.choice(items, n_wh),
+        "Nº lote": np.char.add("LOT", np.arange(n_wh).astype(str)),
+        "Fecha Fabricación": "2025-01-01",
+        "Fecha caducidad": "2028-01-01",
+        "Cantidad": rng.integers(-50, 200, n_wh).astype(str),
+        "Nombre cliente": "Airbus",
+        "Fecha registro": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**7, n_wh), unit="s")).strftime("%d/%m/%Y %H:%M:%S"),
+    })
+    po_items = rng.choice(items, n_po)
+    po = pd.DataFrame({"PO": "4500000001", "Item Number": np.char.add("AS-", po_items), "Requested quantity": "10"})
+    mp = pd.DataFrame({"Codigo_SAP_ItemNumber": np.char.add("AS-", items), "Codigo_Navision": items, "Descripcion": "x"})
+    return po, mp, wh
+
+
+def legacy_lookup(po: pd.DataFrame, mp: pd.DataFrame, wh_df: pd.DataFrame) -> int:
+    """Recorrido por línea equivalente al motor anterior (solo la parte de búsqueda)."""
+    merged = wm._normalize_po(po).merge(wm._normalize_map(mp), on="item_as", how="left")
+    wh = wm._normalize_wh(wh_df)
+    hits_total = 0
+    for _, r in merged.iterrows():
+        hits = wh.loc[wh["item_nav"] == r["item_nav"]].copy()
+        if not hits.empty:
+            hits = hits.sort_values(by=["move_date"], ascending=[False])
+            hits_total += 1
+    return hits_total
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark PO→warehouse matching")
+    p.add_argument("--po-lines", type=int, default=500)
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    p.add_argument("--legacy-max", type=int, default=100_000, help="tamaño máximo para medir el recorrido por línea")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wm.LOG_PATH = Path(tmp) / "da_log.json"
+        # se mide solo el matching: el log de eventos queda fuera del cronómetro
+        wm._log_event = lambda event: None
+        print(f"{'filas almacén':>14} | {'vectorizado (s)':>15} | {'por línea (s)':>13}")
+        for n in args.sizes:
+            po, mp, wh = make_inputs(n, args.po_lines)
+            t0 = time.perf_counter()
+            wm.match_po_to_warehouse(po, mp, wh)
+            t_new = time.perf_counter() - t0
+            t_old = "-"
+            if n <= args.legacy_max:
+                t0 = time.perf_counter()
+                legacy_lookup(po, mp, wh)
+                t_old = f"{time.perf_counter() - t0:.3f}"
+            print(f"{n:>14,} | {t_new:>15.3f} | {t_old:>13}")
+
+
+if __name__ == "__main__":
+    main()
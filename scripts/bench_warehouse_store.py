@@ -0,0 +1,92 @@
+# scripts/bench_warehouse_store.py
+"""
+Benchmark del almacén incremental de movimientos (SQLite) frente a releer el export.
+
+Por tamaño de histórico:
+- export: read_excel/read_csv del fichero de movimientos + match_po_to_warehouse
+- store: match_po_to_warehouse contra WarehouseStore (solo último movimiento de los items del PO)
+- alta inicial y alta incremental (mismo export + 1% de movimientos nuevos)
+Comprueba que el matching da el mismo resultado por las dos vías.
+
+Uso:
+    python scripts/bench_warehouse_store.py --po-lines 500 --sizes 20000 100000 [--no-excel]
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+sys.path.insert(0, str(BASE / "scripts"))
+
+from bench_warehouse_match import make_inputs  # noqa: E402
+from src.core import warehouse_match as wm  # noqa: E402
+from src.io.warehouse_store import WarehouseStore  # noqa: E402
+from src.io.writers import write_xlsx  # noqa: E402
+
+
+def make_export(n_wh: int, n_po: int):
+    """Movimientos como los deja limpiar.py: Nº mov. y fechas tipadas, algún registro sin fecha."""
+    po, mp, wh = make_inputs(n_wh, n_po)
+    wh.insert(0, "Nº mov.", np.arange(1, n_wh + 1))
+    wh["Fecha registro"] = pd.to_datetime(wh["Fecha registro"], dayfirst=True)
+    wh.loc[wh.index % 97 == 0, "Fecha registro"] = pd.NaT
+    for c in ["Fecha Fabricación", "Fecha caducidad"]:
+        wh[c] = pd.to_datetime(wh[c])
+    return po, mp, wh
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark almacén incremental de movimientos")
+    p.add_argument("--po-lines", type=int, default=500)
+    p.add_argument("--sizes", type=int, nargs="+", default=[20_000, 100_000])
+    p.add_argument("--no-excel", action="store_true", help="No medir read_excel (lento con históricos grandes)")
+    args = p.parse_args()
+
+    wm._log_event = lambda event: None  # el log no forma parte de la medida
+    print(f"{'movs':>9} | {'fuente':>18} | {'tiempo (s)':>10} | iguales")
+    for n in args.sizes:
+        po, mp, wh = make_export(n, args.po_lines)
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            csv_path = tmp / "movs.csv"
+            wh.to_csv(csv_path, index=False)
+            ref = None
+            sources = [("csv", lambda: pd.read_csv(csv_path, parse_dates=["Fecha registro", "Fecha Fabricación", "Fecha caducidad"]))]
+            if not args.no_excel:
+                xlsx_path = tmp / "movs.xlsx"
+                write_xlsx(wh, xlsx_path)
+                sources.insert(0, ("xlsx", lambda: pd.read_excel(xlsx_path)))
+            for name, read in sources:
+                res, secs = timed(lambda: wm.match_po_to_warehouse(po, mp, read()))
+                ref = res if ref is None else ref
+                print(f"{n:>9,} | {'export ' + name:>18} | {secs:>10.2f} | {'-' if res is ref else res.equals(ref)}")
+
+            store = WarehouseStore(tmp / "warehouse.sqlite")
+            added, secs = timed(lambda: store.ingest(wh))
+            print(f"{n:>9,} | {'alta inicial':>18} | {secs:>10.2f} | +{added}")
+            extra = wh.tail(max(n // 100, 1)).assign(**{"Nº mov.": np.arange(n + 1, n + 1 + max(n // 100, 1))})
+            added, secs = timed(lambda: store.ingest(pd.concat([wh, extra], ignore_index=True)))
+            print(f"{n:>9,} | {'alta incremental':>18} | {secs:>10.2f} | +{added}")
+
+            # la referencia no incluye los movimientos añadidos: comparar con el mismo histórico
+            store_ref = WarehouseStore(tmp / "ref.sqlite")
+            store_ref.ingest(wh)
+            res, secs = timed(lambda: wm.match_po_to_warehouse(po, mp, store_ref))
+            print(f"{n:>9,} | {'store':>18} | {secs:>10.2f} | {res.equals(ref)}")
+
+
+if __name__ == "__main__":
+    main()
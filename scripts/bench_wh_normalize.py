@@ -0,0 +1,75 @@
+# scripts/bench_wh_normalize.py
+"""
+Benchmark de la normalización del almacén en warehouse_match: versión anterior
+(.copy() del almacén, astype(str).str.strip() por columna y dos str.contains)
+frente al registro de alias + filtro de ventas previo + categóricas.
+
+Mide tiempo y pico de memoria (tracemalloc) y comprueba que el resultado es igual.
+
+Uso:
+    python scripts/bench_wh_normalize.py --sizes 100000 500000
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+sys.path.insert(0, str(BASE / "scripts"))
+
+from bench_warehouse_match import make_inputs  # noqa: E402
+from src.core import warehouse_match as wm  # noqa: E402
+
+
+def legacy_normalize_wh(wh_df: pd.DataFrame) -> pd.DataFrame:
+    """_normalize_wh anterior (copia completa + limpieza de texto de todo el almacén)."""
+    wh_df = wh_df.copy()
+    c = {f: wm._first_col(wh_df, cands) for f, cands in wm.WH_ALIASES.items()}
+    out = pd.DataFrame({
+        "doc_type": wh_df[c["doc_type"]].astype(str).str.strip(),
+        "albaran": wh_df[c["albaran"]].astype(str).str.strip(),
+        "item_nav": wh_df[c["item_nav"]].astype(str).str.strip(),
+        "lot": wh_df[c["lot"]].astype(str).str.strip(),
+        "mfg_date": wh_df[c["mfg_date"]],
+        "exp_date": wh_df[c["exp_date"]],
+        "qty_wh": pd.to_numeric(wh_df[c["qty_wh"]], errors="coerce"),
+        "customer": wh_df[c["customer"]].astype(str).str.strip(),
+        "move_date": pd.to_datetime(wh_df[c["move_date"]], dayfirst=True, errors="coerce"),
+    })
+    mask_sale = out["doc_type"].str.contains("Albarán venta", case=False, na=False) | out["doc_type"].str.contains("Venta", case=False, na=False)
+    return out.loc[mask_sale].reset_index(drop=True)
+
+
+def measure(fn, wh: pd.DataFrame) -> tuple[pd.DataFrame, float, float]:
+    t0 = time.perf_counter()
+    out = fn(wh)
+    secs = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(wh)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return out, secs, peak
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark normalización almacén")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    args = p.parse_args()
+
+    print(f"{'filas':>9} | {'versión':>9} | {'tiempo (s)':>10} | {'pico (MB)':>9} | igual")
+    for n in args.sizes:
+        _, _, wh = make_inputs(n, 10)
+        ref, secs, peak = measure(legacy_normalize_wh, wh)
+        print(f"{n:>9,} | {'anterior':>9} | {secs:>10.2f} | {peak:>9.1f} | -")
+        out, secs, peak = measure(wm._normalize_wh, wh)
+        same = ref.equals(out.drop(columns="entry_no").astype({"doc_type": object, "customer": object}))
+        print(f"{n:>9,} | {'alias':>9} | {secs:>10.2f} | {peak:>9.1f} | {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# scripts/bench_writers.py
+"""
+Benchmark de escritura Excel: pandas.to_excel (openpyxl) vs writers.write_xlsx
+(openpyxl write_only y, si está instalado, xlsxwriter constant_memory).
+
+DataFrame sintético tipo DA-123 (123 columnas de texto + cantidad y fechas).
+Cada caso se ejecuta en un proceso aparte para medir tiempo y pico de RSS.
+
+Uso:
+    python scripts/bench_writers.py --rows 10000 50000
+"""
+from __future__ import annotations
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+
+def make_frame(rows: int, cols: int = 123):
+    import numpy as np
+    import pandas as pd
+    data = {f"COL{i:03d}": np.char.add(f"v{i}-", (np.arange(rows) % 97).astype(str)) for i in range(cols - 3)}
+    data["SHIPPEDQUANTITY"] = (np.arange(rows) % 50 + 1).astype(str)
+    data["MANUFACTUREDATE"] = "2025-10-01"
+    data["EXPIRYDATE"] = "2027-10-01"
+    return pd.DataFrame(data)
+
+
+def _child(args: tuple[str, int, str], q) -> None:
+    mode, rows, out = args
+    df = make_frame(rows)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    t0 = time.perf_counter()
+    if mode == "pandas":
+        df.to_excel(out, index=False, engine="openpyxl")
+    else:
+        from src.io.writers import write_xlsx
+        write_xlsx(df, out, numeric_cols=["SHIPPEDQUANTITY"], date_cols=["MANUFACTUREDATE", "EXPIRYDATE"], engine=mode)
+    secs = time.perf_counter() - t0
+    q.put((secs, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - base_rss))
+
+
+def measure(mode: str, rows: int, out: str) -> tuple[float, float]:
+    ctx = get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=((mode, rows, out), q))
+    p.start()
+    res = q.get()
+    p.join()
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark escritores Excel")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000])
+    args = p.parse_args()
+
+    modes = ["pandas", "openpyxl"]
+    try:
+        import xlsxwriter  # noqa: F401
+        modes.append("xlsxwriter")
+    except ImportError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'filas':>8} | {'escritor':>10} | {'tiempo (s)':>10} | {'Δ RSS (MB)':>10}")
+        for n in args.rows:
+            for mode in modes:
+                secs, rss = measure(mode, n, str(Path(tmp) / f"{mode}_{n}.xlsx"))
+                print(f"{n:>8,} | {mode:>10} | {secs:>10.2f} | {rss:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 # limpiar.py
 from __future__ import annotations
+import sys
 import pandas as pd
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.io.dates import parse_dates, unparsed_summary
+from src.io.warehouse_store import STORE_PATH, WarehouseStore
+
 SRC = Path("Vista - Movs. productos.xlsx")
 SHEET = "Sheet1"
 HEADER_ROW = 2
@@ -10,6 +15,8 @@ OUT_FULL_XLSX = Path("Movimientos_Almacen_Limpio.xlsx")
 OUT_FULL_CSV  = Path("Movimientos_Almacen_Limpio.csv")
 OUT_SALES_XLSX = Path("Movimientos_Ventas_Albaran.xlsx")
 OUT_SALES_CSV  = Path("Movimientos_Ventas_Albaran.csv")
+# histórico incremental por "Nº mov." (warehouse_match lo consulta sin releer el Excel)
+STORE = STORE_PATH
 
 # columnas objetivo (se conservan si existen)
 KEEP_COLS = [
@@ -47,8 +54,18 @@ def main():
                              "Fecha pedido","Fecha ACK","Fecha Compromiso Proveedor",
                              "Fecha Envio Pedido","Fecha seguimiento","Fecha Llegada Material"]
                  if c in df.columns]
+    # formatos explícitos de Navision (día primero); se avisa de lo que no se reconoce
     for c in date_cols:
-        df[c] = pd.to_datetime(df[c], errors="coerce")
+        parsed = parse_dates(df[c], "navision")
+        if parsed.attrs["unparsed"]:
+            print(f"AVISO {c}: {unparsed_summary(parsed)}")
+        df[c] = parsed
+
+    # Alta incremental en el almacén: solo movimientos con "Nº mov." nuevo
+    if "Nº mov." in df.columns:
+        store = WarehouseStore(STORE)
+        added = store.ingest(df)
+        print(f"OK -> {STORE} (+{added} movimientos nuevos, {store.count()} en total)")
 
     # Guardar versión completa
     df.to_excel(OUT_FULL_XLSX, index=False)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import io
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from src.core.da123 import build_da_123, read_po_cached
+from src.core.da_template import DAColumns, compile_template
+from src.core.sscc import SSCCPreview, sscc_preview
+from src.core.transform import apply_mapping, build_navision_frame, select_minimal_columns
+from src.io.cache import cached, read_bytes
+from src.io.jobs import Job, JobContext, JobQueue
+from src.io.readers_mapping import load_mapping
+from src.io.writers import write_xlsx
+from src.io.writers_da import DA_CSV_ENCODING, DA_CSV_SEP, write_da_csv
+
+# trabajos en segundo plano de la app: el PO y el mapping llegan como bytes (el fichero subido
+# no sobrevive a la re-ejecución) y las salidas quedan en data/output/da/<id trabajo>/
+SALES_CSV = "OrdenVenta_Simulada.csv"
+DA_CSV = "DA_full_123.csv"
+
+def read_airsupply_like(file) -> pd.DataFrame:
+    # compartido entre re-ejecuciones: no modificar el DataFrame devuelto
+    return cached("airsupply", file, lambda: pd.read_csv(io.BytesIO(read_bytes(file)), sep=";", quotechar='"',
+                                                          dtype=str).fillna(""))
+
+def read_mapping_like(file) -> pd.DataFrame:
+    # ruta o fichero subido: misma caché compilada que CLI y DA
+    needed = {"Codigo_SAP_ItemNumber", "Codigo_Navision", "Descripcion"}
+    return load_mapping(file).require(needed).df
+
+def sales_order_job(ctx: JobContext, po: bytes, mapping, fixed: dict, salida_cols: list) -> pd.DataFrame:
+    """Orden de venta simulada: PO + mapping -> CSV (artefacto "csv"); devuelve el DataFrame de salida."""
+    ctx.progress(0.05, "Leyendo PO")
+    df_as = read_airsupply_like(po)
+    ctx.progress(0.25, f"PO: {len(df_as)} filas · leyendo mapping")
+    df_map = read_mapping_like(mapping)
+    ctx.progress(0.45, "Aplicando mapping")
+    df_out = build_navision_frame(apply_mapping(select_minimal_columns(df_as), df_map), fixed, salida_cols)
+    ctx.progress(0.8, "Escribiendo CSV")
+    out = ctx.path(SALES_CSV)
+    df_out.to_csv(out, sep=DA_CSV_SEP, index=False, encoding=DA_CSV_ENCODING)
+    ctx.artifact("csv", out)
+    return df_out
+
+def da_preview_job(ctx: JobContext, po: bytes, template_path: str | Path) -> tuple[DAColumns, SSCCPreview]:
+    """DA-123 con SSCC provisionales (no consume secuencias); se confirma con da_confirm_job."""
+    ctx.progress(0.05, "Leyendo PO")
+    df_po = read_po_cached(po)
+    ctx.progress(0.3, f"PO: {len(df_po)} líneas · montando DA 123")
+    with sscc_preview() as preview:
+        da = build_da_123(df_po, template_path)
+    if da.shape[1] <= 1:
+        raise ValueError("La plantilla 123 parece tener 1 columna. Revisa separador y cabecera.")
+    return da, preview
+
+def da_confirm_job(ctx: JobContext, da: DAColumns, preview: SSCCPreview, template_path: str | Path) -> DAColumns:
+    """Reserva los SSCC de la vista previa, los reescribe en el DA y escribe el CSV (artefacto "csv")."""
+    ctx.progress(0.05, "Reservando SSCC")
+    schema = compile_template(template_path)
+    preview.finalize_table(da, {schema.ue_col: "UE", schema.ux_col: "UX"})
+    ctx.progress(0.3, f"Escribiendo CSV ({len(da)} líneas)")
+    out = ctx.path(DA_CSV)
+    write_da_csv(da, out)
+    ctx.artifact("csv", out)
+    return da
+
+def excel_artifact(queue: JobQueue, job: Job, numeric_cols: Iterable[str] = (), date_cols: Iterable[str] = ()) -> Path:
+    """
+    Excel del trabajo, construido solo al pedirlo (y una vez: queda como artefacto "xlsx").
+    Desde el resultado en memoria si sigue ahí; si no, desde el CSV del trabajo.
+    """
+    done = job.artifacts.get("xlsx")
+    if done and Path(done).exists():
+        return Path(done)
+    csv_path = Path(job.artifacts["csv"])
+    df = queue.result(job.id)
+    if isinstance(df, DAColumns):
+        df = df.to_frame()
+    if not isinstance(df, pd.DataFrame):
+        df = pd.read_csv(csv_path, sep=DA_CSV_SEP, encoding=DA_CSV_ENCODING, dtype=str, keep_default_na=False)
+    out = csv_path.with_suffix(".xlsx")
+    write_xlsx(df, out, numeric_cols=numeric_cols, date_cols=date_cols)
+    return queue.add_artifact(job.id, "xlsx", out)
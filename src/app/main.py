@@ -1,16 +1,23 @@
 from __future__ import annotations
 import argparse
-import yaml
+import pandas as pd
 from pathlib import Path
-from src.io.readers import read_airsupply_csv, read_mapping_csv
-from src.io.writers import write_excel
-from src.core.transform import select_minimal_columns, apply_mapping, build_navision_frame
+from src.io.cache import load_yaml
+from src.io.readers import read_airsupply_csv, read_mapping_csv, iter_airsupply_csv
+from src.io.profiling import add_profile_args, profiled, session_from_args
+from src.io.readers_mapping import load_mapping
+from src.io.writers import write_excel, FrameStreamWriter
+from src.core.transform import AS_COLS, select_minimal_columns, apply_mapping, apply_mapping_lookup, build_navision_frame
+
+# columnas de la orden de venta que se escriben como número en Excel
+NUMERIC_COLS = ["Cantidad", "Precio Unitario"]
 
 def load_config(cfg_path: str | Path) -> dict:
-    with open(cfg_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return load_yaml(cfg_path)
 
-def run(input_csv: str, mapping_csv: str, out_path: str, cfg_path: str) -> None:
+@profiled("main.run")
+def run(input_csv: str, mapping_csv: str, out_path: str, cfg_path: str,
+        stream: bool = False, chunksize: int = 50_000) -> None:
     cfg = load_config(cfg_path)
     fixed = {
         "cliente": cfg["cliente"],
@@ -20,22 +27,49 @@ def run(input_csv: str, mapping_csv: str, out_path: str, cfg_path: str) -> None:
     }
     salida_cols = cfg["salida"]["columnas"]
 
+    if stream:
+        rows = run_stream(input_csv, mapping_csv, out_path, fixed, salida_cols, chunksize)
+        print(f"OK -> {out_path} ({rows} filas, modo stream)")
+        return
+
     as_df = read_airsupply_csv(input_csv)
     min_df = select_minimal_columns(as_df)
     map_df = read_mapping_csv(mapping_csv)
     merged = apply_mapping(min_df, map_df)
     out_df = build_navision_frame(merged, fixed, salida_cols)
-    write_excel(out_df, out_path)
+    write_excel(out_df, out_path, numeric_cols=NUMERIC_COLS)
     print(f"OK -> {out_path}")
 
+@profiled("main.run_stream")
+def run_stream(input_csv: str, mapping_csv: str, out_path: str, fixed: dict,
+               salida_cols: list, chunksize: int = 50_000) -> int:
+    """
+    Orden de venta por bloques: solo se parsean las columnas AirSupply usadas,
+    el mapping se resuelve con el dict de la tabla compilada y cada bloque se
+    escribe al fichero de salida antes de leer el siguiente. Devuelve nº de filas.
+    """
+    lookup = load_mapping(mapping_csv).require({"Codigo_SAP_ItemNumber", "Codigo_Navision", "Descripcion"}).lookup
+    wanted = {c for cands in AS_COLS.values() for c in cands}
+    with FrameStreamWriter(out_path, numeric_cols=NUMERIC_COLS) as writer:
+        for chunk in iter_airsupply_csv(input_csv, chunksize=chunksize, usecols=lambda c: c in wanted):
+            merged = apply_mapping_lookup(select_minimal_columns(chunk), lookup)
+            writer.write(build_navision_frame(merged, fixed, salida_cols))
+        if not writer.rows:
+            writer.write(pd.DataFrame(columns=salida_cols))
+    return writer.rows
+
 def parse_args():
     p = argparse.ArgumentParser(description="AirSupply → Navision (Sales Order) demo")
     p.add_argument("--in", dest="input_csv", required=True, help="CSV AirSupply")
     p.add_argument("--map", dest="mapping_csv", required=True, help="CSV referencias SAP→Navision")
     p.add_argument("--out", dest="out_path", required=True, help="Ruta Excel de salida")
     p.add_argument("--cfg", dest="cfg_path", default="config/config.yaml", help="Ruta config.yaml")
+    p.add_argument("--stream", action="store_true", help="Procesar el CSV por bloques (memoria acotada)")
+    p.add_argument("--chunksize", type=int, default=50_000, help="Filas por bloque en modo --stream")
+    add_profile_args(p)
     return p.parse_args()
 
 if __name__ == "__main__":
     args = parse_args()
-    run(args.input_csv, args.mapping_csv, args.out_path, args.cfg_path)
+    with session_from_args(args):
+        run(args.input_csv, args.mapping_csv, args.out_path, args.cfg_path, args.stream, args.chunksize)
@@ -1,9 +1,15 @@
 from __future__ import annotations
 import json
+import os
+import sqlite3
+import threading
 from pathlib import Path
 from typing import Dict, Any
+from ..io.locks import file_lock
+from ..io.profiling import count, profiled
 
 DEFAULT_STATE: Dict[str, Any] = {"arp_id": "", "year_prefix": "26", "UX": 0, "UE": 0}
+BACKENDS = ("json", "sqlite")
 
 def _ensure_state(path: Path) -> Dict[str, Any]:
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -26,11 +32,107 @@ def save_state(state: Dict[str, Any], path: str | Path) -> None:
     tmp = p.with_suffix(p.suffix + ".tmp")
     tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
     tmp.replace(p)
+    count("counters.file_writes")
 
-def next_value(kind: str, path: str | Path) -> int:
+# --------- backend sqlite ---------
+# una conexión por (ruta, proceso) y por hilo: las conexiones sqlite no se comparten tras fork
+# ni entre hilos (sesiones de Streamlit, trabajos en segundo plano); al acabar el hilo se liberan
+_SQLITE_LOCAL = threading.local()
+
+def sqlite_path_for(path: str | Path) -> Path:
+    """Ruta de la BD sqlite asociada a `state_path` (counters.json -> counters.sqlite)."""
+    p = Path(path)
+    return p if p.suffix.lower() in (".sqlite", ".db") else p.with_suffix(".sqlite")
+
+def _sqlite_conn(db_path: Path) -> sqlite3.Connection:
+    conns: Dict[tuple[str, int], sqlite3.Connection] = _SQLITE_LOCAL.__dict__.setdefault("conns", {})
+    key = (str(db_path.resolve()), os.getpid())
+    con = conns.get(key)
+    if con is None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: las transacciones se controlan con BEGIN/COMMIT explícitos
+        con = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("CREATE TABLE IF NOT EXISTS counters (kind TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conns[key] = con
+    return con
+
+def _reserve_sqlite(kind: str, n: int, path: str | Path) -> int:
+    """Incrementa `kind` en n dentro de BEGIN IMMEDIATE; devuelve el valor anterior."""
+    con = _sqlite_conn(sqlite_path_for(path))
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        row = con.execute("SELECT value FROM counters WHERE kind = ?", (kind,)).fetchone()
+        if row is None:
+            # primera vez: continuar la secuencia del JSON si existe
+            p = Path(path)
+            current = int(load_state(p).get(kind, 0)) if p.suffix.lower() == ".json" and p.exists() else 0
+        else:
+            current = int(row[0])
+        con.execute(
+            "INSERT INTO counters (kind, value) VALUES (?, ?) "
+            "ON CONFLICT(kind) DO UPDATE SET value = excluded.value",
+            (kind, current + n),
+        )
+        con.execute("COMMIT")
+        count("counters.sqlite_commits")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return current
+
+def _reserve_json(kind: str, n: int, path: str | Path) -> int:
+    # lectura + escritura bajo bloqueo de fichero: seguro con varios procesos (lotes en paralelo)
+    with file_lock(path):
+        st = load_state(path)
+        current = int(st.get(kind, 0))
+        st[kind] = current + n
+        save_state(st, path)
+    return current
+
+@profiled("counters.reserve_block")
+def reserve_block(kind: str, n: int, path: str | Path, backend: str = "json") -> range:
+    """
+    Reserva n secuencias consecutivas de `kind` en una sola transacción del estado.
+    Devuelve el rango de secuencias reservadas (vacío si n == 0).
+
+    backend="json" reescribe `path` bajo un bloqueo de fichero (<path>.lock);
+    backend="sqlite" usa WAL + BEGIN IMMEDIATE. Ambos son seguros con varios procesos.
+    """
     if kind not in ("UX", "UE"):
         raise ValueError("kind debe ser 'UX' o 'UE'")
-    st = load_state(path)
-    st[kind] = int(st.get(kind, 0)) + 1
-    save_state(st, path)
-    return st[kind]
+    if backend not in BACKENDS:
+        raise ValueError(f"backend de contadores no soportado: {backend}")
+    if n < 0:
+        raise ValueError("n debe ser >= 0")
+    if n == 0:
+        return range(0)
+    current = _reserve_sqlite(kind, n, path) if backend == "sqlite" else _reserve_json(kind, n, path)
+    return range(current + 1, current + n + 1)
+
+def peek_value(kind: str, path: str | Path, backend: str = "json") -> int:
+    """
+    Último valor reservado de `kind` sin reservar nada ni escribir el estado (vistas previas).
+    No crea el JSON si no existe; con sqlite sin fila del tipo cae al valor del JSON, como la primera reserva.
+    """
+    if kind not in ("UX", "UE"):
+        raise ValueError("kind debe ser 'UX' o 'UE'")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend de contadores no soportado: {backend}")
+    p = Path(path)
+    if backend == "sqlite" and sqlite_path_for(p).exists():
+        row = _sqlite_conn(sqlite_path_for(p)).execute("SELECT value FROM counters WHERE kind = ?", (kind,)).fetchone()
+        if row is not None:
+            return int(row[0])
+        if p.suffix.lower() != ".json":
+            return 0
+    if not p.exists():
+        return 0
+    try:
+        return int(json.loads(p.read_text(encoding="utf-8")).get(kind, 0))
+    except json.JSONDecodeError:
+        return 0
+
+def next_value(kind: str, path: str | Path, backend: str = "json") -> int:
+    return reserve_block(kind, 1, path, backend)[0]
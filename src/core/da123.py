@@ -0,0 +1,132 @@
+from __future__ import annotations
+import io
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+import pandas as pd
+
+from ..io.cache import cached, read_bytes
+from ..io.profiling import add_profile_args, count, profiled, session_from_args
+from .da_template import DAColumns, compile_template
+
+TEMPLATE_DEF = Path("data/templates/DA_123_template.csv")
+OUT_DIR_DEF = Path("data/output/da")
+
+# =========================
+# Lectura PO
+# =========================
+def smart_read_csv(path: Path | BinaryIO, preferred_sep: str | None = None, nrows: int | None = None) -> tuple[pd.DataFrame, str]:
+    seps = [preferred_sep] if preferred_sep else []
+    seps += [";", ","]
+    tried = set()
+    for sep in seps:
+        if sep in tried or sep is None:
+            continue
+        tried.add(sep)
+        if hasattr(path, "seek"):
+            path.seek(0)
+        try:
+            df = pd.read_csv(path, sep=sep, dtype=str, na_filter=False, nrows=nrows)
+            # si hay solo 1 columna con separadores visibles, prueba el otro
+            if df.shape[1] == 1:
+                continue
+            return df.fillna(""), sep
+        except Exception:
+            continue
+    # último intento bruto
+    if hasattr(path, "seek"):
+        path.seek(0)
+    df = pd.read_csv(path, sep=None, engine="python", dtype=str, na_filter=False, nrows=nrows).fillna("")
+    return df, (preferred_sep or ";")
+
+@profiled("da123.read_po_any")
+def read_po_any(po_csv_path) -> pd.DataFrame:
+    """PO AirSupply (ruta, bytes o fichero subido) con ; y fallback a , / autodetección."""
+    raw = read_bytes(po_csv_path)
+    try:
+        df_po = pd.read_csv(io.BytesIO(raw), sep=";", dtype=str, na_filter=False).fillna("")
+        if df_po.shape[1] == 1:
+            df_po = pd.read_csv(io.BytesIO(raw), sep=",", dtype=str, na_filter=False).fillna("")
+    except Exception:
+        df_po, _ = smart_read_csv(io.BytesIO(raw))
+    count("rows.airsupply_read", len(df_po))
+    return df_po
+
+def read_po_cached(source) -> pd.DataFrame:
+    """
+    read_po_any con caché LRU compartida: por (ruta, mtime, tamaño) o por sha1 del contenido
+    subido. El DataFrame se comparte entre llamadas: no modificarlo.
+    """
+    return cached("po", source, lambda: read_po_any(source))
+
+# =========================
+# DA 123 columnas desde PO + plantilla
+# =========================
+@profiled("da123.build_da_123")
+def build_da_123(df_po: pd.DataFrame, template_csv_path: str | Path = TEMPLATE_DEF,
+                 sscc: bool = True, today: Optional[datetime] = None) -> DAColumns:
+    """
+    DA-123 columnar para un PO ya leído: columnas de la plantilla compilada,
+    constantes, relleno desde el PO y, si `sscc`, un UE/UX por línea.
+    """
+    schema = compile_template(template_csv_path)
+    if len(schema.columns) < 5:
+        raise ValueError("Plantilla 123 mal leída. Revisa separador o cabecera.")
+
+    # DA columnar: constantes como escalares hasta la escritura
+    target = schema.assemble(df_po, today)
+
+    # === SSCC automáticos para demo en DA-123 ===
+    if sscc:
+        try:
+            from .sscc import reserve_block
+            target[schema.ue_col] = reserve_block("UE", len(target))
+            target[schema.ux_col] = reserve_block("UX", len(target))
+        except Exception:
+            # si falla generación, no romper
+            pass
+
+    return target
+
+def assemble_da_123_from_po(po_csv_path: str | Path, template_csv_path: str | Path = TEMPLATE_DEF) -> DAColumns:
+    return build_da_123(read_po_any(po_csv_path), template_csv_path)
+
+def format_da_123_from_po(po_csv_path: str | Path, template_csv_path: str | Path = TEMPLATE_DEF) -> pd.DataFrame:
+    return assemble_da_123_from_po(po_csv_path, template_csv_path).to_frame()
+
+# =========================
+# Lote: directorio de POs
+# =========================
+def run_dir(po_dir: str | Path, template_csv_path: str | Path = TEMPLATE_DEF, out_dir: str | Path = OUT_DIR_DEF,
+            pattern: str = "*.csv", fmt: str = "csv") -> List[Path]:
+    """Un DA-123 por PO de `po_dir` (DA_<nombre PO>.csv|xlsx en `out_dir`). Devuelve las rutas escritas."""
+    from ..io.writers_da import write_da_123
+
+    po_paths = sorted(Path(po_dir).glob(pattern))
+    if not po_paths:
+        raise ValueError(f"No hay POs ({pattern}) en {po_dir}")
+    written = []
+    for po_path in po_paths:
+        da = assemble_da_123_from_po(po_path, template_csv_path)
+        out = Path(out_dir) / f"DA_{po_path.stem}.{fmt}"
+        write_da_123(da, out)
+        print(f"OK -> {out} ({len(da)} líneas)")
+        written.append(out)
+    return written
+
+def cli():
+    import argparse
+    p = argparse.ArgumentParser(description="DA-123 desde POs AirSupply (sin Streamlit)")
+    p.add_argument("--po-dir", required=True, help="Directorio con CSV AirSupply")
+    p.add_argument("--template", default=str(TEMPLATE_DEF), help="Plantilla DA-123 (.csv)")
+    p.add_argument("--out-dir", default=str(OUT_DIR_DEF), help="Directorio de salida")
+    p.add_argument("--pattern", default="*.csv", help="Patrón de ficheros PO")
+    p.add_argument("--format", choices=["csv", "xlsx"], default="csv", help="Formato de salida")
+    add_profile_args(p)
+    args = p.parse_args()
+    with session_from_args(args):
+        run_dir(args.po_dir, args.template, args.out_dir, args.pattern, args.format)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,181 @@
+# src/core/da_batch.py
+from __future__ import annotations
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from ..io.profiling import active, add_profile_args, profile_session, session_from_args
+from ..io.readers_warehouse import read_po_csv, read_mapping_csv
+from ..io.writers_da import write_da
+from ..io.warehouse_store import WarehouseStore
+from .da_build import STAGES, _read_warehouse_any, format_timings, resolve_da, write_exceptions
+
+SUMMARY_NAME = "DA_batch_summary.csv"
+# t_<etapa>: segundos por etapa de cada PO (ver da_build.STAGES)
+SUMMARY_COLS = (["po_file", "da_file", "status", "po_lines", "da_rows", "exceptions", "seconds", "error"]
+                + [f"t_{k}" for k in STAGES])
+
+# almacén y mapping cargados una vez por proceso (initializer del pool)
+_WH: pd.DataFrame | WarehouseStore | None = None
+_MAP: Optional[pd.DataFrame] = None
+# perfilado pedido en el proceso principal: cada PO devuelve su informe para sumarlo
+_PROFILE = False
+
+def _init_worker(wh: pd.DataFrame | WarehouseStore, mp: Optional[pd.DataFrame], profile: bool = False) -> None:
+    global _WH, _MAP, _PROFILE
+    _WH, _MAP, _PROFILE = wh, mp, profile
+
+def collect_pos(sources: Iterable[str], pattern: str = "*.csv") -> List[Path]:
+    """Ficheros PO a partir de directorios (`pattern` dentro), globs o rutas sueltas, sin duplicados."""
+    found: dict[Path, None] = {}
+    for src in sources:
+        p = Path(src)
+        if p.is_dir():
+            hits = sorted(p.glob(pattern))
+        elif any(ch in src for ch in "*?["):
+            hits = sorted(Path(h) for h in glob.glob(src))
+        else:
+            hits = [p]
+        for h in hits:
+            if h.is_file():
+                found.setdefault(h.resolve(), None)
+    return list(found)
+
+def da_names(po_paths: List[Path]) -> List[str]:
+    """
+    Nombre base del DA de cada PO: DA_<nombre>, o DA_<directorio>_<nombre> si varios POs
+    comparten nombre (a/PO.csv y b/PO.csv); si aún coinciden, sufijo _2, _3... Sin
+    distinguir mayúsculas y sin pisar el resumen del lote.
+    """
+    stems = [p.stem.lower() for p in po_paths]
+    names = [f"DA_{p.parent.name}_{p.stem}" if p.parent.name and stems.count(p.stem.lower()) > 1 else f"DA_{p.stem}"
+             for p in po_paths]
+    taken = {Path(SUMMARY_NAME).stem.lower()}
+    out = []
+    for name in names:
+        unique, i = name, 1
+        while unique.lower() in taken:
+            i += 1
+            unique = f"{name}_{i}"
+        taken.add(unique.lower())
+        out.append(unique)
+    return out
+
+def _process_po(po_path: Path, out_path: Path) -> dict:
+    """Un PO -> un DA (+ tabla de excepciones); nunca lanza: el error queda en la fila de resumen."""
+    if not _PROFILE:
+        return _run_po(po_path, out_path)
+    with profile_session(echo=False) as prof:
+        row = _run_po(po_path, out_path)
+    row["_profile"] = prof.to_dict()
+    return row
+
+def _run_po(po_path: Path, out_path: Path) -> dict:
+    t0 = time.perf_counter()
+    row = {"po_file": str(po_path), "da_file": str(out_path), "status": "ok",
+           "po_lines": 0, "da_rows": 0, "exceptions": 0, "seconds": 0.0, "error": ""}
+    try:
+        t = time.perf_counter()
+        po = read_po_csv(po_path)
+        row["t_read_po"] = time.perf_counter() - t
+        row["po_lines"] = len(po)
+        res = resolve_da(po, _WH, _MAP)
+        row.update({f"t_{k}": v for k, v in res.timings.items()})
+        t = time.perf_counter()
+        write_da(res.frame, out_path)
+        write_exceptions(res.exceptions, out_path)
+        row["t_write"] = time.perf_counter() - t
+        row["da_rows"] = len(res.frame)
+        row["exceptions"] = len(res.exceptions)
+    except Exception as e:
+        row["status"] = "error"
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = round(time.perf_counter() - t0, 3)
+    for k in STAGES:
+        row[f"t_{k}"] = round(row.get(f"t_{k}", 0.0), 4)
+    return row
+
+def run_batch(sources: Iterable[str], warehouse_path: str | Path, map_csv: str | None, out_dir: str | Path,
+              workers: Optional[int] = None, fmt: str = "csv", pattern: str = "*.csv") -> pd.DataFrame:
+    """
+    DA para varios POs: almacén y mapping se leen una sola vez y cada PO se procesa en un
+    ProcessPoolExecutor (workers=1: en el propio proceso). Los SSCC se reservan con el
+    backend de contadores configurado, seguro entre procesos. Escribe DA_<po>.<fmt> por PO
+    (nombres repetidos: ver da_names; y DA_<po>_exceptions.csv si hay líneas con excepción)
+    y DA_batch_summary.csv en out_dir, con tiempos por etapa; devuelve el resumen.
+    """
+    po_paths = collect_pos(sources, pattern)
+    if not po_paths:
+        raise ValueError("No se encontraron ficheros PO")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(p, out_dir / f"{name}.{fmt}") for p, name in zip(po_paths, da_names(po_paths))]
+
+    t0 = time.perf_counter()
+    wh = _read_warehouse_any(warehouse_path)
+    t_wh = time.perf_counter() - t0
+    mp = read_mapping_csv(map_csv) if map_csv else None
+    t_map = time.perf_counter() - t0 - t_wh
+    n_wh = wh.count() if isinstance(wh, WarehouseStore) else len(wh)
+    print(f"Entradas cargadas en {time.perf_counter() - t0:.2f}s ({n_wh} movimientos almacén)")
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    profile = active() is not None
+    rows = []
+    if workers == 1:
+        _init_worker(wh, mp, profile)
+        for po_path, out_path in jobs:
+            rows.append(_report(_process_po(po_path, out_path)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(wh, mp, profile)) as pool:
+            futures = [pool.submit(_process_po, po_path, out_path) for po_path, out_path in jobs]
+            for fut in as_completed(futures):
+                rows.append(_report(fut.result()))
+
+    # resumen en el orden de entrada
+    order = {str(p): i for i, (p, _) in enumerate(jobs)}
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLS).sort_values("po_file", key=lambda s: s.map(order))
+    summary.to_csv(out_dir / SUMMARY_NAME, index=False)
+    n_err = int((summary["status"] != "ok").sum())
+    print(f"{len(summary)} POs ({n_err} con error, {int(summary['exceptions'].sum())} líneas con excepción) "
+          f"en {time.perf_counter() - t0:.2f}s con {workers} proceso(s) -> {out_dir / SUMMARY_NAME}")
+    # almacén y mapping se leen una vez para todo el lote
+    totals = {k: float(summary[f"t_{k}"].sum()) for k in STAGES}
+    totals.update(read_warehouse=t_wh, read_mapping=t_map)
+    print(f"Tiempo por etapa (suma de POs): {format_timings(totals)}")
+    return summary.reset_index(drop=True)
+
+def _report(row: dict) -> dict:
+    report = row.pop("_profile", None)
+    if report is not None and active() is not None:
+        active().merge(report)
+    name = Path(row["po_file"]).name
+    if row["status"] == "ok":
+        exc = f", {row['exceptions']} excepciones" if row["exceptions"] else ""
+        print(f"  {name}: {row['da_rows']} filas DA{exc} en {row['seconds']:.2f}s")
+    else:
+        print(f"  {name}: ERROR {row['error']} ({row['seconds']:.2f}s)")
+    return row
+
+def cli():
+    import argparse
+    p = argparse.ArgumentParser(description="Construir DA para varios POs en paralelo")
+    p.add_argument("--pos", required=True, nargs="+", help="Directorios, globs o ficheros CSV AirSupply (;)")
+    p.add_argument("--warehouse", required=True, help="Ruta movimientos almacén (.xlsx, .csv o .sqlite)")
+    p.add_argument("--map", required=False, help="CSV/XLSX mapping SAP->Navision")
+    p.add_argument("--out-dir", default="data/output/da", help="Directorio de salida")
+    p.add_argument("--workers", type=int, default=None, help="Procesos (por defecto: nº de CPUs)")
+    p.add_argument("--format", choices=["csv", "xlsx"], default="csv", help="Formato de cada DA")
+    p.add_argument("--pattern", default="*.csv", help="Patrón de ficheros PO dentro de los directorios")
+    add_profile_args(p)
+    args = p.parse_args()
+    with session_from_args(args):
+        run_batch(args.pos, args.warehouse, args.map, args.out_dir, args.workers, args.format, args.pattern)
+
+if __name__ == "__main__":
+    cli()
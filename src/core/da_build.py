@@ -1,136 +1,268 @@
 # src/core/da_build.py
 from __future__ import annotations
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
+from typing import Dict, Iterator, NamedTuple
+import numpy as np
 import pandas as pd
+from ..io.profiling import add_profile_args, profiled, session_from_args, span
 from ..io.readers_warehouse import read_po_csv, read_mapping_csv
 from ..io.writers_da import write_da
-from .warehouse_match import match_po_to_warehouse
+from ..io.warehouse_store import WarehouseStore
+from .sscc import sscc_preview
+from .warehouse_match import PO_ALIASES, match_po_to_warehouse
 
-# --- compat: leer warehouse en .xlsx o .csv ---
-def _read_warehouse_any(path: str | Path) -> pd.DataFrame:
+DA_COLS = ["PO", "Item Number", "Codigo_Navision", "Shipped Quantity", "Lot", "Manufacture Date",
+           "Expiry Date", "UE_SSCC", "UX_SSCC", "Despatch Advice ID"]
+# tabla de excepciones: una fila por línea PO (y motivo) que no sale limpia del matching
+EXC_COLS = ["PO Line", "PO", "Item Number", "reason", "resolved_by", "detail"]
+REASONS = {
+    "no_mapping": "Item sin Codigo_Navision en el mapping",
+    "no_sale": "Sin movimiento de venta en almacén",
+    "qty_short": "Stock del movimiento menor que la cantidad PO",
+    "qty_invalid": "Cantidad PO vacía o no numérica (se usa 0)",
+    "match_error": "El matching falló para todo el PO",
+}
+# match_status del motor -> motivo; ok / qty_warning se quedan con el resultado del matching
+_STATUS_REASON = {"no_mapping": "no_mapping", "no_match": "no_sale"}
+# etapas con contador de tiempo (segundos)
+STAGES = ["read_po", "read_warehouse", "read_mapping", "match", "fallback", "assemble", "write"]
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str) -> Iterator[None]:
+    """Etapa con contador de tiempo en `timings` y span de perfilado da_build.<name>."""
+    t0 = time.perf_counter()
+    try:
+        with span(f"da_build.{name}"):
+            yield
+    finally:
+        timings[name] = time.perf_counter() - t0
+
+class DAResult(NamedTuple):
+    frame: pd.DataFrame
+    exceptions: pd.DataFrame
+    timings: Dict[str, float]
+
+# --- compat: leer warehouse en .xlsx o .csv; .sqlite -> almacén incremental (consulta por item) ---
+def _read_warehouse_any(path: str | Path) -> pd.DataFrame | WarehouseStore:
     p = Path(path)
+    if p.suffix.lower() in {".sqlite", ".db"}:
+        return WarehouseStore(p)
     if p.suffix.lower() in {".xlsx", ".xls"}:
         return pd.read_excel(p)
     # CSV por defecto
     return pd.read_csv(p, dtype=str)
 
-def _rows_from_matches(matches: pd.DataFrame) -> list[dict]:
-    rows: list[dict] = []
-    for _, r in matches.iterrows():
-        rows.append({
-            "PO": r.get("PO", ""),
-            "Item Number": r.get("Item Number", ""),
-            "Codigo_Navision": r.get("Codigo_Navision", ""),
-            "Shipped Quantity": r.get("Shipped Quantity", ""),
-            "Lot": r.get("Lot", ""),
-            "Manufacture Date": r.get("Manufacture Date", ""),
-            "Expiry Date": r.get("Expiry Date", ""),
-            "UE_SSCC": "",  # se rellenará cuando packing esté listo
-            "UX_SSCC": "",  # se rellenará cuando packing esté listo
-            "Despatch Advice ID": r.get("Albaran", "") or f"DA-{r.get('PO','')}",
-        })
-    return rows
-
-def _simple_pack(po_df: pd.DataFrame, wh_df: pd.DataFrame, map_df: pd.DataFrame | None) -> pd.DataFrame:
+def _rows_from_matches(matches: pd.DataFrame) -> pd.DataFrame:
+    """Resultado de match_po_to_warehouse -> columnas DA (SSCC vacíos: los pone packing)."""
+    alb = matches["Albaran"].fillna("")
+    out = matches.reindex(columns=DA_COLS[:7]).fillna("").assign(UE_SSCC="", UX_SSCC="")
+    out["Despatch Advice ID"] = alb.where(alb != "", "DA-" + matches["PO"].astype(str))
+    return out
+
+def _first_by(df: pd.DataFrame, key: str, cols: list[str]) -> pd.DataFrame:
+    """Primera fila de `df` por valor de `key` (equivale a filtrar y tomar iloc[0]); columnas ausentes -> ""."""
+    first = df.drop_duplicates(key, keep="first").set_index(key)
+    return pd.DataFrame({c: first[c] if c in first.columns else "" for c in cols}, index=first.index)
+
+@profiled("da_build.simple_pack")
+def _simple_pack(po_df: pd.DataFrame, wh_df: pd.DataFrame | WarehouseStore, map_df: pd.DataFrame | None) -> pd.DataFrame:
     """
     Fallback realista cuando no hay matching:
     - Si hay mapping: usa Codigo_Navision y deja SSCC vacíos.
     - Si NO hay mapping: genera Codigo_Navision sintético y SSCC reales (UE/UX).
+    Columnar: almacén y mapping se cruzan por item con un lookup de primera fila.
     """
     # import local para evitar dependencias circulares
-    from .sscc import next_ue, next_ux
-
-    rows = []
-    for _, r in po_df.iterrows():
-        item = r.get("Item Number", "") or r.get("Customer Material Number", "") or ""
-        # cantidad como float pero preservando salida amigable
-        qty_raw = r.get("Requested quantity", "") or r.get("Ordered Quantity", "") or r.get("Quantity", "") or "0"
-        try:
-            qty_f = float(str(qty_raw).replace(",", "."))
-        except Exception:
-            qty_f = 0.0
-        qty_out = qty_f if qty_f.is_integer() else qty_f  # se deja tal cual; Excel lo renderiza bien
-
-        # datos del warehouse si existieran
-        lot = fab = cad = alb = ""
-        hit = wh_df.loc[wh_df["PN_GECI"] == item] if "PN_GECI" in wh_df.columns else None
-        if hit is not None and not hit.empty:
-            lot = hit.iloc[0].get("Lote", "")
-            fab = hit.iloc[0].get("Fecha_Fabricacion", "")
-            cad = hit.iloc[0].get("Fecha_Caducidad", "")
-            alb = hit.iloc[0].get("Albaran", "")
-
-        # mapping normal
-        cod_nav = ""
-        if map_df is not None and not map_df.empty and "Codigo_SAP_ItemNumber" in map_df.columns:
-            m = map_df.loc[map_df["Codigo_SAP_ItemNumber"] == item]
-            if not m.empty and "Codigo_Navision" in m.columns:
-                cod_nav = str(m.iloc[0].get("Codigo_Navision", "")).strip()
-
-        # si no existe mapping → generar uno ficticio y SSCC reales
-        if not cod_nav:
-            cod_nav = f"FAKE-{item}".strip("-")
-            ue_sscc = next_ue()
-            ux_sscc = next_ux()
+    from .packing import _first_nonempty
+    from .sscc import reserve_block
+
+    n = len(po_df)
+    item = _first_nonempty(po_df, ["Item Number", "Customer Material Number"])
+    po_num = _first_nonempty(po_df, ["PO", "PO Number"])
+    # cantidad con coma o punto decimal; vacío o no numérico -> 0.0
+    qty_raw = _first_nonempty(po_df, ["Requested quantity", "Ordered Quantity", "Quantity"])
+    qty = pd.to_numeric(qty_raw.str.strip().str.replace(",", ".", regex=False), errors="coerce").fillna(0.0)
+
+    # datos del warehouse si existieran (primer movimiento por PN_GECI)
+    wh_cols = {"Lot": "Lote", "Manufacture Date": "Fecha_Fabricacion", "Expiry Date": "Fecha_Caducidad", "_alb": "Albaran"}
+    wh_vals = {k: pd.Series("", index=po_df.index, dtype=object) for k in wh_cols}
+    if isinstance(wh_df, pd.DataFrame) and "PN_GECI" in wh_df.columns and not wh_df.empty:
+        first = _first_by(wh_df, "PN_GECI", list(wh_cols.values()))
+        hit = item.isin(first.index)
+        for k, c in wh_cols.items():
+            wh_vals[k] = item.map(first[c]).where(hit, "")
+
+    # mapping normal (primera fila por Codigo_SAP_ItemNumber)
+    cod_nav = pd.Series("", index=po_df.index, dtype=object)
+    if map_df is not None and not map_df.empty and "Codigo_SAP_ItemNumber" in map_df.columns and "Codigo_Navision" in map_df.columns:
+        first = _first_by(map_df, "Codigo_SAP_ItemNumber", ["Codigo_Navision"])["Codigo_Navision"].astype(str).str.strip()
+        cod_nav = item.map(first).fillna("")
+
+    # si no existe mapping → generar uno ficticio y SSCC reales en un único bloque UE y otro UX
+    needs_sscc = (cod_nav == "").to_numpy()
+    cod_nav = cod_nav.where(~needs_sscc, ("FAKE-" + item).str.strip("-"))
+    k = int(needs_sscc.sum())
+    ue = np.full(n, "", dtype=object)
+    ux = np.full(n, "", dtype=object)
+    if k:
+        ue[needs_sscc] = reserve_block("UE", k)
+        ux[needs_sscc] = reserve_block("UX", k)
+
+    alb = wh_vals["_alb"].fillna("")
+    return pd.DataFrame({
+        "PO": po_num,
+        "Item Number": item,
+        "Codigo_Navision": cod_nav,
+        "Shipped Quantity": qty.astype(float),
+        "Lot": wh_vals["Lot"],
+        "Manufacture Date": wh_vals["Manufacture Date"],
+        "Expiry Date": wh_vals["Expiry Date"],
+        "UE_SSCC": ue,
+        "UX_SSCC": ux,
+        "Despatch Advice ID": alb.where(alb != "", "DA-" + po_num),
+    }).reset_index(drop=True)
+
+def _exceptions(lines: np.ndarray, po_df: pd.DataFrame, reason: str, resolved_by: str | np.ndarray,
+                detail: str | None = None) -> pd.DataFrame:
+    """Filas de excepción para `lines` (nº de línea PO, 1 = primera)."""
+    from .packing import _first_nonempty
+    pos = lines - 1
+    return pd.DataFrame({
+        "PO Line": lines,
+        "PO": _first_nonempty(po_df, PO_ALIASES["po_number"]).to_numpy(dtype=object)[pos],
+        "Item Number": _first_nonempty(po_df, PO_ALIASES["item_as"]).to_numpy(dtype=object)[pos],
+        "reason": reason,
+        "resolved_by": resolved_by,
+        "detail": detail or REASONS[reason],
+    }, columns=EXC_COLS)
+
+@profiled("da_build.resolve_da")
+def resolve_da(po: pd.DataFrame, wh: pd.DataFrame | WarehouseStore, mp: pd.DataFrame | None) -> DAResult:
+    """
+    DA de un PO resuelto línea a línea: las líneas que casan (ok / qty_warning) salen del
+    matching; solo las que fallan (sin mapping, sin venta en almacén) pasan por _simple_pack.
+    Si el matching no puede ejecutarse (p. ej. columnas de almacén ausentes) todo el PO va
+    al fallback y cada línea queda como `match_error` con el error en `detail`.
+    Devuelve el DA en el orden del PO, la tabla de excepciones y los tiempos por etapa.
+    """
+    from .packing import _first_nonempty
+
+    timings = {}
+    n = len(po)
+    lines = np.arange(1, n + 1)
+    exc = []
+
+    # 1) matching por el motor
+    with _stage(timings, "match"):
+        matches, error = None, None
+        if mp is None:
+            error = "Sin tabla de mapping"
+        elif n:
+            try:
+                matches = match_po_to_warehouse(po, mp, wh)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        if matches is not None:
+            good = matches["match_status"].isin(["ok", "qty_warning"])
+            kept = matches.loc[good]
+            failed = np.setdiff1d(matches.loc[~good, "PO Line"].to_numpy(dtype=np.int64), kept["PO Line"].to_numpy(dtype=np.int64))
+            bad = matches.loc[~good & matches["PO Line"].isin(failed)].drop_duplicates("PO Line")
+            for status, grp in bad.groupby("match_status", sort=False):
+                exc.append(_exceptions(grp["PO Line"].to_numpy(dtype=np.int64), po, _STATUS_REASON[status], "fallback"))
+            short = kept.loc[kept["match_status"] == "qty_warning", "PO Line"].drop_duplicates().to_numpy(dtype=np.int64)
+            if len(short):
+                exc.append(_exceptions(short, po, "qty_short", "match"))
+            matched = _rows_from_matches(kept).assign(**{"PO Line": kept["PO Line"].to_numpy()})
         else:
-            ue_sscc = ""
-            ux_sscc = ""
-
-        rows.append({
-            "PO": r.get("PO", "") or r.get("PO Number", ""),
-            "Item Number": item,
-            "Codigo_Navision": cod_nav,
-            "Shipped Quantity": qty_out,
-            "Lot": lot,
-            "Manufacture Date": fab,
-            "Expiry Date": cad,
-            "UE_SSCC": ue_sscc,
-            "UX_SSCC": ux_sscc,
-            "Despatch Advice ID": alb or f"DA-{(r.get('PO','') or r.get('PO Number',''))}",
-        })
-
-    return pd.DataFrame(rows)
-
-def build_da(po_csv: str | Path, warehouse_path: str | Path, map_csv: str | None, out_path: str | Path) -> None:
+            failed = lines
+            matched = pd.DataFrame(columns=DA_COLS + ["PO Line"])
+            if n:
+                exc.append(_exceptions(lines, po, "no_mapping" if mp is None else "match_error", "fallback",
+                                       None if mp is None else error))
+
+    # 2) fallback solo para las líneas que fallan
+    with _stage(timings, "fallback"):
+        fallback = pd.DataFrame(columns=DA_COLS + ["PO Line"])
+        if len(failed):
+            fallback = _simple_pack(po.iloc[failed - 1], wh, mp).assign(**{"PO Line": failed})
+
+    # 3) DA en el orden del PO + cantidades no numéricas
+    with _stage(timings, "assemble"):
+        parts = [f for f in (matched, fallback) if not f.empty]
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=DA_COLS + ["PO Line"])
+        df = df.sort_values("PO Line", kind="mergesort").reset_index(drop=True)[DA_COLS]
+        qty_raw = _first_nonempty(po, PO_ALIASES["qty_as"]).str.strip()
+        qty = pd.to_numeric(qty_raw.str.replace(",", ".", regex=False), errors="coerce")
+        bad_qty = lines[qty.isna().to_numpy()]
+        if len(bad_qty):
+            path = np.where(np.isin(bad_qty, failed), "fallback", "match")
+            exc.append(_exceptions(bad_qty, po, "qty_invalid", path, None))
+        exceptions = (pd.concat(exc, ignore_index=True).sort_values("PO Line", kind="mergesort").reset_index(drop=True)
+                      if exc else pd.DataFrame(columns=EXC_COLS))
+    return DAResult(df, exceptions, timings)
+
+def build_da_frame(po: pd.DataFrame, wh: pd.DataFrame | WarehouseStore, mp: pd.DataFrame | None) -> pd.DataFrame:
+    """DA de un PO ya leído contra almacén y mapping cargados (reutilizables entre POs)."""
+    return resolve_da(po, wh, mp).frame
+
+def exceptions_path(out_path: str | Path) -> Path:
+    """Ruta de la tabla de excepciones junto al DA: DA_x.csv -> DA_x_exceptions.csv."""
+    out_path = Path(out_path)
+    return out_path.with_name(f"{out_path.stem}_exceptions.csv")
+
+def write_exceptions(exceptions: pd.DataFrame, out_path: str | Path) -> Path | None:
+    """Escribe la tabla de excepciones junto al DA (solo si hay); devuelve la ruta o None."""
+    if exceptions.empty:
+        return None
+    path = exceptions_path(out_path)
+    exceptions.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+def format_timings(timings: Dict[str, float]) -> str:
+    return " | ".join(f"{k} {timings[k]:.3f}s" for k in STAGES if k in timings)
+
+@profiled("da_build.build_da")
+def build_da(po_csv: str | Path, warehouse_path: str | Path, map_csv: str | None, out_path: str | Path) -> DAResult:
+    timings = {}
     # Entradas
-    po = read_po_csv(po_csv)
-    wh = _read_warehouse_any(warehouse_path)
-
-    # --- Soporte para mapping en Excel o CSV ---
-    if map_csv:
-        map_path = Path(map_csv)
-        if map_path.suffix.lower() in [".xlsx", ".xls"]:
-            mp = pd.read_excel(map_path, dtype=str).fillna("")
-        else:
-            mp = read_mapping_csv(map_path)
-    else:
-        mp = None
-    # -------------------------------------------
+    with _stage(timings, "read_po"):
+        po = read_po_csv(po_csv)
+    with _stage(timings, "read_warehouse"):
+        wh = _read_warehouse_any(warehouse_path)
 
-    # Intentar matching real
-    try:
-        matches = match_po_to_warehouse(po, mp, wh)
-        rows = _rows_from_matches(matches)
-        df = pd.DataFrame(rows)
-        # Si por cualquier motivo no hay filas útiles, usar fallback
-        if df.empty:
-            df = _simple_pack(po, wh, mp)
-    except Exception:
-        # Si falla matching, usar fallback
-        df = _simple_pack(po, wh, mp)
-
-    # Salida
-    write_da(df, out_path)
+    # mapping en Excel o CSV (caché compartida en readers_mapping)
+    with _stage(timings, "read_mapping"):
+        mp = read_mapping_csv(map_csv) if map_csv else None
+
+    res = resolve_da(po, wh, mp)
+    timings.update(res.timings)
+
+    # Salida: DA + tabla de excepciones si la hay
+    with _stage(timings, "write"):
+        write_da(res.frame, out_path)
+        write_exceptions(res.exceptions, out_path)
+    return res._replace(timings=timings)
 
 def cli():
     import argparse
     p = argparse.ArgumentParser(description="Construir DA (demo Airbus-like)")
     p.add_argument("--po", required=True, help="CSV AirSupply (;)")
-    p.add_argument("--warehouse", required=True, help="Ruta movimientos almacén (.xlsx o .csv)")
+    p.add_argument("--warehouse", required=True, help="Ruta movimientos almacén (.xlsx, .csv o .sqlite)")
     p.add_argument("--map", required=False, help="CSV/XLSX mapping SAP->Navision")
     p.add_argument("--out", required=True, help="Ruta de salida .csv o .xlsx")
+    p.add_argument("--dry-run", action="store_true", help="SSCC provisionales: no consume secuencias ni escribe el contador")
+    add_profile_args(p)
     args = p.parse_args()
-    build_da(args.po, args.warehouse, args.map, args.out)
+    with session_from_args(args):
+        with sscc_preview() if args.dry_run else nullcontext():
+            res = build_da(args.po, args.warehouse, args.map, args.out)
+    print(f"OK -> {args.out} ({len(res.frame)} filas DA)" + (" [SSCC provisionales]" if args.dry_run else ""))
+    if not res.exceptions.empty:
+        counts = res.exceptions["reason"].value_counts()
+        print(f"Excepciones -> {exceptions_path(args.out)}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    print(f"Tiempos: {format_timings(res.timings)}")
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,291 @@
+# src/core/da_template.py
+from __future__ import annotations
+import csv
+import hashlib
+import io
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ..io.cache import CACHE, content_key
+from ..io.profiling import profiled
+
+# =========================
+# Constantes fijas DA-123
+# =========================
+DA_CONSTS = {
+    "SUPPLIERNO": "5072826",
+    "SUPPLIER NUMBER": "5072826",
+    "DAUPLOADCODE": "SEND",
+    "CUSTOMERGROUPCODE": "CUST",
+    "SHIPFROMNAME1": "GECI INDUS",
+    "SHIPFROMCITY": "JEREZ",
+    "SHIPFROMCOUNTRYCODE": "ES",
+    "SHIPFROMCOUNTRY": "SPAIN",
+    "FORWARDERID": "GECI INDUS",
+    "FORWARDERNAME1": "GECI INDUS",
+    "TRANSPORTMODE": "ROAD",
+    "CUSTOMERPLANTCODE": "GER",
+    "CUSTOMS": "N",
+}
+
+# (variantes columna destino, columnas PO candidatas, valor por defecto)
+PO_TO_DA123 = [
+    (["PONUMBER","PO NUMBER","PO"],                           ["PO","PO Number"],                                           None),
+    (["POLINE","PO LINE","POITEM","PO ITEM"],                 ["PO Line"],                                                  None),
+    (["CUSTOMERMATERIALNUMBER"],                              ["Customer Material Number"],                                  None),
+    (["SUPPLIERMATERIALNUMBER"],                              ["Supplier Material Number"],                                  None),
+    (["MATERIALDESCRIPTION","ITEMDESCRIPTION","PO LINE DESC."],
+     ["Supplier Material Description","PO Line Desc.","Item Description","Material Description"],                            None),
+    (["SHIPPEDQUANTITY","ORDEREDQUANTITY","QUANTITY"],        ["Requested quantity","Ordered Quantity","Quantity","Shipped Quantity"], None),
+    (["CURRENCY"],                                            ["Currency"],                                                 None),
+    (["PRICEUNIT"],                                           ["Price Unit"],                                               None),
+    (["PROMISEDDATE"],                                       ["Promised date","Promised Date"],                              None),
+    (["REQUESTEDDATE"],                                      ["Requested date","Requested Date"],                            None),
+    (["BATCHNUMBER","LOT"],                                   ["Batch","Lot","Batch Number","Batch Number Customer","Batch Number Supplier"], None),
+    (["DEPARTUREDATE","DESPATCHDATE","DESPATCH DATE"],        [],                                                           "AUTO_DESPATCH"),
+    (["ESTIMATEDDELIVERYDATE","ESTIMATED DELIVERY DATE"],     [],                                                           "AUTO_ETA"),
+]
+
+CONST_TARGETS = {
+    "SUPPLIERNO": ["SUPPLIERNO","SUPPLIER NUMBER","SUPPLIERNUMBER"],
+    "DAUPLOADCODE": ["DAUPLOADCODE"],
+    "CUSTOMERGROUPCODE": ["CUSTOMERGROUPCODE","CUSTOMER GROUP CODE"],
+    "SHIPFROMNAME1": ["SHIPFROMNAME1"],
+    "SHIPFROMCITY": ["SHIPFROMCITY"],
+    "SHIPFROMCOUNTRYCODE": ["SHIPFROMCOUNTRYCODE"],
+    "SHIPFROMCOUNTRY": ["SHIPFROMCOUNTRY"],
+    "FORWARDERID": ["FORWARDERID","FORWARDER ID"],
+    "FORWARDERNAME1": ["FORWARDERNAME1","FORWARDER NAME1","FORWARDERNAME"],
+    "TRANSPORTMODE": ["TRANSPORTMODE","ROAD"],
+    "CUSTOMERPLANTCODE": ["CUSTOMERPLANTCODE"],
+    "CUSTOMS": ["CUSTOMS","Customs"],
+}
+
+UE_VARIANTS = ["UE Number", "UE_NUMBER", "UE", "UE SSCC", "UE_SSCC"]
+UX_VARIANTS = ["UX Number", "UX_NUMBER", "UX", "UX SSCC", "UX_SSCC"]
+
+HEADER_PROBES = {
+    "ponumber","poline","supplierno","dauploadcode","departuredate",
+    "estimateddeliverydate","currency","customs","shipfromname1"
+}
+
+def _norm(s: str) -> str:
+    return str(s).strip().lower().replace(" ", "").replace("_", "")
+
+def _decode(raw: bytes) -> str:
+    for enc in ("utf-8-sig", "cp1252", "latin-1"):
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("latin-1", errors="replace")
+
+def _detect_header_row(lines: List[List[str]], max_scan_rows: int = 15) -> int:
+    best_row, best_hits = 0, -1
+    for i, row in enumerate(lines[:max_scan_rows]):
+        if not any(row):
+            continue
+        hits = len(HEADER_PROBES & {_norm(x) for x in row if x})
+        if hits > best_hits:
+            best_hits = hits
+            best_row = i
+    return best_row
+
+def _detect(text: str, max_scan_rows: int = 15) -> Tuple[List[str], str, int]:
+    """Separador, fila de cabecera y columnas con una sola lectura del texto de la plantilla."""
+    head = text.splitlines()[:max_scan_rows]
+    for sep in [";", ","]:
+        rows = list(csv.reader(head, delimiter=sep))
+        header_row = _detect_header_row(rows, max_scan_rows)
+        try:
+            cols = list(pd.read_csv(io.StringIO(text), header=header_row, nrows=0, sep=sep, dtype=str).columns)
+        except Exception:
+            continue
+        if cols and len(cols) > 1:
+            return cols, sep, header_row
+    # fallback simple: autodetección del parser python
+    cols = list(pd.read_csv(io.StringIO(text), sep=None, engine="python", dtype=str, nrows=0).columns)
+    return cols, ";", 0
+
+# celda de columna DA: escalar difundido a todas las filas o array de texto (una entrada por fila)
+Cell = Union[str, np.ndarray]
+
+def _text_array(s: pd.Series) -> np.ndarray:
+    """Columna del PO como array object de str; sin copia si ya es texto sin nulos."""
+    if s.dtype == object and not s.isna().any():
+        return s.to_numpy()
+    return s.astype(str).to_numpy(dtype=object)
+
+def _fill_empty(cur: Cell, val: Cell) -> Cell:
+    """Rellena los "" de `cur` con `val` (escalar o array alineado)."""
+    if isinstance(cur, str):
+        return val if cur == "" else cur
+    empty = cur == ""
+    if not empty.any():
+        return cur
+    return np.where(empty, val, cur).astype(object, copy=False)
+
+class TemplateSchema:
+    """
+    Plantilla DA-123 compilada: separador, fila de cabecera, columnas en orden,
+    lookup normalizado y plan de asignación PO→destino + constantes ya resueltos.
+    """
+
+    def __init__(self, columns: List[str], sep: str, header_row: int, digest: str = ""):
+        self.columns = columns
+        self.sep = sep
+        self.header_row = header_row
+        self.digest = digest
+        # mismo criterio que _first_present: la última columna con el mismo nombre normalizado gana
+        self.lut: Dict[str, str] = {_norm(c): c for c in columns}
+        # destino -> valor constante (en orden de DA_CONSTS; la última asignación gana)
+        self.constants: Dict[str, str] = {}
+        for key, val in DA_CONSTS.items():
+            dest = self.resolve(CONST_TARGETS.get(key, [key]))
+            if dest:
+                self.constants[dest] = val
+        # (destino, columnas PO candidatas, defecto) en orden de PO_TO_DA123
+        self.plan: List[Tuple[str, List[str], Optional[str]]] = []
+        for dest_variants, src_candidates, default_val in PO_TO_DA123:
+            dest = self.resolve(dest_variants)
+            if dest:
+                self.plan.append((dest, src_candidates, default_val))
+        self.ue_col = self.resolve(UE_VARIANTS) or "UE Number"
+        self.ux_col = self.resolve(UX_VARIANTS) or "UX Number"
+        self._src_cache: Dict[Tuple[str, ...], List[Optional[str]]] = {}
+
+    def resolve(self, variants: List[str]) -> Optional[str]:
+        for v in variants:
+            hit = self.lut.get(_norm(v))
+            if hit:
+                return hit
+        return None
+
+    def source_columns(self, po_columns) -> List[Optional[str]]:
+        """Columna PO elegida para cada entrada del plan (cacheado por cabecera del PO)."""
+        key = tuple(po_columns)
+        hit = self._src_cache.get(key)
+        if hit is None:
+            hit = []
+            for _, candidates, _ in self.plan:
+                found = None
+                for c in candidates:
+                    if c in key:
+                        found = c
+                        break
+                    found = next((col for col in key if _norm(col) == _norm(c)), None)
+                    if found:
+                        break
+                hit.append(found)
+            self._src_cache[key] = hit
+        return hit
+
+    @profiled("da_template.assemble")
+    def assemble(self, df_po: pd.DataFrame, today: Optional[datetime] = None) -> "DAColumns":
+        """
+        DA columnar con una fila por línea del PO, en una sola pasada: copia directa de
+        columnas homónimas, constantes y relleno de vacíos desde el PO. Las constantes y
+        columnas vacías quedan como escalares; solo se materializan arrays con datos del PO.
+        """
+        today = today or datetime.now()
+        auto = {
+            "AUTO_DESPATCH": (today + timedelta(days=1)).strftime("%Y-%m-%d"),
+            "AUTO_ETA": (today + timedelta(days=2)).strftime("%Y-%m-%d"),
+        }
+        po_cols = set(df_po.columns)
+        sources = self.source_columns(df_po.columns)
+        fills: Dict[str, List[Cell]] = {}
+        for (dest, _, default_val), src in zip(self.plan, sources):
+            if src is not None:
+                fills.setdefault(dest, []).append(_text_array(df_po[src]))
+            elif default_val is not None:
+                fills.setdefault(dest, []).append(auto.get(default_val, default_val))
+
+        values: Dict[str, Cell] = {}
+        for col in self.columns:
+            if col in self.constants:
+                values[col] = self.constants[col]
+                continue
+            cur: Cell = _text_array(df_po[col]) if col in po_cols else ""
+            for val in fills.get(col, ()):
+                cur = _fill_empty(cur, val)
+            values[col] = cur
+        return DAColumns(self.columns, values, len(df_po))
+
+    def apply(self, df_po: pd.DataFrame, today: Optional[datetime] = None) -> pd.DataFrame:
+        """DA como DataFrame (vista previa, Excel): `assemble(...).to_frame()`."""
+        return self.assemble(df_po, today).to_frame()
+
+class DAColumns:
+    """
+    DA-123 en formato columnar: columnas de la plantilla en orden y, por columna,
+    un escalar (constante o vacío) o un array de n_rows valores de texto.
+    """
+
+    def __init__(self, columns: List[str], values: Dict[str, Cell], n_rows: int):
+        self.columns = list(columns)
+        self.values = values
+        self.n_rows = n_rows
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.n_rows, len(self.columns)
+
+    def __getitem__(self, col: str) -> Cell:
+        return self.values[col]
+
+    def __setitem__(self, col: str, val) -> None:
+        if not isinstance(val, str):
+            val = np.asarray(val, dtype=object)
+            if len(val) != self.n_rows:
+                raise ValueError(f"Columna {col}: {len(val)} valores para {self.n_rows} filas.")
+        if col not in self.values:
+            self.columns.append(col)
+        self.values[col] = val
+
+    def to_frame(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """
+        Materializa las filas [start, stop) en un DataFrame. Los escalares se difunden
+        como categóricas de una sola categoría (códigos int8, sin copiar el texto por fila).
+        """
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        n = max(stop - start, 0)
+        index = pd.RangeIndex(n)
+        data: Dict[str, pd.Series] = {}
+        for col in self.columns:
+            val = self.values[col]
+            if isinstance(val, str):
+                data[col] = pd.Series(pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [val]), index=index)
+            else:
+                data[col] = pd.Series(val[start:stop], index=index, dtype=object)
+        return pd.DataFrame(data, columns=self.columns, index=index)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self.to_frame(0, n)
+
+# plantillas compiladas por sha1 del contenido en la caché LRU compartida;
+# (ruta, mtime, tamaño) -> sha1 evita re-hashear
+_PATH_DIGEST: Dict[Tuple[str, int, int], str] = {}
+
+@profiled("da_template.compile_template")
+def compile_template(path: str | Path) -> TemplateSchema:
+    """Compila (o recupera de caché) la plantilla DA-123 de `path`."""
+    key = content_key(path)
+    digest = _PATH_DIGEST.get(key)
+    schema = CACHE.get(("template", digest)) if digest else None
+    if schema is None:
+        raw = Path(path).read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        schema = CACHE.get(("template", digest))
+        if schema is None:
+            cols, sep, header_row = _detect(_decode(raw))
+            schema = CACHE.put(("template", digest), TemplateSchema(cols, sep, header_row, digest), len(raw))
+        _PATH_DIGEST[key] = digest
+    return schema
@@ -0,0 +1,111 @@
+# src/core/desc_index.py
+from __future__ import annotations
+import hashlib
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+import pandas as pd
+
+DEFAULT_MIN_SCORE = 0.5
+NGRAM = 3
+MAX_CANDIDATES = 50
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_text(s) -> str:
+    """minúsculas, sin acentos, solo alfanuméricos separados por un espacio."""
+    txt = unicodedata.normalize("NFKD", str(s or "")).encode("ascii", "ignore").decode("ascii").lower()
+    return _NON_ALNUM.sub(" ", txt).strip()
+
+def _ngrams(norm: str, n: int = NGRAM) -> set[str]:
+    return {norm[i:i + n] for i in range(len(norm) - n + 1)}
+
+class DescriptionIndex:
+    """
+    Índice de descripciones del mapping para el fallback por descripción.
+
+    Índice invertido de tokens normalizados + índice de n-gramas de caracteres.
+    search() devuelve (fila, score) ordenado por score desc y fila asc:
+      1.0        descripción idéntica
+      0.8..1.0   la consulta está contenida en la descripción (criterio original)
+      0..0.8     similitud Dice de n-gramas
+    """
+
+    def __init__(self, descriptions: Iterable[str], n: int = NGRAM):
+        self.n = n
+        self._norm = [normalize_text(d) for d in descriptions]
+        self._grams: list[set[str]] = []
+        self._tok_index: dict[str, list[int]] = defaultdict(list)
+        self._gram_index: dict[str, list[int]] = defaultdict(list)
+        for row, norm in enumerate(self._norm):
+            for tok in set(norm.split()):
+                self._tok_index[tok].append(row)
+            grams = _ngrams(norm, n)
+            self._grams.append(grams)
+            for g in grams:
+                self._gram_index[g].append(row)
+        self._best_cache: dict[tuple[str, float], Optional[tuple[int, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._norm)
+
+    @classmethod
+    def from_mapping(cls, map_df: pd.DataFrame, column: str = "Descripcion") -> "DescriptionIndex":
+        return cls(map_df[column].tolist() if column in map_df.columns else [])
+
+    def _score(self, q: str, q_grams: set[str], row: int) -> float:
+        text = self._norm[row]
+        if q == text:
+            return 1.0
+        if q in text:
+            return 0.8 + 0.2 * len(q) / len(text)
+        grams = self._grams[row]
+        if not q_grams or not grams:
+            return 0.0
+        return 0.8 * 2 * len(q_grams & grams) / (len(q_grams) + len(grams))
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> list[tuple[int, float]]:
+        q = normalize_text(query)
+        if not q:
+            return []
+        q_grams = _ngrams(q, self.n)
+        # candidatos: solo n-gramas/tokens selectivos (los muy frecuentes no discriminan)
+        max_df = max(MAX_CANDIDATES, len(self._norm) // 10)
+        postings = sorted((self._gram_index.get(g, ()) for g in q_grams), key=len)
+        votes: Counter[int] = Counter()
+        for pl in [pl for pl in postings if len(pl) <= max_df] or postings[:1]:
+            votes.update(pl)
+        cands = {row for row, _ in votes.most_common(MAX_CANDIDATES)}
+        for tok in q.split():
+            pl = self._tok_index.get(tok, ())
+            if len(pl) <= max_df:
+                cands.update(pl)
+        scored = [(row, self._score(q, q_grams, row)) for row in cands]
+        scored = [(row, round(sc, 4)) for row, sc in scored if sc > 0 and sc >= min_score]
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:limit]
+
+    def best(self, query: str, min_score: float = DEFAULT_MIN_SCORE) -> Optional[tuple[int, float]]:
+        """Mejor (fila, score) o None; memoizado por consulta."""
+        key = (query, min_score)
+        if key not in self._best_cache:
+            hits = self.search(query, limit=1, min_score=min_score)
+            self._best_cache[key] = hits[0] if hits else None
+        return self._best_cache[key]
+
+# un índice por contenido de descripciones del mapping cargado (en orden: guarda posiciones de fila)
+_INDEX_CACHE: dict[str, DescriptionIndex] = {}
+
+def index_for(map_df: pd.DataFrame, column: str = "Descripcion") -> DescriptionIndex:
+    """Índice del mapping, reutilizado mientras las descripciones no cambien."""
+    col = map_df[column] if column in map_df.columns else pd.Series([], dtype=object)
+    key = hashlib.sha1(pd.util.hash_pandas_object(col, index=False).to_numpy().tobytes()).hexdigest()
+    idx = _INDEX_CACHE.get(key)
+    if idx is None:
+        idx = DescriptionIndex(col.tolist())
+        if len(_INDEX_CACHE) >= 8:
+            _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+        _INDEX_CACHE[key] = idx
+    return idx
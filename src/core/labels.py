@@ -1,11 +1,256 @@
-"""
-Stub. Implementar:
-- sscc.py: SSCC-18 (UX/UE), dígito control, validación.
-- counters.py: persistencia contadores (JSON/SQLite).
-- packing.py: PO -> UEs -> UX.
-- da_build.py: dataset DA desde packing.
-- labels.py: modelo etiquetas UX/UE.
-- readers_warehouse.py: lectura movimientos almacén.
-- writers_da.py: export CSV/XLSX Airbus-like.
-- writers_labels.py: export etiquetas (PDF/PNG, GS1-128).
-"""
+from __future__ import annotations
+from contextlib import nullcontext
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from ..io.dates import parse_dates
+from ..io.profiling import add_profile_args, count, session_from_args
+from .sscc import CFG_DEF, load_cfg, sscc_preview
+
+# --- Code 128: anchos barra/espacio de cada símbolo (valores 0..105) y Stop (106) ---
+_CODE128 = (
+    "212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 "
+    "221312 231212 112232 122132 122231 113222 123122 123221 223211 221132 "
+    "221231 213212 223112 312131 311222 321122 321221 312212 322112 322211 "
+    "212123 212321 232121 111323 131123 131321 112313 132113 132311 211313 "
+    "231113 231311 112133 112331 132131 113123 113321 133121 313121 211331 "
+    "231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 "
+    "314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 "
+    "112412 122114 122411 142112 142211 241211 221114 413111 241112 134111 "
+    "111242 121142 121241 114212 124112 124211 411212 421112 421211 212141 "
+    "214121 412121 111143 111341 131141 114113 114311 411113 411311 113141 "
+    "114131 311141 411131 211412 211214 211232 2331112"
+).split()
+# tabla de glifos cacheada: anchos y módulos (1 = barra) por valor de símbolo
+CODE128_WIDTHS: Tuple[Tuple[int, ...], ...] = tuple(tuple(int(c) for c in p) for p in _CODE128)
+CODE128_MODULES: Tuple[np.ndarray, ...] = tuple(
+    np.repeat(np.arange(len(w)) % 2 == 0, w) for w in CODE128_WIDTHS
+)
+CODE_B, CODE_C, FNC1, START_B, START_C, STOP = 100, 99, 102, 104, 105, 106
+QUIET_MODULES = 10  # zona de silencio mínima a cada lado
+# anchura de módulo (X) de GS1-128 en etiquetas logísticas, en mm
+MIN_MODULE_MM, MAX_MODULE_MM = 0.495, 0.940
+
+# AIs de longitud fija (el resto son variables y llevan FNC1 de separación si no van al final)
+AI_FIXED = {"00": 18, "01": 14, "02": 14, "11": 6, "13": 6, "15": 6, "17": 6}
+AI_MAX = {"10": 20, "21": 20}
+# GS1 CSET 82: caracteres válidos en AIs alfanuméricos (lote)
+_CSET82 = frozenset("!\"%&'()*+,-./0123456789:;<=>?ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz")
+_GS = "\x1d"  # separador interno: se codifica como FNC1
+
+class Label(NamedTuple):
+    """Etiqueta logística de una UE (caja) o UX (palet)."""
+    kind: str             # "UE" | "UX"
+    sscc: str
+    item_as: str
+    codigo_navision: str
+    desc: str
+    qty: float            # unidades de la caja (UE) o nº de cajas del palet (UX)
+    lote: str             # "" si no hay (o, en UX, si el palet mezcla lotes)
+    exp: str              # caducidad AAMMDD ("" si no hay)
+    ux_sscc: str          # palet de la caja; "" en UX
+
+    def symbols(self) -> List[Tuple[Tuple[str, str], ...]]:
+        """Un símbolo GS1-128 por grupo de AIs: caducidad/lote (si hay) y SSCC (siempre el último)."""
+        lot = lot_fields(self.lote, self.exp)
+        return ([tuple(lot)] if lot else []) + [(("00", self.sscc),)]
+
+
+def label_settings(cfg_path: str | Path = CFG_DEF) -> Tuple[str, int]:
+    """(página, dpi) del bloque `label` de la config DA; solo se admite GS1-128."""
+    lab = load_cfg(cfg_path).get("label") or {}
+    symbology = str(lab.get("symbology", "GS1-128"))
+    if symbology.upper() != "GS1-128":
+        raise ValueError(f"Simbología no soportada: {symbology} (solo GS1-128)")
+    return str(lab.get("page", "A6")), int(lab.get("dpi", 300))
+
+
+def clean_lot(lot) -> str:
+    """Lote -> AI 10 válido: caracteres CSET 82, máximo 20 ("" si no queda nada)."""
+    s = "" if lot is None or (isinstance(lot, float) and np.isnan(lot)) else str(lot).strip()
+    return "".join(ch for ch in s if ch in _CSET82)[:AI_MAX["10"]]
+
+
+def lot_fields(lote: str, exp: str) -> List[Tuple[str, str]]:
+    """AI 17 (caducidad) y AI 10 (lote, variable: va el último para no necesitar separador)."""
+    out = []
+    if exp:
+        out.append(("17", exp))
+    if lote:
+        out.append(("10", lote))
+    return out
+
+
+def hri(fields: Sequence[Tuple[str, str]]) -> str:
+    """Texto legible bajo el código: (00) 0123... (17) 270131 (10) LOTE."""
+    return " ".join(f"({ai}) {v}" for ai, v in fields)
+
+
+def _element_string(fields: Sequence[Tuple[str, str]]) -> str:
+    parts = []
+    for i, (ai, v) in enumerate(fields):
+        v = str(v)
+        if ai in AI_FIXED:
+            if len(v) != AI_FIXED[ai] or not v.isdigit():
+                raise ValueError(f"AI ({ai}) requiere {AI_FIXED[ai]} dígitos: {v!r}")
+        elif not v or len(v) > AI_MAX.get(ai, 90):
+            raise ValueError(f"AI ({ai}) con longitud no válida: {v!r}")
+        parts.append(ai + v)
+        if ai not in AI_FIXED and i < len(fields) - 1:
+            parts.append(_GS)
+    return "".join(parts)
+
+
+def _digit_run(data: str, i: int) -> int:
+    j = i
+    while j < len(data) and "0" <= data[j] <= "9":
+        j += 1
+    return j - i
+
+
+@lru_cache(maxsize=4096)
+def _encode(data: str) -> Tuple[int, ...]:
+    """Datos (con _GS como FNC1) -> valores Code 128 con Start, FNC1 inicial, check y Stop."""
+    run = _digit_run(data, 0)
+    mode = "C" if run >= 2 else "B"
+    vals = [START_C if mode == "C" else START_B, FNC1]
+    i, n = 0, len(data)
+    while i < n:
+        ch = data[i]
+        if ch == _GS:
+            vals.append(FNC1)
+            i += 1
+            continue
+        run = _digit_run(data, i)
+        if mode == "C":
+            if run >= 2:
+                vals.append(int(data[i:i + 2]))
+                i += 2
+                continue
+            vals.append(CODE_B)
+            mode = "B"
+        # B: pasar a C si compensa (4 dígitos al final, 6 en medio); impar -> primero uno en B
+        if run >= (4 if i + run == n else 6):
+            if run % 2:
+                vals.append(ord(ch) - 32)
+                i += 1
+            vals.append(CODE_C)
+            mode = "C"
+            continue
+        if not " " <= ch <= "~":
+            raise ValueError(f"Carácter no codificable en Code 128: {ch!r}")
+        vals.append(ord(ch) - 32)
+        i += 1
+    vals.append((vals[0] + sum(p * v for p, v in enumerate(vals[1:], start=1))) % 103)
+    vals.append(STOP)
+    return tuple(vals)
+
+
+def encode_gs1_128(fields: Sequence[Tuple[str, str]]) -> Tuple[int, ...]:
+    """
+    AIs [(ai, valor), ...] -> valores de símbolo GS1-128 (Start, FNC1, datos en set C/B,
+    FNC1 tras cada AI variable que no sea el último, dígito de control y Stop).
+    Los símbolos de lote/caducidad se repiten entre cajas y salen de la caché.
+    """
+    return _encode(_element_string(fields))
+
+
+def symbol_modules(values: Sequence[int]) -> int:
+    """Anchura del símbolo en módulos (sin zonas de silencio)."""
+    return 11 * (len(values) - 1) + 13
+
+
+def _as_frame(x, cols: List[str]) -> pd.DataFrame:
+    """Tabla de plan_packing_frames o lista de dicts de plan_packing -> DataFrame con `cols`."""
+    df = x if isinstance(x, pd.DataFrame) else pd.DataFrame(list(x))
+    return df.reindex(columns=cols).reset_index(drop=True)
+
+
+def _text(s: pd.Series) -> np.ndarray:
+    return s.fillna("").astype(str).str.strip().to_numpy(dtype=object)
+
+
+def _exp_yymmdd(s: pd.Series) -> np.ndarray:
+    """Caducidad (fecha, texto Navision o ISO) -> AAMMDD; "" si vacía o no reconocida."""
+    d = parse_dates(s.where(s.notna(), ""), "navision")
+    return d.dt.strftime("%y%m%d").fillna("").to_numpy(dtype=object)
+
+
+def iter_labels(ues, uxs) -> Iterator[Label]:
+    """
+    Salida de plan_packing (listas de dicts) o plan_packing_frames (tablas) -> etiquetas
+    en orden de impresión: cada UX seguida de las UE de sus cajas, y al final las UE
+    sin palet. Las columnas se limpian en bloque; las etiquetas se generan de una en una.
+
+    La UX lleva lote/caducidad solo si todas sus cajas comparten el mismo valor.
+    """
+    ue = _as_frame(ues, ["item_as", "codigo_navision", "desc_navision", "qty", "lote", "exp_date", "sscc", "ux_sscc"])
+    ux = _as_frame(uxs, ["sscc", "item_as", "codigo_navision", "desc_navision", "boxes"])
+
+    codes, uniques = pd.factorize(ue["lote"].fillna(""))
+    ue_lot = np.array([clean_lot(v) for v in uniques] + [""], dtype=object)[codes]
+    ue_exp = _exp_yymmdd(ue["exp_date"])
+    ue_sscc, ue_ux = _text(ue["sscc"]), _text(ue["ux_sscc"])
+    ue_qty = pd.to_numeric(ue["qty"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    ue_item, ue_nav, ue_desc = _text(ue["item_as"]), _text(ue["codigo_navision"]), _text(ue["desc_navision"])
+
+    ux_sscc = _text(ux["sscc"])
+    pos = pd.Series(np.arange(len(ux)), index=ux_sscc)
+    pos = pos[~pos.index.duplicated()]
+    ue_pos = pd.Series(ue_ux).map(pos).fillna(len(ux)).to_numpy(dtype=np.int64)
+    order = np.argsort(ue_pos, kind="stable")
+    bounds = np.searchsorted(ue_pos[order], np.arange(len(ux) + 2))
+
+    # lote/caducidad del palet: el de sus cajas si es único
+    by_ux = pd.DataFrame({"ux": ue_pos, "lote": ue_lot, "exp": ue_exp}).groupby("ux")
+    ux_lot = by_ux["lote"].agg(lambda v: v.iloc[0] if v.nunique() == 1 else "")
+    ux_exp = by_ux["exp"].agg(lambda v: v.iloc[0] if v.nunique() == 1 else "")
+    # nº de cajas: columna boxes (tablas) o longitud de la lista boxes (dicts); si no, las UE del palet
+    boxes = ux["boxes"].map(lambda b: len(b) if isinstance(b, list) else b)
+    boxes = pd.to_numeric(boxes, errors="coerce").fillna(pd.Series(np.diff(bounds[:len(ux) + 1]))).to_numpy(dtype=float)
+    ux_item, ux_nav, ux_desc = _text(ux["item_as"]), _text(ux["codigo_navision"]), _text(ux["desc_navision"])
+
+    count("labels.UX", len(ux))
+    count("labels.UE", len(ue))
+    for p in range(len(ux) + 1):
+        if p < len(ux):
+            yield Label("UX", ux_sscc[p], ux_item[p], ux_nav[p], ux_desc[p], float(boxes[p]),
+                        ux_lot.get(p, ""), ux_exp.get(p, ""), "")
+        for i in order[bounds[p]:bounds[p + 1]]:
+            yield Label("UE", ue_sscc[i], ue_item[i], ue_nav[i], ue_desc[i], float(ue_qty[i]),
+                        ue_lot[i], ue_exp[i], ue_ux[i])
+
+
+def cli():
+    import argparse
+    from ..io.readers_warehouse import read_mapping_csv, read_po_csv
+    from ..io.writers_labels import write_labels
+    from .da_build import exceptions_path, write_exceptions
+    from .packing import packing_exceptions, plan_packing_frames
+    p = argparse.ArgumentParser(description="Etiquetas GS1-128 UX/UE de un PO (reserva SSCC)")
+    p.add_argument("--po", required=True, help="CSV AirSupply del pedido")
+    p.add_argument("--map", required=True, help="Mapping (CSV) con UnitsPerBox / BoxesPerPallet")
+    p.add_argument("--out", required=True, help="Salida .pdf (multipágina) o directorio para PNG")
+    p.add_argument("--config", default=CFG_DEF, help="Config DA (bloque label: page, dpi)")
+    p.add_argument("--raster", action="store_true", help="PDF con páginas rasterizadas a los dpi de la config")
+    p.add_argument("--workers", type=int, default=None, help="Procesos para rasterizar (PNG / --raster; por defecto nº de CPUs)")
+    p.add_argument("--dry-run", action="store_true", help="SSCC provisionales: no consume secuencias ni escribe el contador")
+    add_profile_args(p)
+    args = p.parse_args()
+    page, dpi = label_settings(args.config)
+    with session_from_args(args):
+        with sscc_preview() if args.dry_run else nullcontext():
+            po = read_po_csv(args.po)
+            ue, ux = plan_packing_frames(po, pd.DataFrame(), read_mapping_csv(args.map), args.config)
+        n = write_labels(iter_labels(ue, ux), args.out, page, dpi, args.raster, args.workers)
+        exceptions = packing_exceptions(po)
+        write_exceptions(exceptions, args.out)
+    print(f"OK: {n} etiquetas ({len(ux)} UX, {len(ue)} UE) -> {args.out}" + (" [SSCC provisionales]" if args.dry_run else ""))
+    if not exceptions.empty:
+        print(f"Excepciones -> {exceptions_path(args.out)}: qty_invalid {len(exceptions)}")
+
+
+if __name__ == "__main__":
+    cli()
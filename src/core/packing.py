@@ -1,95 +1,197 @@
 from __future__ import annotations
-import math
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from .sscc import next_ue, next_ux
+from ..io.profiling import count, profiled
+from .desc_index import DescriptionIndex, index_for
+from .sscc import CFG_DEF, reserve_block
 
+UE_COLS = ["item_as", "codigo_navision", "desc_navision", "qty", "lote", "mfg_date", "exp_date", "albaran", "sscc", "ux_sscc"]
+UX_COLS = ["sscc", "item_as", "codigo_navision", "desc_navision"]
+# columnas de trazabilidad de la resolución del mapping (item | desc | none)
+MATCH_COLS = ["map_method", "map_score"]
+# cantidad PO: primera columna no vacía
+QTY_COLS = ["Requested quantity", "Ordered Quantity"]
 
-def plan_packing(po_df: pd.DataFrame, wh_df: pd.DataFrame, map_df: pd.DataFrame):
+
+def _first_nonempty(df: pd.DataFrame, candidates: list[str]) -> pd.Series:
+    """Primer valor no vacío entre varias columnas candidatas (como `a or b` por fila)."""
+    out = pd.Series("", index=df.index, dtype=object)
+    for c in reversed(candidates):
+        if c in df.columns:
+            vals = df[c].fillna("").astype(str)
+            out = vals.where(vals != "", out)
+    return out
+
+
+def _po_qty(po_df: pd.DataFrame) -> pd.Series:
+    """Cantidad PO con coma o punto decimal (como da_build); NaN si vacía o no numérica."""
+    raw = _first_nonempty(po_df, QTY_COLS).str.strip()
+    return pd.to_numeric(raw.str.replace(",", ".", regex=False), errors="coerce")
+
+
+def packing_exceptions(po_df: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de excepciones (columnas de da_build) de las líneas sin cajas por cantidad vacía o no numérica."""
+    from .da_build import _exceptions
+    lines = np.flatnonzero(_po_qty(po_df).isna().to_numpy()) + 1
+    return _exceptions(lines, po_df, "qty_invalid", "packing")
+
+
+def _positive_int(s: pd.Series) -> np.ndarray:
+    """UnitsPerBox / BoxesPerPallet -> entero >= 1 (1 si vacío o no numérico)."""
+    v = np.trunc(pd.to_numeric(s, errors="coerce").to_numpy(dtype=float))
+    return np.where(np.isfinite(v) & (v >= 1), v, 1).astype(np.int64)
+
+
+@profiled("packing.resolve_mapping")
+def _resolve_mapping(lines: pd.DataFrame, map_df: pd.DataFrame, desc_index: DescriptionIndex | None = None) -> pd.DataFrame:
+    """Añade codigo_navision, desc_navision, units_per_box, boxes_per_pallet y map_method/map_score a cada línea."""
+    n = len(lines)
+    res = pd.DataFrame({
+        "map_row": np.full(n, -1, dtype=np.int64),
+        "map_method": "none",
+        "map_score": 0.0,
+    }, index=lines.index)
+
+    if "Codigo_SAP_ItemNumber" in map_df.columns:
+        # primera fila del mapping por item (equivale a match.iloc[0])
+        first = pd.Series(np.arange(len(map_df)), index=map_df["Codigo_SAP_ItemNumber"].to_numpy())
+        first = first[~first.index.duplicated(keep="first")]
+        res["map_row"] = lines["item_as"].map(first).fillna(-1).astype(np.int64)
+        by_item = res["map_row"] >= 0
+        res.loc[by_item, "map_method"] = "item"
+        res.loc[by_item, "map_score"] = 1.0
+
+    if "Descripcion" in map_df.columns:
+        # fallback por descripción: índice precalculado, una consulta por descripción distinta
+        pending = res["map_row"] < 0
+        if pending.any():
+            index = desc_index if desc_index is not None else index_for(map_df)
+            for desc, idx in lines.loc[pending].groupby("desc").groups.items():
+                hit = index.best(desc)
+                if hit is not None:
+                    res.loc[idx, ["map_row", "map_method", "map_score"]] = [hit[0], "desc", hit[1]]
+
+    rows = res["map_row"].to_numpy()
+    has = rows >= 0
+    take = np.where(has, rows, 0)
+
+    def _col(name: str, default) -> np.ndarray:
+        if name not in map_df.columns or map_df.empty:
+            return np.full(n, default, dtype=object)
+        vals = map_df[name].to_numpy(dtype=object)[take]
+        return np.where(has, vals, default)
+
+    res["codigo_navision"] = _col("Codigo_Navision", "")
+    res["desc_navision"] = _col("Descripcion", "")
+    res["units_per_box"] = np.where(has, _positive_int(pd.Series(_col("UnitsPerBox", 1))), 1)
+    res["boxes_per_pallet"] = np.where(has, _positive_int(pd.Series(_col("BoxesPerPallet", 1))), 1)
+    return res
+
+
+@profiled("packing.plan_packing_frames")
+def plan_packing_frames(po_df: pd.DataFrame, wh_df: pd.DataFrame, map_df: pd.DataFrame,
+                        cfg_path: str | Path = CFG_DEF,
+                        desc_index: DescriptionIndex | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Planificador columnar: PO + mapping -> tablas de UEs (cajas) y UXs (palets).
+
+    Un merge para el mapping, nº de cajas/palets con ceil vectorizado y SSCC de un
+    bloque reservado por tipo. Retorna (ue_df, ux_df); `line` es la posición de la
+    línea en el PO y `boxes` (en ux_df) el nº de cajas del palet. map_method/map_score
+    indican cómo se resolvió el mapping de la línea (item, desc por índice o none).
+    Las líneas con cantidad vacía o no numérica no generan cajas: ver packing_exceptions.
+    """
+    ue_empty = pd.DataFrame(columns=["line"] + UE_COLS + MATCH_COLS)
+    ux_empty = pd.DataFrame(columns=["line"] + UX_COLS + ["boxes"] + MATCH_COLS)
+    if po_df.empty:
+        return ue_empty, ux_empty
+
+    lines = pd.DataFrame({
+        "line": np.arange(len(po_df)),
+        "item_as": _first_nonempty(po_df, ["Item Number", "Customer Material Number"]).to_numpy(),
+        "qty": _po_qty(po_df).fillna(0.0).to_numpy(),
+        "desc": (po_df["PO Line Desc."].fillna("").astype(str).str.strip().str.lower().to_numpy()
+                 if "PO Line Desc." in po_df.columns else ""),
+    })
+    lines = lines.join(_resolve_mapping(lines, map_df, desc_index))
+    lines = lines.loc[lines["qty"] > 0].reset_index(drop=True)
+    if lines.empty:
+        return ue_empty, ux_empty
+
+    qty = lines["qty"].to_numpy(dtype=float)
+    upb = lines["units_per_box"].to_numpy(dtype=np.int64)
+    bpp = lines["boxes_per_pallet"].to_numpy(dtype=np.int64)
+    n_boxes = np.ceil(qty / upb).astype(np.int64)
+    n_pallets = np.ceil(n_boxes / bpp).astype(np.int64)
+    count("rows.packing_lines", len(lines))
+
+    # SSCC de todo el pedido: un bloque UX y otro UE
+    ux_sscc = np.array(reserve_block("UX", int(n_pallets.sum()), cfg_path), dtype=object)
+    ue_sscc = np.array(reserve_block("UE", int(n_boxes.sum()), cfg_path), dtype=object)
+
+    # UX: una fila por palet
+    ux_line = np.repeat(np.arange(len(lines)), n_pallets)
+    ux_first = np.concatenate([[0], np.cumsum(n_pallets)[:-1]])
+    ux_pos = np.arange(len(ux_line)) - ux_first[ux_line]
+    ux_df = pd.DataFrame({
+        "line": lines["line"].to_numpy()[ux_line],
+        "sscc": ux_sscc,
+        "item_as": lines["item_as"].to_numpy()[ux_line],
+        "codigo_navision": lines["codigo_navision"].to_numpy()[ux_line],
+        "desc_navision": lines["desc_navision"].to_numpy()[ux_line],
+        "boxes": np.minimum(bpp[ux_line], n_boxes[ux_line] - ux_pos * bpp[ux_line]),
+        "map_method": lines["map_method"].to_numpy()[ux_line],
+        "map_score": lines["map_score"].to_numpy(dtype=float)[ux_line],
+    })
+
+    # UE: una fila por caja, asignada a los palets de su propia línea
+    ue_line = np.repeat(np.arange(len(lines)), n_boxes)
+    ue_first = np.concatenate([[0], np.cumsum(n_boxes)[:-1]])
+    ue_pos = np.arange(len(ue_line)) - ue_first[ue_line]
+    ue_df = pd.DataFrame({
+        "line": lines["line"].to_numpy()[ue_line],
+        "item_as": lines["item_as"].to_numpy()[ue_line],
+        "codigo_navision": lines["codigo_navision"].to_numpy()[ue_line],
+        "desc_navision": lines["desc_navision"].to_numpy()[ue_line],
+        "qty": np.minimum(upb[ue_line], qty[ue_line] - ue_pos * upb[ue_line]),
+        "lote": "",
+        "mfg_date": "",
+        "exp_date": "",
+        "albaran": "",
+        "sscc": ue_sscc,
+        "ux_sscc": ux_sscc[ux_first[ue_line] + ue_pos // bpp[ue_line]] if len(ue_line) else np.array([], dtype=object),
+        "map_method": lines["map_method"].to_numpy()[ue_line],
+        "map_score": lines["map_score"].to_numpy(dtype=float)[ue_line],
+    })
+    return ue_df, ux_df
+
+
+def packing_records(ue_df: pd.DataFrame, ux_df: pd.DataFrame) -> tuple[list[dict], list[dict]]:
+    """Vista de compatibilidad: tablas UE/UX -> listas de dicts (UX con su lista `boxes`), con map_method/map_score."""
+    ues = ue_df[UE_COLS + MATCH_COLS].to_dict("records")
+    uxs = [dict(r, boxes=[]) for r in ux_df[UX_COLS + MATCH_COLS].to_dict("records")]
+    by_sscc = {ux["sscc"]: ux for ux in uxs}
+    for ue in ues:
+        pallet = by_sscc.get(ue["ux_sscc"])
+        if pallet is not None:
+            pallet["boxes"].append(ue)
+    return ues, uxs
+
+
+def plan_packing(po_df: pd.DataFrame, wh_df: pd.DataFrame, map_df: pd.DataFrame, cfg_path: str | Path = CFG_DEF,
+                 desc_index: DescriptionIndex | None = None):
     """
     Genera estructura de empaquetado (UEs y UXs) a partir del pedido (PO) y del mapping.
     Usa UnitsPerBox y BoxesPerPallet del mapping para definir cajas (UE) y palets (UX).
+    Los SSCC se reservan en un bloque por tipo (una sola escritura del contador).
 
     Retorna:
         ues: lista de dicts con info por caja (UE)
         uxs: lista de dicts con info por palet (UX)
-    """
-
-    ues = []
-    uxs = []
 
+    Para pedidos grandes usar plan_packing_frames (sin dicts por caja).
+    """
     if po_df.empty:
-        return ues, uxs
-
-    for _, row in po_df.iterrows():
-        item_as = row.get("Item Number", "") or row.get("Customer Material Number", "")
-        qty = float(row.get("Requested quantity", 0) or row.get("Ordered Quantity", 0) or 0)
-
-        # Buscar correspondencia en el mapping
-        match = map_df.loc[map_df["Codigo_SAP_ItemNumber"] == item_as] if "Codigo_SAP_ItemNumber" in map_df.columns else pd.DataFrame()
-        if match.empty:
-            # intentar coincidencia por descripción parcial
-            desc = str(row.get("PO Line Desc.", "")).strip().lower()
-            match = map_df[map_df["Descripcion"].str.lower().str.contains(desc, na=False)] if "Descripcion" in map_df.columns else pd.DataFrame()
-
-        # valores por defecto
-        units_per_box = 1
-        boxes_per_pallet = 1
-        codigo_navision = ""
-        desc_navision = ""
-
-        if not match.empty:
-            m = match.iloc[0]
-            codigo_navision = m.get("Codigo_Navision", "")
-            desc_navision = m.get("Descripcion", "")
-            try:
-                units_per_box = int(float(m.get("UnitsPerBox", 1)))
-                boxes_per_pallet = int(float(m.get("BoxesPerPallet", 1)))
-            except Exception:
-                pass
-
-        if qty <= 0:
-            continue
-
-        total_boxes = math.ceil(qty / units_per_box)
-        total_pallets = math.ceil(total_boxes / boxes_per_pallet)
-
-        # Crear UX (palets)
-        for ux_idx in range(total_pallets):
-            ux_sscc = next_ux()
-            ux_entry = {
-                "sscc": ux_sscc,
-                "item_as": item_as,
-                "codigo_navision": codigo_navision,
-                "desc_navision": desc_navision,
-                "boxes": [],
-            }
-            uxs.append(ux_entry)
-
-        # Crear UE (cajas)
-        box_counter = 0
-        pallet_idx = 0
-        for b in range(total_boxes):
-            ue_sscc = next_ue()
-            pallet_sscc = uxs[pallet_idx]["sscc"] if uxs else ""
-            qty_this_box = min(units_per_box, qty - (b * units_per_box))
-            ue_entry = {
-                "item_as": item_as,
-                "codigo_navision": codigo_navision,
-                "desc_navision": desc_navision,
-                "qty": qty_this_box,
-                "lote": "",
-                "mfg_date": "",
-                "exp_date": "",
-                "albaran": "",
-                "sscc": ue_sscc,
-                "ux_sscc": pallet_sscc,
-            }
-            ues.append(ue_entry)
-            uxs[pallet_idx]["boxes"].append(ue_entry)
-            box_counter += 1
-            if box_counter >= boxes_per_pallet:
-                box_counter = 0
-                pallet_idx = min(pallet_idx + 1, len(uxs) - 1)
-
-    return ues, uxs
+        return [], []
+    return packing_records(*plan_packing_frames(po_df, wh_df, map_df, cfg_path, desc_index))
@@ -1,13 +1,20 @@
 from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-import yaml
-from .counters import next_value
+from typing import Dict, Iterable, Iterator, Optional
+import numpy as np
+import pandas as pd
+from ..io.cache import load_yaml
+from ..io.profiling import count, profiled
+from .counters import peek_value
+from .counters import reserve_block as _reserve_seqs
 
 CFG_DEF = "config/config.da.yaml"
 
 def load_cfg(cfg_path: str | Path = CFG_DEF) -> dict:
-    with open(cfg_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    # cacheada por (ruta, mtime, tamaño): no se re-parsea el YAML en cada SSCC
+    return load_yaml(cfg_path)
 
 def calc_check_digit(base17: str) -> int:
     digits = [int(c) for c in base17 if c.isdigit()]
@@ -36,21 +43,182 @@ def make_sscc(arp_id: str, seq: int, year_prefix: str) -> str:
     cd = calc_check_digit(base17)
     return base17 + str(cd)
 
-def next_ux(cfg_path: str | Path = CFG_DEF) -> str:
+# pesos GS1 módulo 10 para los 17 dígitos base (de izquierda a derecha: 3,1,3,...,3)
+_GS1_WEIGHTS = np.tile(np.array([3, 1], dtype=np.int64), 9)[:17]
+
+def _check_digits(digits: np.ndarray) -> np.ndarray:
+    """Dígitos de control para una matriz (n, 17) de dígitos."""
+    return (10 - (digits @ _GS1_WEIGHTS) % 10) % 10
+
+def _digits_to_str(digits: np.ndarray) -> np.ndarray:
+    """Matriz (n, k) de dígitos -> array de strings de k caracteres."""
+    k = digits.shape[1]
+    return (digits.astype(np.uint8) + ord("0")).view(f"S{k}").ravel().astype(str)
+
+def validate_sscc(sscc: str) -> bool:
+    s = str(sscc).strip()
+    if len(s) != 18 or not s.isascii() or not s.isdigit():
+        return False
+    return calc_check_digit(s[:17]) == int(s[17])
+
+def make_sscc_many(arp_id: str, seqs: Iterable[int], year_prefix: str) -> pd.Series:
+    """
+    Versión vectorizada de make_sscc: genera un SSCC-18 por secuencia.
+    arp_id y year_prefix se validan una sola vez; el dígito de control se
+    calcula con NumPy sobre la matriz de dígitos.
+    """
+    if not (arp_id and arp_id.isdigit() and len(arp_id) == 6):
+        raise ValueError("arp_id debe ser 6 dígitos")
+    _seq_block(year_prefix, 0)  # valida year_prefix
+    yp = "".join(ch for ch in str(year_prefix) if ch.isdigit())
+    width = 10 - len(yp)
+    seq_arr = np.asarray(seqs if hasattr(seqs, "__len__") else list(seqs), dtype=np.int64).ravel()
+    if seq_arr.size and (seq_arr.min() < 0 or seq_arr.max() >= 10**width):
+        raise ValueError("seq fuera de rango para el prefix dado")
+
+    prefix = np.array([int(c) for c in f"0{arp_id}{yp}"], dtype=np.int64)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    seq_digits = (seq_arr[:, None] // powers) % 10
+    base = np.hstack([np.broadcast_to(prefix, (seq_arr.size, prefix.size)), seq_digits])
+    full = np.hstack([base, _check_digits(base)[:, None]])
+    return pd.Series(_digits_to_str(full) if seq_arr.size else [], dtype=object)
+
+def validate_sscc_many(series: Iterable[str]) -> pd.Series:
+    """
+    Valida en bloque SSCC-18 (18 dígitos ASCII y dígito de control GS1 correcto).
+    Devuelve una Series booleana alineada con la entrada.
+    """
+    s = series if isinstance(series, pd.Series) else pd.Series(list(series), dtype=object)
+    txt = s.astype(str).str.strip()
+    shaped = txt.str.fullmatch(r"[0-9]{18}").fillna(False).astype(bool)
+    valid = pd.Series(False, index=s.index)
+    if shaped.any():
+        raw = "".join(txt[shaped].tolist()).encode("ascii")
+        digits = (np.frombuffer(raw, dtype=np.uint8) - ord("0")).astype(np.int64).reshape(-1, 18)
+        valid.loc[shaped] = _check_digits(digits[:, :17]) == digits[:, 17]
+    return valid
+
+def _settings(cfg_path: str | Path) -> tuple[str, str, str, str]:
+    """(state_path, arp_id, year_prefix, backend) de la config SSCC."""
     cfg = load_cfg(cfg_path)
-    st_path = cfg["sscc"]["state_path"]
-    arp_id = cfg["arp_id"]
-    ypref = cfg["sscc"]["year_prefix"]
-    seq = next_value("UX", st_path)
-    return make_sscc(arp_id, seq, ypref)
+    return cfg["sscc"]["state_path"], cfg["arp_id"], cfg["sscc"]["year_prefix"], cfg["sscc"].get("backend", "json")
+
+# =========================
+# Vista previa: SSCC provisionales sin consumir secuencias
+# =========================
+class SSCCPreview:
+    """
+    Reserva virtual para vistas previas: las secuencias salen de una foto del contador
+    (último valor por tipo, leído una vez) y no se escribe el estado. Con el mismo contador
+    la misma entrada da los mismos SSCC.
+
+    commit() reserva de verdad un bloque por tipo con lo asignado y finalize() reescribe
+    los SSCC provisionales a los definitivos (iguales si nadie reservó entre medias):
+    la secuencia queda sin huecos aunque se repita la vista previa.
+    """
+
+    def __init__(self, cfg_path: str | Path | None = None):
+        self.cfg_path = cfg_path
+        self.base: Dict[str, int] = {}
+        self.used: Dict[str, int] = {}
+        self.blocks: Optional[Dict[str, range]] = None
+
+    def allocate(self, kind: str, n: int, cfg_path: str | Path = CFG_DEF) -> list[str]:
+        """Como reserve_block, pero desde la foto del contador (sin escrituras)."""
+        if self.blocks is not None:
+            raise ValueError("La vista previa ya está confirmada: crear otra SSCCPreview")
+        if n < 0:
+            raise ValueError("n debe ser >= 0")
+        if self.cfg_path is None:
+            self.cfg_path = cfg_path
+        elif Path(self.cfg_path) != Path(cfg_path):
+            raise ValueError(f"Vista previa de {self.cfg_path}: no admite SSCC de {cfg_path}")
+        st_path, arp_id, ypref, backend = _settings(self.cfg_path)
+        if kind not in self.base:
+            self.base[kind] = peek_value(kind, st_path, backend)
+        start = self.base[kind] + self.used.get(kind, 0) + 1
+        self.used[kind] = self.used.get(kind, 0) + n
+        count(f"sscc.preview_{kind}", n)
+        return make_sscc_many(arp_id, range(start, start + n), ypref).tolist()
+
+    @profiled("sscc.preview_commit")
+    def commit(self) -> Dict[str, range]:
+        """Reserva (una vez) un bloque por tipo del tamaño asignado; devuelve los rangos de secuencia."""
+        if self.blocks is None:
+            blocks = {}
+            if self.used:
+                st_path, _, _, backend = _settings(self.cfg_path)
+                for kind, n in self.used.items():
+                    blocks[kind] = _reserve_seqs(kind, n, st_path, backend)
+                    count(f"sscc.allocated_{kind}", n)
+            self.blocks = blocks
+        return self.blocks
+
+    def finalize(self, values, kind: str):
+        """
+        SSCC provisionales de `kind` -> definitivos (hace commit() si falta). Devuelve un
+        array de objetos; valores que no son de esta vista previa (vacíos, reales) no cambian.
+        """
+        blocks = self.commit()
+        if isinstance(values, str):
+            return values
+        arr = np.asarray(values, dtype=object)
+        n = self.used.get(kind, 0)
+        first = self.base.get(kind, 0) + 1
+        if not n or blocks[kind].start == first:
+            return arr
+        _, arp_id, ypref, _ = _settings(self.cfg_path)
+        preview = pd.Index(make_sscc_many(arp_id, range(first, first + n), ypref))
+        final = make_sscc_many(arp_id, blocks[kind], ypref).to_numpy()
+        pos = preview.get_indexer(arr)
+        hit = pos >= 0
+        out = arr.copy()
+        out[hit] = final[pos[hit]]
+        count(f"sscc.rewritten_{kind}", int(hit.sum()))
+        return out
+
+    def finalize_table(self, table, columns: Dict[str, str]):
+        """finalize() en sitio de cada columna {columna: tipo} presente (DataFrame o DAColumns)."""
+        for col, kind in columns.items():
+            if col in table.columns:
+                table[col] = self.finalize(table[col], kind)
+        return table
+
+_PREVIEW: ContextVar[Optional[SSCCPreview]] = ContextVar("sscc_preview", default=None)
+
+@contextmanager
+def sscc_preview(preview: SSCCPreview | None = None) -> Iterator[SSCCPreview]:
+    """
+    Dentro del bloque reserve_block / next_ue / next_ux asignan de `preview` (nueva si
+    no se pasa) en vez de reservar: planificar, DA y etiquetas sin tocar el contador.
+    """
+    preview = preview if preview is not None else SSCCPreview()
+    token = _PREVIEW.set(preview)
+    try:
+        yield preview
+    finally:
+        _PREVIEW.reset(token)
+
+@profiled("sscc.reserve_block")
+def reserve_block(kind: str, n: int, cfg_path: str | Path = CFG_DEF) -> list[str]:
+    """
+    Reserva n SSCC-18 consecutivos de tipo `kind` ("UE" o "UX") en una sola
+    transacción del contador y devuelve la lista en orden de secuencia.
+    Dentro de sscc_preview() los SSCC son provisionales y no se escribe el contador.
+    """
+    preview = _PREVIEW.get()
+    if preview is not None:
+        return preview.allocate(kind, n, cfg_path)
+    st_path, arp_id, ypref, backend = _settings(cfg_path)
+    seqs = _reserve_seqs(kind, n, st_path, backend)
+    count(f"sscc.allocated_{kind}", n)
+    return make_sscc_many(arp_id, seqs, ypref).tolist()
+
+def next_ux(cfg_path: str | Path = CFG_DEF) -> str:
+    return reserve_block("UX", 1, cfg_path)[0]
 
 def next_ue(cfg_path: str | Path = CFG_DEF) -> str:
-    cfg = load_cfg(cfg_path)
-    st_path = cfg["sscc"]["state_path"]
-    arp_id = cfg["arp_id"]
-    ypref = cfg["sscc"]["year_prefix"]
-    seq = next_value("UE", st_path)
-    return make_sscc(arp_id, seq, ypref)
+    return reserve_block("UE", 1, cfg_path)[0]
 
 if __name__ == "__main__":
     print("UX:", next_ux())
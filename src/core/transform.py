@@ -1,6 +1,7 @@
 from __future__ import annotations
 import pandas as pd
 from typing import Dict, List, Optional
+from ..io.profiling import count, profiled
 
 # Columnas candidatas AirSupply → claves internas
 AS_COLS: Dict[str, List[str]] = {
@@ -18,6 +19,7 @@ def _first_existing(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
             return c
     return None
 
+@profiled("transform.select_minimal_columns")
 def select_minimal_columns(df: pd.DataFrame) -> pd.DataFrame:
     cols_map: Dict[str, Optional[str]] = {k: _first_existing(df, v) for k, v in AS_COLS.items()}
     missing = [k for k, v in cols_map.items() if v is None and k in ("po_number", "item_number", "qty", "price_unit", "currency")]
@@ -29,6 +31,7 @@ def select_minimal_columns(df: pd.DataFrame) -> pd.DataFrame:
         out[key] = df[col] if col else ""
     return out
 
+@profiled("transform.apply_mapping")
 def apply_mapping(min_df: pd.DataFrame, map_df: pd.DataFrame) -> pd.DataFrame:
     return min_df.merge(
         map_df,
@@ -37,6 +40,20 @@ def apply_mapping(min_df: pd.DataFrame, map_df: pd.DataFrame) -> pd.DataFrame:
         how="left",
     )
 
+@profiled("transform.apply_mapping_lookup")
+def apply_mapping_lookup(min_df: pd.DataFrame, lookup: Dict) -> pd.DataFrame:
+    """
+    Equivalente a apply_mapping contra un dict item → MappingEntry (readers_mapping.MappingTable.lookup).
+    Pensado para el modo streaming: sin merge por bloque; si un item está repetido en el mapping gana la primera fila.
+    """
+    out = min_df.copy()
+    hits = out["item_number"].map(lookup)
+    out["Codigo_SAP_ItemNumber"] = out["item_number"].where(hits.notna())
+    out["Codigo_Navision"] = hits.map(lambda e: e.codigo_navision, na_action="ignore")
+    out["Descripcion"] = hits.map(lambda e: e.descripcion, na_action="ignore")
+    return out
+
+@profiled("transform.build_navision_frame")
 def build_navision_frame(merged: pd.DataFrame, fixed: dict, salida_cols: List[str]) -> pd.DataFrame:
     df = pd.DataFrame()
 
@@ -55,5 +72,6 @@ def build_navision_frame(merged: pd.DataFrame, fixed: dict, salida_cols: List[st
     df["Divisa"]           = merged["currency"]
     df["Fecha Entrega"]    = merged["delivery_date"]
 
+    count("rows.sales_order", len(df))
     return df.reindex(columns=salida_cols)
 
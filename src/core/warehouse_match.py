@@ -2,10 +2,15 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Iterable, Optional
-import json
+import atexit
+import numpy as np
 import pandas as pd
+from ..io.dates import parse_dates, unparsed_summary
+from ..io.event_log import EventLog
+from ..io.profiling import count, profiled, span
+from ..io.warehouse_store import WarehouseStore
 
-LOG_PATH = Path("data/state/da_log.json")
+LOG_PATH = Path("data/state/da_log.jsonl")
 
 # --------- utilidades ---------
 def _first_col(df: pd.DataFrame, candidates: Iterable[str]) -> Optional[str]:
@@ -14,181 +19,275 @@ def _first_col(df: pd.DataFrame, candidates: Iterable[str]) -> Optional[str]:
             return c
     return None
 
-def _ensure_datetime(s: pd.Series) -> pd.Series:
-    try:
-        return pd.to_datetime(s, dayfirst=True, errors="coerce")
-    except Exception:
-        return pd.to_datetime(pd.Series([], dtype="datetime64[ns]"))
+def _ensure_datetime(s: pd.Series, source: str = "navision") -> pd.Series:
+    """Fechas con los formatos explícitos del origen; lo no reconocido se registra en el log."""
+    out = parse_dates(s, source)
+    if out.attrs["unparsed"]:
+        _log_event({"level": "warn", "where": "warehouse", "column": str(s.name), "msg": unparsed_summary(out)})
+    return out
+
+_SINK: Optional[EventLog] = None
+
+def _sink() -> EventLog:
+    global _SINK
+    if _SINK is None or _SINK.path != Path(LOG_PATH):
+        if _SINK is not None:
+            _SINK.flush()
+        _SINK = EventLog(LOG_PATH)
+    return _SINK
 
 def _log_event(event: dict) -> None:
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if LOG_PATH.exists():
-        try:
-            data = json.loads(LOG_PATH.read_text(encoding="utf-8"))
-            if not isinstance(data, list):
-                data = []
-        except json.JSONDecodeError:
-            data = []
-    else:
-        data = []
-    data.append(event)
-    LOG_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    _sink().emit(event)
+
+def flush_log() -> None:
+    if _SINK is not None:
+        _SINK.flush()
+
+atexit.register(flush_log)
 
 # --------- normalización ---------
+# registro de alias: campo normalizado -> cabeceras aceptadas (la primera presente gana)
+PO_ALIASES = {
+    "po_number": ["PO", "PO Number", "PO_PoNumber"],
+    "item_as": ["Item Number", "Customer Material Number", "Material Number"],
+    "qty_as": ["Requested quantity", "Ordered Quantity", "Quantity"],
+}
+MAP_ALIASES = {
+    "item_as": ["Codigo_SAP_ItemNumber", "Item_AS", "ItemNumber_AS"],
+    "item_nav": ["Codigo_Navision", "Item_Nav", "ItemNumber_Nav"],
+    "desc_nav": ["Descripcion", "Description"],
+}
+# nombres posibles vistos en tu Excel
+WH_ALIASES = {
+    "doc_type": ["Tipo documento", "Tipo documento ", "Tipo movimiento", "Tipo"],
+    "albaran": ["Nº documento", "No documento", "Nº doc.", "Albarán"],
+    "item_nav": ["PN GECI", "Nº producto", "Producto", "Item"],
+    "lot": ["Nº lote", "Lote"],
+    "mfg_date": ["Fecha Fabricación", "Fecha fabricacion", "Fecha_Fabricacion"],
+    "exp_date": ["Fecha caducidad", "Fecha Caducidad", "Fecha_Caducidad"],
+    "qty_wh": ["Cantidad", "Qty"],
+    "customer": ["Nombre cliente", "Cliente"],
+    "move_date": ["Fecha registro", "Fecha", "Posting Date"],
+    # opcional: desempate entre movimientos de la misma fecha
+    "entry_no": ["Nº mov.", "No mov.", "Nº movimiento", "Entry No."],
+}
+WH_REQUIRED = ["doc_type", "albaran", "item_nav", "lot", "qty_wh", "move_date"]
+# filtro de salidas de venta / albarán ("Albarán venta" ya contiene "venta")
+SALE_PATTERNS = ["Albarán venta", "Venta"]
+
+_RESOLVED: dict[tuple, dict[str, Optional[str]]] = {}
+
+def _resolve(df: pd.DataFrame, aliases: dict[str, list[str]]) -> dict[str, Optional[str]]:
+    """Campo -> columna de `df` según el registro de alias (cacheado por cabecera)."""
+    key = (id(aliases), tuple(df.columns))
+    hit = _RESOLVED.get(key)
+    if hit is None:
+        hit = {field: _first_col(df, cands) for field, cands in aliases.items()}
+        _RESOLVED[key] = hit
+    return hit
+
+def _stripped(s: pd.Series, categorical: bool = False) -> pd.Series:
+    """
+    Igual que s.astype(str).str.strip(), pero calculado sobre los valores únicos.
+    categorical=True devuelve dtype category (campos de baja cardinalidad).
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    labels = pd.Index(uniques).astype(str).str.strip()
+    if categorical:
+        inv, cats = pd.factorize(labels)
+        return pd.Series(pd.Categorical.from_codes(inv[codes], cats), index=s.index)
+    return pd.Series(labels.to_numpy(dtype=object)[codes], index=s.index)
+
+def _sale_rows(doc_type: pd.Series) -> np.ndarray:
+    """Posiciones de las filas de venta; el texto solo se evalúa sobre los tipos distintos."""
+    codes, uniques = pd.factorize(doc_type, use_na_sentinel=False)
+    labels = pd.Index(uniques).astype(str).str.strip()
+    is_sale = np.zeros(len(labels), dtype=bool)
+    for pat in SALE_PATTERNS:
+        is_sale |= labels.str.contains(pat, case=False, regex=False)
+    return np.flatnonzero(is_sale[codes])
+
+@profiled("warehouse_match.normalize_po")
 def _normalize_po(po_df: pd.DataFrame) -> pd.DataFrame:
-    po_df = po_df.copy()
-    c_po = _first_col(po_df, ["PO", "PO Number", "PO_PoNumber"])
-    c_item = _first_col(po_df, ["Item Number", "Customer Material Number", "Material Number"])
-    c_qty = _first_col(po_df, ["Requested quantity", "Ordered Quantity", "Quantity"])
-    if not all([c_po, c_item, c_qty]):
+    cols = _resolve(po_df, PO_ALIASES)
+    if not all(cols.values()):
         _log_event({"level": "error", "where": "po", "msg": "Faltan columnas PO", "have": list(po_df.columns)})
         raise ValueError("PO: columnas requeridas no encontradas")
     out = pd.DataFrame({
-        "po_number": po_df[c_po].astype(str).str.strip(),
-        "item_as": po_df[c_item].astype(str).str.strip(),
-        "qty_as": pd.to_numeric(po_df[c_qty], errors="coerce").fillna(0).astype(float)
+        "po_number": _stripped(po_df[cols["po_number"]]),
+        "item_as": _stripped(po_df[cols["item_as"]]),
+        # coma o punto decimal, como el fallback de da_build
+        "qty_as": pd.to_numeric(_stripped(po_df[cols["qty_as"]]).str.replace(",", ".", regex=False), errors="coerce").fillna(0).astype(float),
+        # nº de línea del PO (1 = primera fila), para volver de cada resultado a su línea
+        "po_line": np.arange(1, len(po_df) + 1),
     })
     return out
 
+@profiled("warehouse_match.normalize_map")
 def _normalize_map(map_df: pd.DataFrame) -> pd.DataFrame:
-    map_df = map_df.copy()
-    c_item_as = _first_col(map_df, ["Codigo_SAP_ItemNumber", "Item_AS", "ItemNumber_AS"])
-    c_item_nav = _first_col(map_df, ["Codigo_Navision", "Item_Nav", "ItemNumber_Nav"])
-    c_desc = _first_col(map_df, ["Descripcion", "Description"])
-    if not all([c_item_as, c_item_nav]):
+    cols = _resolve(map_df, MAP_ALIASES)
+    if not (cols["item_as"] and cols["item_nav"]):
         _log_event({"level": "warn", "where": "map", "msg": "Faltan columnas mapping mínimas", "have": list(map_df.columns)})
         raise ValueError("Mapping: columnas requeridas no encontradas")
     out = pd.DataFrame({
-        "item_as": map_df[c_item_as].astype(str).str.strip(),
-        "item_nav": map_df[c_item_nav].astype(str).str.strip(),
-        "desc_nav": map_df[c_desc].astype(str).str.strip() if c_desc else ""
+        "item_as": _stripped(map_df[cols["item_as"]]),
+        "item_nav": _stripped(map_df[cols["item_nav"]]),
+        "desc_nav": _stripped(map_df[cols["desc_nav"]]) if cols["desc_nav"] else ""
     })
     return out
 
+@profiled("warehouse_match.normalize_wh")
 def _normalize_wh(wh_df: pd.DataFrame) -> pd.DataFrame:
-    wh_df = wh_df.copy()
-
-    # nombres posibles vistos en tu Excel
-    c_doc_type = _first_col(wh_df, ["Tipo documento", "Tipo documento ", "Tipo movimiento", "Tipo"])
-    c_doc_no = _first_col(wh_df, ["Nº documento", "No documento", "Nº doc.", "Albarán"])
-    c_item_nav = _first_col(wh_df, ["PN GECI", "Nº producto", "Producto", "Item"])
-    c_lot = _first_col(wh_df, ["Nº lote", "Lote"])
-    c_mfg = _first_col(wh_df, ["Fecha Fabricación", "Fecha fabricacion", "Fecha_Fabricacion"])
-    c_exp = _first_col(wh_df, ["Fecha caducidad", "Fecha Caducidad", "Fecha_Caducidad"])
-    c_qty = _first_col(wh_df, ["Cantidad", "Qty"])
-    c_customer = _first_col(wh_df, ["Nombre cliente", "Cliente"])
-    c_date = _first_col(wh_df, ["Fecha registro", "Fecha", "Posting Date"])
-
-    required = [c_doc_type, c_doc_no, c_item_nav, c_lot, c_qty, c_date]
-    if not all(required):
+    """
+    Movimientos de venta normalizados sin copiar el almacén: primero se filtran las
+    filas de venta y solo sobre ellas se seleccionan y limpian las columnas.
+    """
+    cols = _resolve(wh_df, WH_ALIASES)
+    if not all(cols[f] for f in WH_REQUIRED):
         _log_event({"level": "error", "where": "warehouse", "msg": "Faltan columnas warehouse", "have": list(wh_df.columns)})
         raise ValueError("Warehouse: columnas requeridas no encontradas")
 
-    out = pd.DataFrame({
-        "doc_type": wh_df[c_doc_type].astype(str).str.strip(),
-        "albaran": wh_df[c_doc_no].astype(str).str.strip(),
-        "item_nav": wh_df[c_item_nav].astype(str).str.strip(),
-        "lot": wh_df[c_lot].astype(str).str.strip() if c_lot else "",
-        "mfg_date": wh_df[c_mfg] if c_mfg else "",
-        "exp_date": wh_df[c_exp] if c_exp else "",
-        "qty_wh": pd.to_numeric(wh_df[c_qty], errors="coerce"),
-        "customer": wh_df[c_customer].astype(str).str.strip() if c_customer else "",
-        "move_date": _ensure_datetime(wh_df[c_date]),
-    })
+    # filtrar salidas de venta / albarán antes de cualquier trabajo de texto
+    rows = _sale_rows(wh_df[cols["doc_type"]])
 
-    # filtrar salidas de venta / albarán
-    mask_sale = out["doc_type"].str.contains("Albarán venta", case=False, na=False) | out["doc_type"].str.contains("Venta", case=False, na=False)
-    out = out.loc[mask_sale].reset_index(drop=True)
+    def take(field: str) -> pd.Series:
+        return wh_df[cols[field]].iloc[rows].reset_index(drop=True)
 
+    out = pd.DataFrame({
+        "doc_type": _stripped(take("doc_type"), categorical=True),
+        "albaran": _stripped(take("albaran")),
+        "item_nav": _stripped(take("item_nav")),
+        "lot": _stripped(take("lot")),
+        "mfg_date": take("mfg_date") if cols["mfg_date"] else "",
+        "exp_date": take("exp_date") if cols["exp_date"] else "",
+        "qty_wh": pd.to_numeric(take("qty_wh"), errors="coerce"),
+        "customer": _stripped(take("customer"), categorical=True) if cols["customer"] else "",
+        "move_date": _ensure_datetime(take("move_date")),
+        "entry_no": pd.to_numeric(take("entry_no"), errors="coerce") if cols["entry_no"] else np.nan,
+    })
     return out
 
 # --------- matching principal ---------
-def match_po_to_warehouse(po_df: pd.DataFrame, map_df: pd.DataFrame, wh_df: pd.DataFrame) -> pd.DataFrame:
+OUT_COLS = [
+    "PO", "Item Number", "Codigo_Navision", "Shipped Quantity",
+    "Lot", "Manufacture Date", "Expiry Date", "Albaran", "Customer", "match_status", "PO Line"
+]
+
+def _str_or_empty(s: pd.Series) -> pd.Series:
+    # mismo criterio que str(valor) por fila: Timestamp -> "YYYY-MM-DD HH:MM:SS", NaN/NaT -> ""
+    return s.astype(object).map(lambda v: "" if pd.isna(v) else str(v))
+
+@profiled("warehouse_match.latest_sale_per_item")
+def latest_sale_per_item(wh: pd.DataFrame) -> pd.DataFrame:
+    """
+    Último movimiento de venta por item_nav (move_date desc, NaT al final).
+    Empates en la fecha: mayor Nº mov. (entry_no, sin número al final) y después el
+    primero en el orden del fichero; WarehouseStore.latest_sales desempata igual.
+    Una sola ordenación estable de todo el almacén + drop_duplicates.
+    """
+    ordered = wh.sort_values(["item_nav", "move_date", "entry_no"], ascending=[True, False, False], kind="mergesort",
+                             na_position="last")
+    return ordered.drop_duplicates("item_nav", keep="first").reset_index(drop=True)
+
+@profiled("warehouse_match.match_po_to_warehouse")
+def match_po_to_warehouse(po_df: pd.DataFrame, map_df: pd.DataFrame, wh_df: pd.DataFrame | WarehouseStore) -> pd.DataFrame:
     """
     Devuelve filas listas para DA:
     PO, Item Number, Codigo_Navision, Shipped Quantity, Lot, Manufacture Date, Expiry Date, Albaran, Customer
+
+    match_status: ok | qty_warning (stock del movimiento < cantidad PO) | no_match (sin venta en almacén)
+    | no_mapping (item sin Codigo_Navision). PO Line: nº de línea del PO de origen (1 = primera).
+    `wh_df` puede ser el export de movimientos o un WarehouseStore: en ese caso solo se
+    consulta el último movimiento de venta de los items del PO, sin cargar el histórico.
+    Los eventos se acumulan en memoria y se vuelcan al log al terminar.
     """
+    try:
+        return _match(po_df, map_df, wh_df)
+    finally:
+        with span("warehouse_match.flush_log"):
+            flush_log()
+
+def _match(po_df: pd.DataFrame, map_df: pd.DataFrame, wh_df: pd.DataFrame | WarehouseStore) -> pd.DataFrame:
     po = _normalize_po(po_df)
     mp = _normalize_map(map_df)
-    wh = _normalize_wh(wh_df)
+    if not isinstance(wh_df, WarehouseStore):
+        wh = _normalize_wh(wh_df)
 
+    count("rows.po_lines", len(po))
     # PO + mapping
     merged = po.merge(mp, on="item_as", how="left", indicator=True)
     # log mapeos faltantes
     misses = merged.loc[merged["_merge"] == "left_only", ["po_number", "item_as"]]
-    for _, r in misses.iterrows():
-        _log_event({"level": "warn", "where": "mapping", "po": r["po_number"], "item_as": r["item_as"], "msg": "Código sin mapping"})
+    for po_num, item_as in misses.itertuples(index=False):
+        _log_event({"level": "warn", "where": "mapping", "po": po_num, "item_as": item_as, "msg": "Código sin mapping"})
     merged = merged.drop(columns=["_merge"])
+    merged["item_nav"] = merged["item_nav"].fillna("").astype(str).str.strip()
+    if isinstance(wh_df, WarehouseStore):
+        # consulta indexada: ya viene un movimiento por item
+        wh = _normalize_wh(wh_df.latest_sales(merged["item_nav"].unique()))
 
-    # buscar en almacén por item_nav
-    rows = []
-    for _, r in merged.iterrows():
-        po_num = r["po_number"]
-        item_as = r["item_as"]
-        qty_as = float(r["qty_as"])
-        item_nav = str(r.get("item_nav", "")).strip()
-
-        if not item_nav:
-            rows.append({
-                "PO": po_num, "Item Number": item_as, "Codigo_Navision": "",
-                "Shipped Quantity": qty_as, "Lot": "", "Manufacture Date": "",
-                "Expiry Date": "", "Albaran": "", "Customer": "", "match_status": "no_mapping"
-            })
-            continue
+    count("rows.warehouse_sales", len(wh))
+    # PO + último movimiento de venta por item (hash join en lugar de filtrar el almacén por línea)
+    latest = latest_sale_per_item(wh[wh["item_nav"] != ""])
+    with span("warehouse_match.join"):
+        res = merged.merge(latest, on="item_nav", how="left", indicator="_wh")
 
-        hits = wh.loc[wh["item_nav"] == item_nav].copy()
-        if hits.empty:
-            _log_event({"level": "warn", "where": "warehouse", "po": po_num, "item_nav": item_nav, "msg": "Sin movimientos de venta"})
-            rows.append({
-                "PO": po_num, "Item Number": item_as, "Codigo_Navision": item_nav,
-                "Shipped Quantity": qty_as, "Lot": "", "Manufacture Date": "",
-                "Expiry Date": "", "Albaran": "", "Customer": "", "match_status": "no_match"
-            })
-            continue
+    mapped = res["item_nav"] != ""
+    found = mapped & (res["_wh"] == "both")
+    short = found & res["qty_wh"].notna() & (res["qty_wh"].abs() < res["qty_as"])
 
-        # elegir el movimiento más reciente
-        hits = hits.sort_values(by=["move_date"], ascending=[False])
-        best = hits.iloc[0]
-
-        status = "ok"
-        if pd.notna(best.get("qty_wh")) and abs(float(best["qty_wh"])) < qty_as:
-            status = "qty_warning"
-
-        rows.append({
-            "PO": po_num,
-            "Item Number": item_as,
-            "Codigo_Navision": item_nav,
-            "Shipped Quantity": qty_as,
-            "Lot": best.get("lot", ""),
-            "Manufacture Date": "" if pd.isna(best.get("mfg_date")) else str(best.get("mfg_date")),
-            "Expiry Date": "" if pd.isna(best.get("exp_date")) else str(best.get("exp_date")),
-            "Albaran": best.get("albaran", ""),
-            "Customer": best.get("customer", ""),
-            "match_status": status,
-        })
+    status = pd.Series("no_mapping", index=res.index, dtype=object)
+    status[mapped] = "no_match"
+    status[found] = "ok"
+    status[short] = "qty_warning"
+    for st, n in status.value_counts().items():
+        count(f"match.{st}", n)
+
+    def _picked(col: str, as_str: bool = False) -> pd.Series:
+        vals = res[col]
+        if isinstance(vals.dtype, pd.CategoricalDtype):
+            vals = vals.astype(object)
+        vals = _str_or_empty(vals) if as_str else vals.fillna("")
+        return vals.where(found, "")
 
-        # log trazabilidad básica
+    out = pd.DataFrame({
+        "PO": res["po_number"],
+        "Item Number": res["item_as"],
+        "Codigo_Navision": res["item_nav"],
+        "Shipped Quantity": res["qty_as"].astype(float),
+        "Lot": _picked("lot"),
+        "Manufacture Date": _picked("mfg_date", as_str=True),
+        "Expiry Date": _picked("exp_date", as_str=True),
+        "Albaran": _picked("albaran"),
+        "Customer": _picked("customer"),
+        "match_status": status,
+        "PO Line": res["po_line"],
+    }, columns=OUT_COLS)
+
+    # log trazabilidad básica, en el orden de las líneas del PO
+    with span("warehouse_match.log_events"):
+        _log_matches(res.loc[mapped].assign(match_status=status))
+    return out
+
+def _log_matches(res: pd.DataFrame) -> None:
+    for r in res.itertuples(index=False):
+        if r.match_status == "no_match":
+            _log_event({"level": "warn", "where": "warehouse", "po": r.po_number, "item_nav": r.item_nav, "msg": "Sin movimientos de venta"})
+            continue
         _log_event({
             "level": "info",
             "where": "match",
-            "po": po_num,
-            "item_as": item_as,
-            "item_nav": item_nav,
-            "picked_albaran": best.get("albaran", ""),
-            "picked_lot": best.get("lot", ""),
-            "move_date": str(best.get("move_date")),
-            "qty_po": qty_as,
-            "qty_wh": None if pd.isna(best.get("qty_wh")) else float(best.get("qty_wh")),
-            "status": status
+            "po": r.po_number,
+            "item_as": r.item_as,
+            "item_nav": r.item_nav,
+            "picked_albaran": r.albaran,
+            "picked_lot": r.lot,
+            "move_date": str(r.move_date),
+            "qty_po": r.qty_as,
+            "qty_wh": None if pd.isna(r.qty_wh) else float(r.qty_wh),
+            "status": r.match_status,
         })
 
-    out_cols = [
-        "PO", "Item Number", "Codigo_Navision", "Shipped Quantity",
-        "Lot", "Manufacture Date", "Expiry Date", "Albaran", "Customer", "match_status"
-    ]
-    return pd.DataFrame(rows, columns=out_cols)
-
-
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, NamedTuple, Optional, TypeVar
+
+import pandas as pd
+
+from .profiling import count
+
+T = TypeVar("T")
+
+# tope de memoria de la caché compartida (estimado con nbytes); el LRU sale primero
+CACHE_MAX_BYTES = 512 * 2**20
+
+class CacheStats(NamedTuple):
+    items: int
+    nbytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+def nbytes(obj: Any) -> int:
+    """Tamaño aproximado en memoria: DataFrame/Series con deep=True, objetos con .nbytes o .df."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(getattr(obj, "df", None), pd.DataFrame):
+        return nbytes(obj.df)
+    return sys.getsizeof(obj)
+
+def content_key(source) -> tuple:
+    """
+    Clave de contenido de una entrada:
+    - ruta: (ruta absoluta, mtime_ns, tamaño); no se lee el fichero
+    - fichero subido / bytes: ("sha1", digest del contenido)
+    """
+    if isinstance(source, (str, Path)):
+        p = Path(source).resolve()
+        st = p.stat()
+        return (str(p), st.st_mtime_ns, st.st_size)
+    return ("sha1", hashlib.sha1(read_bytes(source)).hexdigest())
+
+def read_bytes(source) -> bytes:
+    """Contenido de una ruta, bytes o fichero subido (getvalue/read, sin consumir el original)."""
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    pos = source.tell() if hasattr(source, "tell") else None
+    raw = source.read()
+    if pos is not None:
+        source.seek(pos)
+    return raw
+
+class LRUCache:
+    """
+    Caché en memoria con expulsión LRU y tope de bytes (tamaños estimados con nbytes).
+    Segura entre hilos (sesiones de Streamlit); los valores se comparten: tratarlos como solo lectura.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self._nbytes = 0
+        self._hits = self._misses = self._evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                self._misses += 1
+                count("cache.miss")
+                return default
+            self._items.move_to_end(key)
+            self._hits += 1
+            count("cache.hit")
+            return hit[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> Any:
+        """Guarda `value`; si por sí solo supera el tope no se guarda (se devuelve igual)."""
+        size = nbytes(value) if size is None else size
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            self._items[key] = (value, size)
+            self._nbytes += size
+            while self._nbytes > self.max_bytes:
+                _, (_, freed) = self._items.popitem(last=False)
+                self._nbytes -= freed
+                self._evictions += 1
+                count("cache.evict")
+        return value
+
+    def get_or_build(self, key: Hashable, build: Callable[[], T]) -> T:
+        """Lectura con relleno: construye fuera del lock (dos hilos pueden construir a la vez)."""
+        value = self.get(key, _MISS)
+        if value is _MISS:
+            value = self.put(key, build())
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(len(self._items), self._nbytes, self.max_bytes,
+                              self._hits, self._misses, self._evictions)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+_MISS = object()
+
+# caché compartida del proceso: POs, mappings, plantillas DA y configs YAML
+CACHE = LRUCache()
+
+def cached(kind: str, source, parse: Callable[[], T]) -> T:
+    """parse() una sola vez por (kind, contenido de `source`) mientras siga en CACHE."""
+    return CACHE.get_or_build((kind, *content_key(source)), parse)
+
+def load_yaml(path: str | Path) -> dict:
+    """YAML de configuración cacheado por (ruta, mtime, tamaño); {} si está vacío."""
+    def parse() -> dict:
+        import yaml  # diferido: solo se paga al leer config
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    return cached("yaml", path, parse)
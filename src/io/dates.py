@@ -0,0 +1,256 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .profiling import count, profiled
+
+# formatos explícitos por origen, en orden de prueba (tras las vías rápidas ISO y serial Excel)
+DATE_FORMATS: Dict[str, List[str]] = {
+    # export Navision (es-ES): día primero
+    "navision": ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y"],
+    # AirSupply: día primero con puntos o barras
+    "airsupply": ["%d.%m.%Y", "%d/%m/%Y", "%d/%m/%Y %H:%M:%S"],
+    "default": ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y"],
+}
+
+# siempre se prueban antes que los del origen (ISO sin ambigüedad día/mes)
+ISO_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"]
+
+# serial Excel (días desde 1899-12-30): 1 = 1899-12-31 ... 2958465 = 9999-12-31
+EXCEL_ORIGIN = pd.Timestamp("1899-12-30")
+_EXCEL_MIN, _EXCEL_MAX = 1, 2958465
+_ISO_RE = r"^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?$"
+_ISO_TZ_RE = r"(?:Z|[+-]\d{2}:?\d{2})$"
+_EMPTY = ["", "nan", "nat", "none", "null"]
+
+# directivas de ancho fijo (con ceros a la izquierda) -> (componente, ancho)
+_FIXED = {"d": ("day", 2), "m": ("month", 2), "Y": ("year", 4), "y": ("year", 2),
+          "H": ("hour", 2), "M": ("minute", 2), "S": ("second", 2)}
+
+def _from_excel_serial(x) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    days = np.where((x >= _EXCEL_MIN) & (x <= _EXCEL_MAX), x, np.nan)
+    return (EXCEL_ORIGIN + pd.to_timedelta(days, unit="D")).to_numpy(dtype="datetime64[ns]")
+
+_LAYOUTS: Dict[str, Optional[tuple]] = {}
+
+def _layout(fmt: str) -> Optional[tuple]:
+    """Formato de ancho fijo -> (longitud, campos, literales); None si tiene otras directivas."""
+    if fmt not in _LAYOUTS:
+        fields, literals, pos, i = [], [], 0, 0
+        layout = None
+        while i < len(fmt):
+            if fmt[i] == "%":
+                spec = _FIXED.get(fmt[i + 1:i + 2])
+                if spec is None:
+                    break
+                fields.append((spec[0], pos, spec[1], fmt[i + 1] == "y"))
+                pos += spec[1]
+                i += 2
+            else:
+                literals.append((pos, ord(fmt[i])))
+                pos += 1
+                i += 1
+        else:
+            layout = (pos, fields, literals)
+        _LAYOUTS[fmt] = layout
+    return _LAYOUTS[fmt]
+
+# textos por bloque en la vía de ancho fijo (acota la matriz de caracteres)
+_FIXED_CHUNK = 50_000
+
+def _parse_fixed(chars: np.ndarray, lens: np.ndarray, rows: np.ndarray, layout: tuple) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vía rápida para formatos de ancho fijo: los campos se leen por posición sobre la
+    matriz de códigos de carácter (`chars`, una fila por texto) y la fecha se compone
+    en datetime64 sin pasar por strptime. Devuelve (filas de `rows` válidas, fechas).
+    """
+    length, fields, literals = layout
+    sel = rows[lens[rows] == length]
+    if not len(sel):
+        return sel, np.empty(0, dtype="datetime64[ns]")
+    m = chars[sel, :length]
+    ok = np.ones(len(sel), dtype=bool)
+    for p, ch in literals:
+        ok &= m[:, p] == ch
+    # uint32: lo que no es dígito queda > 9 (también por debajo de "0")
+    digit_pos = [p for _, start, width, _ in fields for p in range(start, start + width)]
+    d = m[:, digit_pos] - np.uint32(48)
+    ok &= (d <= 9).all(axis=1)
+    sel, d = sel[ok], d[ok].astype(np.int64)
+
+    parts = {"hour": 0, "minute": 0, "second": 0}
+    col = 0
+    for name, _, width, two_digit_year in fields:
+        val = d[:, col:col + width] @ (10 ** np.arange(width - 1, -1, -1))
+        col += width
+        if two_digit_year:
+            # mismo pivote que strptime: 69-99 -> 19xx, 00-68 -> 20xx
+            val = np.where(val < 69, 2000 + val, 1900 + val)
+        parts[name] = val
+    y, mo, dd = parts["year"], parts["month"], parts["day"]
+    h, mi, se = (np.broadcast_to(parts[k], y.shape) for k in ("hour", "minute", "second"))
+    # rango de datetime64[ns] (pd.Timestamp.min/max), como errors="coerce"
+    valid = (y >= 1678) & (y <= 2261) & (mo >= 1) & (mo <= 12) & (dd >= 1) & (h <= 23) & (mi <= 59) & (se <= 59)
+    month = ((np.clip(y, 1678, 2261) - 1970) * 12 + np.clip(mo, 1, 12) - 1).astype("datetime64[M]")
+    # día dentro del mes (31/02 -> inválido)
+    valid &= dd <= ((month + 1).astype("datetime64[D]") - month.astype("datetime64[D]")).astype(np.int64)
+    secs = (dd - 1) * 86400 + h * 3600 + mi * 60 + se
+    out = month.astype("datetime64[ns]") + secs.astype("timedelta64[s]")
+    out[~valid] = np.datetime64("NaT")
+    return sel, out
+
+def _fixed_pass(vals: np.ndarray, rows: np.ndarray, layouts: list, fill) -> None:
+    """Prueba las plantillas de ancho fijo sobre vals[rows], por bloques de _FIXED_CHUNK textos."""
+    width = max(lay[0] for lay in layouts)
+    for b in range(0, len(rows), _FIXED_CHUNK):
+        blk = rows[b:b + _FIXED_CHUNK]
+        txt = vals[blk]
+        lens = pd.Series(txt, dtype=object).str.len().to_numpy(dtype=np.int64)
+        short = np.flatnonzero(lens <= width)
+        chars = np.zeros((len(txt), width), dtype=np.uint32)
+        if len(short):
+            chars[short] = np.array(txt[short].tolist(), dtype=f"U{width}").view(np.uint32).reshape(len(short), width)
+        left = np.ones(len(txt), dtype=bool)
+        for layout in layouts:
+            cand = np.flatnonzero(left)
+            if not len(cand):
+                break
+            idx, parsed = _parse_fixed(chars, lens, cand, layout)
+            left[idx[~np.isnat(parsed)]] = False
+            fill(blk[idx], parsed)
+
+def _parse_text(vals: np.ndarray, formats: List[str]) -> np.ndarray:
+    """Textos -> datetime64[ns]; NaT si ningún formato encaja. `vals` queda sin espacios en los extremos."""
+    out = np.full(len(vals), np.datetime64("NaT", "ns"))
+    rest = np.ones(len(vals), dtype=bool)
+
+    def fill(idx: np.ndarray, parsed: np.ndarray) -> None:
+        ok = ~np.isnat(parsed)
+        out[idx[ok]] = parsed[ok]
+        rest[idx[ok]] = False
+
+    # 1) ISO y formatos del origen de ancho fijo, vectorizados por posición;
+    #    los espacios solo se quitan a lo que no ha encajado tal cual
+    layouts = [lay for lay in (_layout(f) for f in ISO_FORMATS + formats) if lay is not None]
+    if layouts:
+        _fixed_pass(vals, np.arange(len(vals)), layouts, fill)
+    idx = np.flatnonzero(rest)
+    if len(idx):
+        stripped = pd.Series(vals[idx], dtype=object).str.strip().to_numpy(dtype=object)
+        changed = stripped != vals[idx]
+        vals[idx] = stripped
+        if layouts and changed.any():
+            _fixed_pass(vals, idx[changed], layouts, fill)
+    # 2) serial Excel como texto ("45567", "45567.5")
+    if rest.any():
+        idx = np.flatnonzero(rest)
+        num = pd.to_numeric(pd.Series(vals[idx]), errors="coerce").to_numpy(dtype=float)
+        fill(idx, _from_excel_serial(num))
+    # 3) ISO con fracciones / zona horaria: se conserva la hora local del texto (se quita la
+    #    zona, como con datetimes con zona en parse_dates); desfases distintos en la misma
+    #    columna (horario de verano) no cambian el reloj de ningún valor
+    if rest.any():
+        idx = np.flatnonzero(rest)
+        txt = pd.Series(vals[idx])
+        cand = txt.str.match(_ISO_RE).to_numpy(dtype=bool)
+        if cand.any():
+            local = txt[cand].str.replace(_ISO_TZ_RE, "", regex=True)
+            parsed = pd.to_datetime(local, format="ISO8601", errors="coerce")
+            fill(idx[cand], parsed.to_numpy(dtype="datetime64[ns]"))
+    # 4) formatos del origen por strptime (sin ceros a la izquierda, etc.)
+    for fmt in formats:
+        if not rest.any():
+            break
+        idx = np.flatnonzero(rest)
+        fill(idx, pd.to_datetime(pd.Series(vals[idx]), format=fmt, errors="coerce").to_numpy(dtype="datetime64[ns]"))
+    return out
+
+def _wall_time(v) -> np.datetime64:
+    """datetime / Timestamp -> datetime64[ns] con la hora local (sin convertir a UTC si tiene zona)."""
+    ts = pd.Timestamp(v)
+    return (ts.tz_localize(None) if ts.tzinfo is not None else ts).to_datetime64()
+
+def _parse_uniques(uniques: np.ndarray, formats: List[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Valores distintos (sin nulos) -> (datetime64[ns], máscara de no reconocidos)."""
+    out = np.full(len(uniques), np.datetime64("NaT", "ns"))
+    kind = pd.api.types.infer_dtype(uniques, skipna=True)
+    if kind in ("integer", "floating", "mixed-integer-float", "decimal"):
+        out = _from_excel_serial(uniques.astype(float))
+        return out, np.isnat(out)
+    if kind in ("datetime", "datetime64", "date"):
+        out = np.array([_wall_time(v) for v in uniques], dtype="datetime64[ns]")
+        return out, np.isnat(out)
+
+    # texto (o mezcla): cada valor por su vía
+    is_text = np.array([isinstance(v, str) for v in uniques], dtype=bool) if kind != "string" else np.ones(len(uniques), bool)
+    for i in np.flatnonzero(~is_text):
+        v = uniques[i]
+        if isinstance(v, (int, float, np.number)) and not isinstance(v, bool):
+            out[i] = _from_excel_serial([v])[0]
+        elif hasattr(v, "year"):
+            out[i] = _wall_time(v)
+    bad = ~is_text & np.isnat(out)
+    if is_text.any():
+        pos = np.flatnonzero(is_text)
+        txt = uniques[is_text].astype(object)
+        out[pos] = _parse_text(txt, formats)
+        # vacíos ("", "nan", ...) quedan como NaT sin contarse como error
+        miss = np.flatnonzero(np.isnat(out[pos]))
+        if len(miss):
+            empty = pd.Series(txt[miss], dtype=object).str.lower().isin(_EMPTY).to_numpy()
+            bad[pos[miss[~empty]]] = True
+    return out, bad
+
+@profiled("dates.parse_dates")
+def parse_dates(values: pd.Series, source: str = "default", formats: Optional[Iterable[str]] = None) -> pd.Series:
+    """
+    Columna de fechas -> datetime64 sin inferencia de formato:
+    datetimes tal cual, serial Excel y texto ISO por vía rápida y después los formatos
+    explícitos de `source` (o `formats`). Cada valor distinto se parsea una sola vez.
+    Fechas con zona horaria (datetimes o texto ISO con desfase) conservan su hora local:
+    se quita la zona sin convertir a UTC.
+
+    Los valores no vacíos que no se reconocen quedan como NaT y se devuelven en
+    `resultado.attrs["unparsed"]` ({valor: nº de filas}) para que el llamador los reporte.
+    """
+    if formats is None:
+        if source not in DATE_FORMATS:
+            raise ValueError(f"Origen de fechas desconocido: {source}")
+        formats = DATE_FORMATS[source]
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    if pd.api.types.is_datetime64_any_dtype(s):
+        out = s.dt.tz_localize(None) if getattr(s.dt, "tz", None) is not None else s.copy()
+        out.attrs["unparsed"] = {}
+        return out
+
+    # caché de valores únicos: se parsea cada valor distinto y se expande por código
+    codes, uniques = pd.factorize(s)
+    uniques = np.asarray(uniques, dtype=object)
+    count("dates.unique_values", len(uniques))
+    parsed, bad = _parse_uniques(uniques, list(formats))
+    res = np.full(len(s), np.datetime64("NaT", "ns"))
+    has = codes >= 0
+    res[has] = parsed[codes[has]]
+    out = pd.Series(res, index=s.index, name=s.name)
+
+    unparsed: Dict[str, int] = {}
+    if bad.any():
+        counts = np.bincount(codes[has], minlength=len(uniques))
+        for i in np.flatnonzero(bad):
+            key = str(uniques[i]).strip()
+            unparsed[key] = unparsed.get(key, 0) + int(counts[i])
+    out.attrs["unparsed"] = unparsed
+    return out
+
+def unparsed_summary(parsed: pd.Series, limit: int = 5) -> str:
+    """Texto corto con los valores no reconocidos de parse_dates ("" si no hay)."""
+    bad = parsed.attrs.get("unparsed") or {}
+    if not bad:
+        return ""
+    top = sorted(bad.items(), key=lambda kv: -kv[1])[:limit]
+    sample = ", ".join(f"{v!r} x{n}" for v, n in top)
+    return f"{sum(bad.values())} fechas no reconocidas ({len(bad)} valores distintos): {sample}"
@@ -0,0 +1,149 @@
+# src/io/event_log.py
+from __future__ import annotations
+import gzip
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, Optional
+from .locks import file_lock
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 10
+DEFAULT_BUFFER = 1000
+
+class EventLog:
+    """
+    Log de eventos append-only en JSON Lines (un evento por línea).
+
+    - Los eventos se acumulan en memoria y se escriben con flush() (o al llenar el buffer).
+    - Al superar max_bytes el fichero se rota a <path>.1[.gz], <path>.2[.gz], ...
+      conservando como mucho `backups` segmentos.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS,
+                 compress: bool = True, buffer_size: int = DEFAULT_BUFFER):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self._buffer: list[str] = []
+
+    def emit(self, event: dict) -> None:
+        event = {"ts": datetime.now().isoformat(timespec="seconds"), **event}
+        self._buffer.append(json.dumps(event, ensure_ascii=False, default=str))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # escritura + rotación bajo bloqueo: varios procesos pueden compartir el log
+        with file_lock(self.path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+            if self.max_bytes and self.path.stat().st_size > self.max_bytes:
+                self._rotate()
+
+    def _segment(self, i: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{i}" + (".gz" if self.compress else ""))
+
+    def _rotate(self) -> None:
+        oldest = self._segment(self.backups)
+        oldest.unlink(missing_ok=True)
+        for i in range(self.backups - 1, 0, -1):
+            seg = self._segment(i)
+            if seg.exists():
+                seg.replace(self._segment(i + 1))
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(self._segment(1), "wb") as dst:
+                dst.writelines(src)
+            self.path.unlink()
+        else:
+            self.path.replace(self._segment(1))
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+# --------- lectura ---------
+def _segments(path: Path) -> list[Path]:
+    """Segmentos rotados (del más antiguo al más reciente) + fichero activo."""
+    rotated = []
+    for p in path.parent.glob(path.name + ".*"):
+        idx = p.name[len(path.name) + 1:].removesuffix(".gz")
+        if idx.isdigit():
+            rotated.append((int(idx), p))
+    return [p for _, p in sorted(rotated, reverse=True)] + ([path] if path.exists() else [])
+
+def _iter_lines(path: Path) -> Iterator[dict]:
+    if path.suffix == ".json":
+        # log antiguo: lista JSON completa
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return
+        yield from (e for e in data if isinstance(e, dict)) if isinstance(data, list) else ()
+        return
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def _as_datetime(v: str | date | datetime | None) -> Optional[datetime]:
+    if v is None or isinstance(v, datetime):
+        return v
+    if isinstance(v, date):
+        return datetime(v.year, v.month, v.day)
+    return datetime.fromisoformat(v)
+
+def iter_events(path: str | Path, po: str | None = None, level: str | None = None,
+                since: str | date | datetime | None = None, until: str | date | datetime | None = None,
+                rotated: bool = True) -> Iterator[dict]:
+    """
+    Recorre los eventos en orden cronológico sin cargar todo el histórico.
+    Filtros opcionales por PO, nivel y rango de fechas [since, until).
+    """
+    p = Path(path)
+    t_from, t_to = _as_datetime(since), _as_datetime(until)
+    for seg in (_segments(p) if rotated else [p]):
+        if not seg.exists():
+            continue
+        for ev in _iter_lines(seg):
+            if po is not None and str(ev.get("po", "")) != po:
+                continue
+            if level is not None and ev.get("level") != level:
+                continue
+            if t_from or t_to:
+                try:
+                    ts = datetime.fromisoformat(ev["ts"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if (t_from and ts < t_from) or (t_to and ts >= t_to):
+                    continue
+            yield ev
+
+def cli():
+    import argparse
+    p = argparse.ArgumentParser(description="Consultar el log de eventos (JSON Lines)")
+    p.add_argument("--log", default="data/state/da_log.jsonl", help="Ruta del log")
+    p.add_argument("--po", help="Filtrar por PO")
+    p.add_argument("--level", help="Filtrar por nivel (info, warn, error)")
+    p.add_argument("--since", help="Desde fecha/hora ISO (incluida)")
+    p.add_argument("--until", help="Hasta fecha/hora ISO (excluida)")
+    args = p.parse_args()
+    for ev in iter_events(args.log, po=args.po, level=args.level, since=args.since, until=args.until):
+        print(json.dumps(ev, ensure_ascii=False))
+
+if __name__ == "__main__":
+    cli()
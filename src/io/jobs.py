@@ -0,0 +1,181 @@
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .profiling import count, profile_session
+
+# cola local de trabajos en segundo plano (Streamlit): hilos del proceso + tabla de estado en SQLite.
+# Hilos y no procesos: comparten la caché de entradas (src.io.cache) y los resultados en memoria.
+JOBS_DB = Path("data/state/jobs.sqlite")
+ARTIFACTS_DIR = Path("data/output/da")
+JOB_WORKERS = 2
+# resultados en memoria (DataFrame, DA + vista previa SSCC...) de los últimos trabajos terminados
+JOB_RESULTS_MAX = 8
+ACTIVE = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    error TEXT,
+    artifacts TEXT NOT NULL DEFAULT '{}',
+    profile TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+)"""
+
+class Job(NamedTuple):
+    id: str
+    kind: str
+    status: str  # queued | running | done | error
+    progress: float
+    message: str
+    error: Optional[str]
+    artifacts: Dict[str, str]
+    profile: Optional[dict]
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+def _job(row: sqlite3.Row) -> Job:
+    d = dict(row)
+    d["artifacts"] = json.loads(d["artifacts"] or "{}")
+    d["profile"] = json.loads(d["profile"]) if d["profile"] else None
+    return Job(**d)
+
+class JobContext:
+    """Lo que recibe cada trabajo: directorio de artefactos, progreso y registro de artefactos."""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue, self.job_id = queue, job_id
+        self.dir = queue.artifacts_dir / job_id
+
+    def path(self, name: str) -> Path:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        return self.dir / name
+
+    def progress(self, fraction: float, message: str = "") -> None:
+        self.queue._update(self.job_id, progress=min(max(float(fraction), 0.0), 1.0), message=message)
+
+    def artifact(self, name: str, path: str | Path) -> Path:
+        return self.queue.add_artifact(self.job_id, name, path)
+
+class JobQueue:
+    """
+    Trabajos en un ThreadPoolExecutor con su estado en SQLite (`jobs`): en cola, en curso,
+    progreso, error, artefactos (nombre -> ruta, bajo artifacts_dir/<id>) y perfil opcional.
+    La UI solo consulta la tabla; cada operación abre su propia conexión (WAL).
+    Los trabajos que quedaron en cola o en curso de un proceso anterior se marcan como error.
+    """
+
+    def __init__(self, db_path: str | Path = JOBS_DB, artifacts_dir: str | Path = ARTIFACTS_DIR,
+                 workers: int = JOB_WORKERS):
+        self.db_path = Path(db_path)
+        self.artifacts_dir = Path(artifacts_dir)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._results: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        with closing(self._connect()) as con, con:
+            con.execute(_SCHEMA)
+            con.execute("UPDATE jobs SET status = 'error', error = 'Interrumpido: el proceso se reinició', finished = ? "
+                        "WHERE status IN ('queued', 'running')", (time.time(),))
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.db_path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.row_factory = sqlite3.Row
+        return con
+
+    def _update(self, job_id: str, **fields) -> None:
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        with closing(self._connect()) as con, con:
+            con.execute(f"UPDATE jobs SET {sets} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, profile: bool = False, **kwargs) -> str:
+        """Encola fn(ctx, *args, **kwargs); devuelve el id del trabajo. `profile`: guarda el perfil por etapas."""
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        with closing(self._connect()) as con, con:
+            con.execute("INSERT INTO jobs (id, kind, status, created) VALUES (?, ?, 'queued', ?)",
+                        (job_id, kind, time.time()))
+        self._pool.submit(self._run, job_id, fn, args, kwargs, profile)
+        count("jobs.submitted")
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[..., Any], args: tuple, kwargs: dict, profile: bool) -> None:
+        self._update(job_id, status="running", started=time.time())
+        prof = None
+        try:
+            with (profile_session(echo=False) if profile else nullcontext()) as prof:
+                result = fn(JobContext(self, job_id), *args, **kwargs)
+        except Exception as e:
+            fields = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        else:
+            with self._lock:
+                self._results[job_id] = result
+                while len(self._results) > JOB_RESULTS_MAX:
+                    self._results.popitem(last=False)
+            fields = {"status": "done", "progress": 1.0, "message": "Terminado"}
+        if prof is not None:
+            fields["profile"] = json.dumps(prof.to_dict(), ensure_ascii=False)
+        self._update(job_id, finished=time.time(), **fields)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def recent(self, limit: int = 20, kind: Optional[str] = None) -> List[Job]:
+        """Últimos trabajos (más recientes primero), opcionalmente de un tipo."""
+        where, params = ("WHERE kind = ?", (kind,)) if kind else ("", ())
+        with closing(self._connect()) as con:
+            rows = con.execute(f"SELECT * FROM jobs {where} ORDER BY created DESC LIMIT ?", (*params, limit)).fetchall()
+        return [_job(r) for r in rows]
+
+    def result(self, job_id: str) -> Any:
+        """Valor devuelto por el trabajo si sigue en memoria (últimos JOB_RESULTS_MAX); si no, None."""
+        with self._lock:
+            return self._results.get(job_id)
+
+    def add_artifact(self, job_id: str, name: str, path: str | Path) -> Path:
+        path = Path(path)
+        with closing(self._connect()) as con, con:
+            con.execute("UPDATE jobs SET artifacts = json_set(artifacts, ?, ?) WHERE id = ?",
+                        (f'$."{name}"', str(path), job_id))
+        return path
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+_QUEUE: Optional[JobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+def default_queue() -> JobQueue:
+    """Cola compartida del proceso: Streamlit re-ejecuta el script, el módulo (y la cola) se conserva."""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = JobQueue()
+        return _QUEUE
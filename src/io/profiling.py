@@ -0,0 +1,146 @@
+from __future__ import annotations
+import functools
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+# perfilado ligero por etapas: spans (tiempo por etapa, anidados) y contadores.
+# Desactivado (lo normal) cada span/contador es una lectura de una ContextVar.
+# ContextVar y no global: cada hilo (sesión de Streamlit) tiene su propio perfil.
+
+class Profiler:
+    """Acumula spans ("padre/hijo" -> llamadas, segundos) y contadores (nombre -> total)."""
+
+    def __init__(self):
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self._stack: List[str] = []
+        self._t0 = time.perf_counter()
+
+    def add(self, name: str, n: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, report: dict) -> None:
+        """Suma un informe de otro proceso (to_dict) en este."""
+        for name, s in report.get("spans", {}).items():
+            acc = self.spans.setdefault(name, [0, 0.0])
+            acc[0] += s["calls"]
+            acc[1] += s["seconds"]
+        for name, n in report.get("counters", {}).items():
+            self.add(name, n)
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_seconds": round(time.perf_counter() - self._t0, 6),
+            "spans": {k: {"calls": int(c), "seconds": round(t, 6)} for k, (c, t) in self.spans.items()},
+            "counters": {k: (int(v) if float(v).is_integer() else v) for k, v in self.counters.items()},
+        }
+
+    def format(self) -> str:
+        """Tabla de texto: spans en orden de aparición (sangrados por nivel) y contadores."""
+        lines = [f"{'etapa':<48} {'llamadas':>8} {'segundos':>10}"]
+        for name, (calls, secs) in self.spans.items():
+            depth = name.count("/")
+            label = "  " * depth + name.rsplit("/", 1)[-1]
+            lines.append(f"{label:<48} {int(calls):>8} {secs:>10.4f}")
+        if self.counters:
+            lines.append(f"{'contador':<48} {'total':>19}")
+            for name, n in self.counters.items():
+                lines.append(f"{name:<48} {n:>19,.0f}")
+        return "\n".join(lines)
+
+class _Span:
+    __slots__ = ("prof", "name", "key", "t0")
+
+    def __init__(self, prof: Profiler, name: str):
+        self.prof, self.name = prof, name
+
+    def __enter__(self) -> "_Span":
+        stack = self.prof._stack
+        stack.append(self.name)
+        self.key = "/".join(stack)
+        self.prof.spans.setdefault(self.key, [0, 0.0])
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        acc = self.prof.spans[self.key]
+        acc[0] += 1
+        acc[1] += time.perf_counter() - self.t0
+        self.prof._stack.pop()
+
+_NOOP = nullcontext()
+_ACTIVE: ContextVar[Optional[Profiler]] = ContextVar("profiler", default=None)
+
+def active() -> Optional[Profiler]:
+    return _ACTIVE.get()
+
+def span(name: str):
+    """Context manager de una etapa; sin perfilado activo devuelve un no-op compartido."""
+    prof = _ACTIVE.get()
+    return _NOOP if prof is None else _Span(prof, name)
+
+def count(name: str, n: float = 1) -> None:
+    """Suma `n` al contador `name` (filas procesadas, escrituras...) si hay perfilado activo."""
+    prof = _ACTIVE.get()
+    if prof is not None:
+        prof.add(name, n)
+
+def profiled(name: str) -> Callable:
+    """Decorador: la función entera como span `name`."""
+    def deco(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            prof = _ACTIVE.get()
+            if prof is None:
+                return fn(*args, **kwargs)
+            with _Span(prof, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+@contextmanager
+def profile_session(json_path: str | Path | None = None, cprofile_path: str | Path | None = None,
+                    echo: bool = True) -> Iterator[Profiler]:
+    """
+    Activa el perfilado durante el bloque. Al salir imprime la tabla (echo), escribe el
+    informe JSON en `json_path` y, con `cprofile_path`, el volcado de cProfile (pstats).
+    """
+    prof = Profiler()
+    token = _ACTIVE.set(prof)
+    cprof = None
+    if cprofile_path:
+        import cProfile
+        cprof = cProfile.Profile()
+        cprof.enable()
+    try:
+        yield prof
+    finally:
+        if cprof is not None:
+            cprof.disable()
+            Path(cprofile_path).parent.mkdir(parents=True, exist_ok=True)
+            cprof.dump_stats(str(cprofile_path))
+        _ACTIVE.reset(token)
+        if json_path:
+            Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(json_path).write_text(json.dumps(prof.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        if echo:
+            print(prof.format())
+            for label, p in (("JSON", json_path), ("cProfile", cprofile_path)):
+                if p:
+                    print(f"Perfil {label} -> {p}")
+
+def add_profile_args(p) -> None:
+    """Opciones --profile / --profile-json / --cprofile para un argparse.ArgumentParser."""
+    p.add_argument("--profile", action="store_true", help="Mostrar tiempos por etapa y contadores al terminar")
+    p.add_argument("--profile-json", default=None, help="Escribir el informe de perfilado en este JSON (implica --profile)")
+    p.add_argument("--cprofile", default=None, help="Volcado cProfile (.prof, pstats) de la ejecución (implica --profile)")
+
+def session_from_args(args):
+    """profile_session según las opciones de add_profile_args; no-op si no se pidió perfilado."""
+    if not (args.profile or args.profile_json or args.cprofile):
+        return nullcontext()
+    return profile_session(args.profile_json, args.cprofile)
@@ -1,20 +1,43 @@
 from __future__ import annotations
 import pandas as pd
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+from .profiling import count, profiled, span
+from .readers_mapping import load_mapping
 
+@profiled("readers.read_airsupply_csv")
 def read_airsupply_csv(path: str | Path) -> pd.DataFrame:
     """
     Lee CSV AirSupply con separador ';' y comillas dobles.
     """
-    return pd.read_csv(path, sep=";", quotechar='"', dtype=str).fillna("")
+    df = pd.read_csv(path, sep=";", quotechar='"', dtype=str).fillna("")
+    count("rows.airsupply_read", len(df))
+    return df
 
+def iter_airsupply_csv(path: str | Path, chunksize: int = 50_000,
+                       usecols: Optional[Iterable[str] | Callable[[str], bool]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lee el CSV AirSupply por bloques de `chunksize` filas (mismo formato que read_airsupply_csv).
+    `usecols` limita las columnas parseadas (lista o callable sobre el nombre).
+    """
+    reader = pd.read_csv(path, sep=";", quotechar='"', dtype=str, chunksize=chunksize, usecols=usecols)
+    with reader:
+        chunks = iter(reader)
+        while True:
+            # el span cubre solo la lectura del bloque, no el trabajo del consumidor
+            with span("readers.iter_airsupply_csv"):
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    chunk = chunk.fillna("")
+            if chunk is None:
+                return
+            count("rows.airsupply_read", len(chunk))
+            yield chunk
+
+@profiled("readers.read_mapping_csv")
 def read_mapping_csv(path: str | Path) -> pd.DataFrame:
     """
-    Lee tabla de referencias SAP→Navision (CSV).
+    Lee tabla de referencias SAP→Navision (CSV o XLSX, vía caché de readers_mapping).
     """
-    df = pd.read_csv(path, dtype=str).fillna("")
     expected = {"Codigo_SAP_ItemNumber","Codigo_Navision","Descripcion"}
-    missing = expected - set(df.columns)
-    if missing:
-        raise ValueError(f"Faltan columnas en mapping: {missing}")
-    return df
+    return load_mapping(path).require(expected).df.copy()
@@ -0,0 +1,161 @@
+# src/io/readers_mapping.py
+from __future__ import annotations
+import hashlib
+import io
+import pickle
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache import CACHE, content_key, read_bytes
+from .profiling import count, profiled
+
+CACHE_DIR = Path("data/state/cache")
+CACHE_VERSION = 1
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+
+class MappingEntry(NamedTuple):
+    codigo_navision: str
+    descripcion: str
+    units_per_box: int
+    boxes_per_pallet: int
+
+def _to_int(s: pd.Series) -> np.ndarray:
+    v = np.trunc(pd.to_numeric(s, errors="coerce").to_numpy(dtype=float))
+    return np.where(np.isfinite(v) & (v >= 1), v, 1).astype(np.int64)
+
+class MappingTable:
+    """
+    Mapping SAP→Navision compilado: DataFrame (todo str) + diccionario item → MappingEntry.
+    Tratar `df` como solo lectura: se comparte entre llamadas mientras el origen no cambie.
+    """
+
+    def __init__(self, df: pd.DataFrame, source: str = "", digest: str = ""):
+        self.df = df
+        self.source = source
+        self.digest = digest
+        self._lookup: Optional[Dict[str, MappingEntry]] = None
+        self._desc_index = None
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def require(self, columns: set[str]) -> "MappingTable":
+        miss = set(columns) - set(self.df.columns)
+        if miss:
+            raise ValueError(f"Faltan columnas en mapping: {miss}")
+        return self
+
+    @property
+    def lookup(self) -> Dict[str, MappingEntry]:
+        """item (Codigo_SAP_ItemNumber) → MappingEntry; gana la primera fila de cada item."""
+        if self._lookup is None:
+            df = self.df
+            n = len(df)
+            col = lambda c: df[c].tolist() if c in df.columns else [""] * n
+            upb = _to_int(df["UnitsPerBox"]) if "UnitsPerBox" in df.columns else np.ones(n, dtype=np.int64)
+            bpp = _to_int(df["BoxesPerPallet"]) if "BoxesPerPallet" in df.columns else np.ones(n, dtype=np.int64)
+            lut: Dict[str, MappingEntry] = {}
+            for item, nav, desc, u, b in zip(col("Codigo_SAP_ItemNumber"), col("Codigo_Navision"), col("Descripcion"), upb.tolist(), bpp.tolist()):
+                if item not in lut:
+                    lut[item] = MappingEntry(nav, desc, u, b)
+            self._lookup = lut
+        return self._lookup
+
+    def get(self, item: str) -> Optional[MappingEntry]:
+        return self.lookup.get(item)
+
+    @property
+    def desc_index(self):
+        """Índice de descripciones para el fallback de packing (se construye una vez)."""
+        if self._desc_index is None:
+            from ..core.desc_index import DescriptionIndex
+            self._desc_index = DescriptionIndex.from_mapping(self.df)
+        return self._desc_index
+
+def _parse(raw: bytes, name: str) -> pd.DataFrame:
+    buf = io.BytesIO(raw)
+    if name.lower().endswith(EXCEL_SUFFIXES):
+        df = pd.read_excel(buf, dtype=str)
+    else:
+        df = pd.read_csv(buf, dtype=str)
+    df = df.fillna("")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+# en memoria: caché LRU compartida (src.io.cache) con clave ("mapping", ruta, mtime, tamaño)
+# para rutas y ("mapping", "sha1", digest) para ficheros subidos
+
+def _cache_file(path: Path, cache_dir: Path) -> Path:
+    key = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:16]
+    return cache_dir / f"mapping_{key}.pkl"
+
+def _load_path(path: Path, cache_dir: Optional[Path]) -> MappingTable:
+    path = path.resolve()
+    st = path.stat()
+    key = ("mapping", *content_key(path))
+    hit = CACHE.get(key)
+    if hit is not None:
+        count("mapping.cache_memory")
+        return hit
+
+    cached = None
+    cfile = _cache_file(path, cache_dir) if cache_dir else None
+    if cfile and cfile.exists():
+        try:
+            with open(cfile, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("version") != CACHE_VERSION:
+                cached = None
+        except Exception:
+            cached = None
+
+    if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        count("mapping.cache_disk")
+        table = MappingTable(cached["df"], str(path), cached["sha1"])
+    else:
+        count("mapping.read")
+        raw = path.read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        if cached and cached["sha1"] == digest:
+            df = cached["df"]  # solo cambió el mtime (copiado/tocado): contenido idéntico
+        else:
+            df = _parse(raw, path.name)
+        table = MappingTable(df, str(path), digest)
+        if cfile:
+            try:
+                cfile.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cfile.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    pickle.dump({"version": CACHE_VERSION, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                                 "sha1": digest, "df": df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                tmp.replace(cfile)
+            except OSError:
+                pass  # sin caché en disco (p. ej. solo lectura): se sigue con la tabla en memoria
+
+    return CACHE.put(key, table)
+
+@profiled("readers.load_mapping")
+def load_mapping(source, cache_dir: Optional[str | Path] = CACHE_DIR) -> MappingTable:
+    """
+    Carga única del mapping SAP→Navision (CSV o XLSX) para CLI, DA y Streamlit.
+
+    - Ruta: caché LRU en memoria por (mtime, tamaño) y artefacto pickle en `cache_dir`
+      validado por mtime/tamaño y, si cambian, por sha1 del contenido.
+    - Fichero subido (objeto con getvalue/read): caché LRU en memoria por sha1 del contenido.
+    """
+    if isinstance(source, (str, Path)):
+        return _load_path(Path(source), Path(cache_dir) if cache_dir else None)
+    raw = read_bytes(source)
+    digest = hashlib.sha1(raw).hexdigest()
+    key = ("mapping", "sha1", digest)
+    table = CACHE.get(key)
+    if table is None:
+        count("mapping.read")
+        name = str(getattr(source, "name", "") or "")
+        table = CACHE.put(key, MappingTable(_parse(raw, name), name, digest))
+    else:
+        count("mapping.cache_memory")
+    return table
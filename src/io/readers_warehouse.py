@@ -1,17 +1,17 @@
 from __future__ import annotations
 from pathlib import Path
 import pandas as pd
+from .profiling import profiled
+from .readers_mapping import load_mapping
 
+@profiled("readers.read_po_csv")
 def read_po_csv(path: str | Path) -> pd.DataFrame:
     return pd.read_csv(path, sep=";", quotechar='"', dtype=str).fillna("")
 
+@profiled("readers.read_mapping_csv")
 def read_mapping_csv(path: str | Path) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str).fillna("")
     needed = {"Codigo_SAP_ItemNumber", "Codigo_Navision"}
-    miss = needed - set(df.columns)
-    if miss:
-        raise ValueError(f"Faltan columnas en mapping: {miss}")
-    return df
+    return load_mapping(path).require(needed).df.copy()
 
 def read_warehouse_csv(path: str | Path) -> pd.DataFrame:
     return pd.read_csv(path, dtype=str).fillna("")
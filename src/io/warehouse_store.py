@@ -0,0 +1,157 @@
+from __future__ import annotations
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .dates import parse_dates
+from .profiling import count, profiled
+
+STORE_PATH = Path("data/state/warehouse.sqlite")
+KEY_COL = "Nº mov."
+ITEM_COL = "PN GECI"
+DATE_COL = "Fecha registro"
+DOC_TYPE_COL = "Tipo documento"
+# mismo criterio que el filtro de ventas de warehouse_match (contiene "venta", sin mayúsculas)
+SALE_LIKE = "%venta%"
+# las fechas se guardan con el texto del export (el DA sale igual que leyendo el export directamente);
+# Fecha registro además como texto ISO en SORT_COL, ordenable dentro de SQLite ("último movimiento")
+SORT_COL = "_fecha_registro_iso"
+# columnas que usan las consultas del almacén
+STORE_REQUIRED = [KEY_COL, ITEM_COL, DATE_COL, DOC_TYPE_COL]
+# SQLite limita el nº de parámetros por sentencia
+_MAX_PARAMS = 900
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+def _sql_value(v):
+    if v is None or v is pd.NaT or (isinstance(v, float) and v != v):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return str(v)
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, str):
+        return v.strip()
+    return v
+
+def _require_columns(df: pd.DataFrame) -> None:
+    """Columnas del almacén y las que exige el matching (mismo error que warehouse_match)."""
+    from ..core.warehouse_match import WH_ALIASES, WH_REQUIRED, _resolve
+
+    cols = _resolve(df, WH_ALIASES)
+    if not all(c in df.columns for c in STORE_REQUIRED) or not all(cols[f] for f in WH_REQUIRED):
+        raise ValueError("Warehouse: columnas requeridas no encontradas")
+
+class WarehouseStore:
+    """
+    Histórico de movimientos de almacén en SQLite, una fila por `Nº mov.`.
+    Las columnas conservan los nombres y el texto del export de Navision; índices en
+    (PN GECI, Fecha registro ISO) y Fecha registro ISO. Solo guarda la ruta, así que
+    se puede pasar a otros procesos: cada operación abre su propia conexión.
+    """
+
+    def __init__(self, path: str | Path = STORE_PATH):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def _columns(self, con: sqlite3.Connection) -> list[str]:
+        return [r[1] for r in con.execute("PRAGMA table_info(movements)")]
+
+    @profiled("warehouse_store.ingest")
+    def ingest(self, df: pd.DataFrame) -> int:
+        """
+        Añade los movimientos de `df` cuyo `Nº mov.` no esté ya en el almacén.
+        Columnas nuevas se añaden a la tabla. Devuelve el nº de filas insertadas.
+        """
+        if KEY_COL not in df.columns:
+            raise ValueError(f"Movimientos sin columna clave '{KEY_COL}'")
+        _require_columns(df)
+        keys = pd.to_numeric(df[KEY_COL], errors="coerce")
+        df = df.loc[keys.notna()].assign(**{KEY_COL: keys[keys.notna()].astype("int64")})
+        cols = [c for c in df.columns if c != KEY_COL]
+        # Fecha registro ISO ("YYYY-MM-DD HH:MM:SS") para ordenar; las columnas fecha conservan su texto
+        df = df.assign(**{SORT_COL: parse_dates(df[DATE_COL], "navision")})
+
+        with closing(self._connect()) as con, con:
+            con.execute(f"CREATE TABLE IF NOT EXISTS movements ({_q(KEY_COL)} INTEGER PRIMARY KEY)")
+            have = set(self._columns(con))
+            for c in cols + [SORT_COL]:
+                if c not in have:
+                    con.execute(f"ALTER TABLE movements ADD COLUMN {_q(c)}")
+            if SORT_COL not in have and DATE_COL in have:
+                # almacén de una versión anterior: Fecha registro ya se guardaba como texto ISO
+                con.execute(f"UPDATE movements SET {_q(SORT_COL)} = {_q(DATE_COL)}")
+            con.execute(f"CREATE INDEX IF NOT EXISTS ix_mov_item_orden ON movements ({_q(ITEM_COL)}, {_q(SORT_COL)})")
+            con.execute(f"CREATE INDEX IF NOT EXISTS ix_mov_orden ON movements ({_q(SORT_COL)})")
+
+            # solo movimientos nuevos: la clave (INTEGER PRIMARY KEY, única) descarta los ya cargados y los
+            # repetidos del lote sin leer las claves del almacén; coste proporcional al lote
+            all_cols = [KEY_COL] + cols + [SORT_COL]
+            rows = ([_sql_value(v) for v in row] for row in df[all_cols].itertuples(index=False, name=None))
+            before = con.total_changes
+            con.executemany(
+                f"INSERT OR IGNORE INTO movements ({', '.join(_q(c) for c in all_cols)}) "
+                f"VALUES ({', '.join('?' * len(all_cols))})",
+                rows,
+            )
+            inserted = con.total_changes - before
+        count("rows.warehouse_ingested", inserted)
+        return inserted
+
+    def count(self) -> int:
+        if not self.path.exists():
+            return 0
+        with closing(self._connect()) as con:
+            try:
+                return con.execute("SELECT COUNT(*) FROM movements").fetchone()[0]
+            except sqlite3.OperationalError:
+                return 0
+
+    def _frame(self, con: sqlite3.Connection, sql: str, params: list) -> pd.DataFrame:
+        return pd.read_sql_query(sql, con, params=params)
+
+    @profiled("warehouse_store.latest_sales")
+    def latest_sales(self, items: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Último movimiento de venta por PN GECI (Fecha registro desc, sin fecha al final,
+        empate -> mayor Nº mov., como latest_sale_per_item). Con `items` solo se consultan
+        esos productos (índice).
+        Las columnas salen con el texto del export, como al leerlo con pandas.
+        """
+        if not self.path.exists():
+            raise ValueError(f"No existe el almacén de movimientos: {self.path}")
+        items = None if items is None else sorted({str(i).strip() for i in items if str(i).strip()})
+        frames = []
+        with closing(self._connect()) as con:
+            have = self._columns(con)
+            _require_columns(pd.DataFrame(columns=have))
+            order = SORT_COL if SORT_COL in have else DATE_COL
+            out_cols = [c for c in have if c != SORT_COL]
+            cols = ", ".join(_q(c) for c in out_cols)
+            base = (
+                f"SELECT {cols} FROM ("
+                f"  SELECT *, ROW_NUMBER() OVER ("
+                f"    PARTITION BY {_q(ITEM_COL)}"
+                f"    ORDER BY {_q(order)} IS NULL, {_q(order)} DESC, {_q(KEY_COL)} DESC) AS _rn"
+                f"  FROM movements WHERE {_q(DOC_TYPE_COL)} LIKE ? AND {_q(ITEM_COL)} <> ''{{items}}"
+                f") WHERE _rn = 1"
+            )
+            if items is None:
+                frames.append(self._frame(con, base.replace("{items}", ""), [SALE_LIKE]))
+            for i in range(0, len(items or ()), _MAX_PARAMS):
+                chunk = items[i:i + _MAX_PARAMS]
+                where = f" AND {_q(ITEM_COL)} IN ({', '.join('?' * len(chunk))})"
+                frames.append(self._frame(con, base.replace("{items}", where), [SALE_LIKE, *chunk]))
+            if not frames:
+                return pd.DataFrame(columns=out_cols)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
@@ -1,8 +1,197 @@
 from __future__ import annotations
-import pandas as pd
+import io
+import math
+from datetime import date, datetime
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .dates import parse_dates
+from .profiling import count, profiled
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+DATE_FMT = "yyyy-mm-dd"
+
+# --------- celdas tipadas ---------
+def _clean(v):
+    if v is None or v is pd.NaT or (isinstance(v, float) and v != v) or v is pd.NA:
+        return None
+    return v
+
+def _excel_date(v):
+    if v is None or v is pd.NaT:
+        return None
+    # fechas sin hora -> date (Excel las muestra como yyyy-mm-dd)
+    return v.date() if v == v.normalize() else v.to_pydatetime()
+
+def _excel_number(v: float):
+    if v != v:
+        return None
+    # Excel no tiene infinitos: se escriben como texto ("inf", "-inf")
+    if not math.isfinite(v):
+        return str(v)
+    return int(v) if abs(v) < 2**53 and v == int(v) else float(v)
+
+def _typed_values(s: pd.Series, numeric: bool, as_date: bool) -> list:
+    """Columna -> lista de valores Python listos para Excel (None en vacíos)."""
+    raw = s.tolist()
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return [_excel_date(v) for v in s]
+    if pd.api.types.is_bool_dtype(s):
+        return [_clean(v) for v in raw]
+    if pd.api.types.is_numeric_dtype(s):
+        return [_excel_number(float(v)) for v in raw]
+    if as_date:
+        # formatos explícitos día primero (Navision): sin inferencia, 01/10/2025 es 1 de octubre
+        conv = [_excel_date(v) for v in parse_dates(s, "navision")]
+    elif numeric:
+        num = pd.to_numeric(s.astype(str).str.strip().str.replace(",", ".", regex=False), errors="coerce")
+        conv = [_excel_number(v) for v in num.to_numpy(dtype=float)]
+    else:
+        return [_clean(v) for v in raw]
+    # lo que no se pueda convertir se conserva como texto
+    return [c if c is not None else _clean(r) or None for c, r in zip(conv, raw)]
+
+def iter_typed_rows(df: pd.DataFrame, numeric_cols: Iterable[str] = (), date_cols: Iterable[str] = ()) -> Iterator[tuple]:
+    """Filas del DataFrame con cantidades como números y fechas como date/datetime."""
+    numeric_cols, date_cols = set(numeric_cols), set(date_cols)
+    cols = [_typed_values(df.iloc[:, i], c in numeric_cols, c in date_cols) for i, c in enumerate(df.columns)]
+    return zip(*cols) if cols else iter(())
+
+# --------- motores write-only ---------
+class _OpenpyxlBook:
+    def __init__(self, target):
+        from openpyxl import Workbook
+        self.target = target
+        self.wb = Workbook(write_only=True)
+
+    def add_sheet(self, name: str):
+        return self.wb.create_sheet(title=name[:31])
+
+    def append(self, ws, row) -> None:
+        ws.append(row)
+
+    def close(self) -> None:
+        self.wb.save(self.target)
+
+class _XlsxWriterBook:
+    def __init__(self, target):
+        import xlsxwriter
+        opts = {"default_date_format": DATE_FMT, "strings_to_numbers": False, "strings_to_formulas": False}
+        if isinstance(target, (str, Path)):
+            opts["constant_memory"] = True
+        else:
+            opts["in_memory"] = True
+        self.wb = xlsxwriter.Workbook(target, opts)
+        self._rows: dict[str, int] = {}
+
+    def add_sheet(self, name: str):
+        ws = self.wb.add_worksheet(name[:31])
+        self._rows[ws.name] = 0
+        return ws
+
+    def append(self, ws, row) -> None:
+        r = self._rows[ws.name]
+        for c, v in enumerate(row):
+            if v is None:
+                continue
+            if isinstance(v, (datetime, date)):
+                ws.write_datetime(r, c, v)
+            else:
+                ws.write(r, c, v)
+        self._rows[ws.name] = r + 1
+
+    def close(self) -> None:
+        self.wb.close()
+
+def _open_book(target, engine: Optional[str] = None):
+    """xlsxwriter (constant_memory) si está instalado; si no, openpyxl write_only."""
+    if engine in (None, "xlsxwriter"):
+        try:
+            return _XlsxWriterBook(target)
+        except ImportError:
+            if engine == "xlsxwriter":
+                raise
+    return _OpenpyxlBook(target)
+
+@profiled("writers.write_xlsx")
+def write_xlsx(sheets: pd.DataFrame | Mapping[str, pd.DataFrame], target: str | Path | BinaryIO,
+               numeric_cols: Iterable[str] = (), date_cols: Iterable[str] = (),
+               engine: Optional[str] = None) -> None:
+    """
+    Escribe uno o varios DataFrames (dict hoja → df) en un .xlsx en modo streaming.
+    `target` puede ser una ruta o un buffer (BytesIO). Columnas numéricas/fecha
+    (por dtype o listadas en numeric_cols/date_cols) se escriben como celdas tipadas.
+    """
+    if isinstance(sheets, pd.DataFrame):
+        sheets = {"Sheet1": sheets}
+    if isinstance(target, (str, Path)):
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+    book = _open_book(target, engine)
+    for name, df in sheets.items():
+        ws = book.add_sheet(name)
+        book.append(ws, [str(c) for c in df.columns])
+        for row in iter_typed_rows(df, numeric_cols, date_cols):
+            book.append(ws, row)
+        count("rows.xlsx_written", len(df))
+    book.close()
+
+def xlsx_bytes(sheets: pd.DataFrame | Mapping[str, pd.DataFrame], **kwargs) -> bytes:
+    """write_xlsx a memoria (descargas de Streamlit)."""
+    buf = io.BytesIO()
+    write_xlsx(sheets, buf, **kwargs)
+    return buf.getvalue()
+
+def write_excel(df: pd.DataFrame, path: str | Path, numeric_cols: Iterable[str] = (), date_cols: Iterable[str] = ()) -> None:
+    write_xlsx(df, path, numeric_cols=numeric_cols, date_cols=date_cols)
+
+class FrameStreamWriter:
+    """
+    Escritura incremental de DataFrames a .xlsx (motor write-only) o .csv.
+    La cabecera se toma del primer bloque; la memoria no crece con el nº de filas.
+    """
+
+    def __init__(self, path: str | Path, sheet_name: str = "Sheet1",
+                 numeric_cols: Iterable[str] = (), date_cols: Iterable[str] = ()):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rows = 0
+        self.numeric_cols, self.date_cols = list(numeric_cols), list(date_cols)
+        self._excel = self.path.suffix.lower() in EXCEL_SUFFIXES
+        self._header_done = False
+        self._book = self._ws = self._fh = None
+        if self._excel:
+            self._book = _open_book(self.path)
+            self._ws = self._book.add_sheet(sheet_name)
+        else:
+            self._fh = open(self.path, "w", encoding="utf-8", newline="")
+
+    @profiled("writers.FrameStreamWriter.write")
+    def write(self, df: pd.DataFrame) -> None:
+        count("rows.xlsx_written" if self._excel else "rows.csv_written", len(df))
+        if self._excel:
+            if not self._header_done:
+                self._book.append(self._ws, [str(c) for c in df.columns])
+            for row in iter_typed_rows(df, self.numeric_cols, self.date_cols):
+                self._book.append(self._ws, row)
+        else:
+            df.to_csv(self._fh, index=False, header=not self._header_done)
+        self._header_done = True
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "FrameStreamWriter":
+        return self
 
-def write_excel(df: pd.DataFrame, path: str | Path) -> None:
-    path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(path, index=False)
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,12 +1,110 @@
 from __future__ import annotations
+import csv
+import io
+import re
 from pathlib import Path
+from typing import List, Mapping, Optional
+import numpy as np
 import pandas as pd
+from .profiling import count, profiled
+from .writers import EXCEL_SUFFIXES, write_xlsx
 
-def write_da(df: pd.DataFrame, out_path: str | Path) -> None:
+# columnas del DA que se escriben como número / fecha en Excel
+DA_NUMERIC_COLS = ["Shipped Quantity", "SHIPPEDQUANTITY", "Quantity"]
+DA_DATE_COLS = ["Manufacture Date", "Expiry Date", "MANUFACTUREDATE", "EXPIRYDATE",
+                "DEPARTUREDATE", "ESTIMATEDDELIVERYDATE", "Despatch Date", "Estimated Delivery Date"]
+
+# CSV DA-123: ; y BOM para coherencia con AirSupply / Excel
+DA_CSV_SEP = ";"
+DA_CSV_ENCODING = "utf-8-sig"
+CSV_CHUNK_ROWS = 20_000
+
+@profiled("writers.write_da")
+def write_da(df: pd.DataFrame, out_path: str | Path, extra_sheets: Optional[Mapping[str, pd.DataFrame]] = None) -> None:
+    """
+    DA a .csv o .xlsx. En Excel se usa el escritor write-only con celdas tipadas y,
+    si se pasan, hojas adicionales (UE, UX, excepciones...) tras la hoja "DA".
+    """
     out = Path(out_path)
     out.parent.mkdir(parents=True, exist_ok=True)
-    if out.suffix.lower() in (".xlsx", ".xlsm", ".xltx", ".xltm"):
-        with pd.ExcelWriter(out, engine="openpyxl") as wr:
-            df.to_excel(wr, index=False)
+    if out.suffix.lower() in EXCEL_SUFFIXES + (".xltx", ".xltm"):
+        sheets = {"DA": df, **(extra_sheets or {})}
+        write_xlsx(sheets, out, numeric_cols=DA_NUMERIC_COLS, date_cols=DA_DATE_COLS)
     else:
         df.to_csv(out, index=False)
+        count("rows.csv_written", len(df))
+
+def _csv_field(v: str, sep: str) -> str:
+    """Campo con el mismo criterio que csv.QUOTE_MINIMAL (el de DataFrame.to_csv)."""
+    buf = io.StringIO()
+    csv.writer(buf, delimiter=sep, lineterminator="").writerow([v, ""])
+    return buf.getvalue()[:-1]
+
+def _quote_array(vals: np.ndarray, sep: str) -> np.ndarray:
+    """Entrecomilla solo los valores que lo necesitan (separador, comillas o saltos de línea)."""
+    s = pd.Series(vals, dtype=object).astype(str)
+    needs = s.str.contains(f'[{re.escape(sep)}"\r\n]', regex=True)
+    if needs.any():
+        s[needs] = '"' + s[needs].str.replace('"', '""', regex=False) + '"'
+    return s.to_numpy(dtype=object)
+
+@profiled("writers.write_da_csv")
+def write_da_csv(da, out_path: str | Path, sep: str = DA_CSV_SEP, encoding: str = DA_CSV_ENCODING,
+                 chunk_rows: int = CSV_CHUNK_ROWS) -> None:
+    """
+    DA-123 columnar (DAColumns o DataFrame) a CSV `;` utf-8-sig por bloques de filas.
+    Las columnas escalares se pre-unen una vez en tramos literales de la línea; por fila
+    solo se concatenan las columnas con datos. Salida idéntica a
+    df.to_csv(index=False, sep=";", encoding="utf-8-sig").
+    """
+    if isinstance(da, pd.DataFrame):
+        columns = list(da.columns)
+        values = {c: da.iloc[:, i].astype(object).fillna("").to_numpy() for i, c in enumerate(columns)}
+        n_rows = len(da)
+    else:
+        columns, values, n_rows = da.columns, da.values, len(da)
+
+    # línea = lit0 + arr0 + lit1 + arr1 + ... ; escalares consecutivos se funden en un literal
+    parts: List[str | np.ndarray] = []
+    buf = ""
+    for i, col in enumerate(columns):
+        if i:
+            buf += sep
+        val = values[col]
+        if isinstance(val, str):
+            buf += _csv_field(val, sep)
+        else:
+            parts += [buf, val]
+            buf = ""
+    parts.append(buf)
+
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding=encoding, newline="") as f:
+        f.write(sep.join(_csv_field(c, sep) for c in columns) + "\n")
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            if len(parts) == 1:
+                f.write((parts[0] + "\n") * (stop - start))
+                continue
+            line = np.full(stop - start, "", dtype=object)
+            for part in parts:
+                if isinstance(part, str):
+                    if part:
+                        line += part
+                else:
+                    line += _quote_array(part[start:stop], sep)
+            f.write("\n".join(line.tolist()))
+            f.write("\n")
+    count("rows.csv_written", n_rows)
+
+@profiled("writers.write_da_123")
+def write_da_123(da, out_path: str | Path) -> None:
+    """DA-123 (DAColumns o DataFrame) a .xlsx con celdas tipadas o a CSV `;` utf-8-sig."""
+    out = Path(out_path)
+    if out.suffix.lower() in EXCEL_SUFFIXES:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        df = da if isinstance(da, pd.DataFrame) else da.to_frame()
+        write_xlsx({"DA": df}, out, numeric_cols=DA_NUMERIC_COLS, date_cols=DA_DATE_COLS)
+    else:
+        write_da_csv(da, out)
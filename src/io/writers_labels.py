@@ -1,11 +1,497 @@
-"""
-Stub. Implementar:
-- sscc.py: SSCC-18 (UX/UE), dígito control, validación.
-- counters.py: persistencia contadores (JSON/SQLite).
-- packing.py: PO -> UEs -> UX.
-- da_build.py: dataset DA desde packing.
-- labels.py: modelo etiquetas UX/UE.
-- readers_warehouse.py: lectura movimientos almacén.
-- writers_da.py: export CSV/XLSX Airbus-like.
-- writers_labels.py: export etiquetas (PDF/PNG, GS1-128).
-"""
+from __future__ import annotations
+import math
+import os
+import struct
+import unicodedata
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+from ..core.da_template import DA_CONSTS
+from ..core.labels import (CODE128_MODULES, CODE128_WIDTHS, MAX_MODULE_MM, MIN_MODULE_MM, QUIET_MODULES, Label,
+                           encode_gs1_128, hri, symbol_modules)
+from .profiling import count, profiled
+
+# páginas soportadas (mm, vertical)
+PAGE_MM = {"A6": (105.0, 148.0), "A5": (148.0, 210.0), "A4": (210.0, 297.0)}
+PNG_COMPRESSION = 6
+# rasterizado en paralelo: etiquetas por tarea y tareas en vuelo por worker (memoria acotada)
+RASTER_CHUNK = 32
+RASTER_WINDOW = 4
+
+# fuente de mapa de bits 5x7 para el PNG (filas en hex, bit 4 = columna izquierda);
+# el texto de la etiqueta se pasa a mayúsculas ASCII y lo que no esté aquí sale como "?"
+_FONT_5X7 = {
+    "0": "0e11131519110e", "1": "040c040404040e", "2": "0e11010204081f", "3": "1f02040201110e",
+    "4": "02060a121f0202", "5": "1f101e0101110e", "6": "0608101e11110e", "7": "1f010204080808",
+    "8": "0e11110e11110e", "9": "0e11110f01020c", "A": "0e11111f111111", "B": "1e11111e11111e",
+    "C": "0e11101010110e", "D": "1c12111111121c", "E": "1f10101e10101f", "F": "1f10101e101010",
+    "G": "0e11101711110f", "H": "1111111f111111", "I": "0e04040404040e", "J": "0702020202120c",
+    "K": "11121418141211", "L": "1010101010101f", "M": "111b1515111111", "N": "11111915131111",
+    "O": "0e11111111110e", "P": "1e11111e101010", "Q": "0e11111115120d", "R": "1e11111e141211",
+    "S": "0f10100e01011e", "T": "1f040404040404", "U": "1111111111110e", "V": "11111111110a04",
+    "W": "1111111515150a", "X": "11110a040a1111", "Y": "11110a04040404", "Z": "1f01020408101f",
+    "(": "02040808080402", ")": "08040202020408", "-": "0000001f000000", ".": "00000000000c0c",
+    "/": "00010204081000", ":": "000c0c000c0c00", ",": "000000000c0408", "+": "0004041f040400",
+    "_": "0000000000001f", "?": "0e110102040004", "#": "0a0a1f0a1f0a0a", "%": "18190204081303",
+    "&": "0c12140815120d", "'": "04040800000000", "*": "0004150e150400", '"': "0a0a0000000000",
+    "!": "04040404040004", " ": "00000000000000",
+}
+
+# Helvetica-Bold: altura de mayúsculas / tamaño de fuente (para igualar el alto del PNG)
+_CAP_HEIGHT = 0.718
+
+
+def _fold(text: str) -> str:
+    """Texto -> mayúsculas ASCII sin acentos, limitado a la fuente 5x7."""
+    s = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii").upper()
+    return "".join(ch if ch in _FONT_5X7 else "?" for ch in s)
+
+
+def _fit(text: str, width: int, height: int) -> str:
+    """Recorta el texto a los caracteres que caben en `width` px con altura `height`."""
+    adv = 6 * max(1, round(height / 7))
+    return text[:max(width // adv, 0)]
+
+
+# --- maquetación: operaciones en píxeles a `dpi` con origen arriba-izquierda ---
+# ("rect", x, y, w, h) | ("text", x, y, h, texto) | ("bars", x, y, h, px_por_módulo, valores)
+
+@lru_cache(maxsize=8)
+def _geometry(page: str, dpi: int) -> dict:
+    if page not in PAGE_MM:
+        raise ValueError(f"Página no soportada: {page} (disponibles: {', '.join(PAGE_MM)})")
+    w_mm, h_mm = PAGE_MM[page]
+    k = dpi / 25.4
+    # diseño pensado para A6: en páginas mayores se escala en horizontal y vertical
+    sx, sy = w_mm / 105.0, h_mm / 148.0
+    def mx(v: float) -> int: return round(v * sx * k)
+    def my(v: float) -> int: return round(v * sy * k)
+    return {
+        "size": (round(w_mm * k), round(h_mm * k)),
+        "margin": mx(4), "line": max(1, round(0.4 * k)),
+        "x": (mx(6), mx(52)), "full": mx(93), "half": mx(47),
+        "title": (my(6.5), my(6)), "ship": (mx(62), [my(v) for v in (5.5, 8.5, 11.5)]),
+        "sep": (my(15), my(66)),
+        "rows": [my(v) for v in (18, 27.5, 37, 46.5, 56)],
+        "caption": my(2), "value": my(3), "hri": my(2.5),
+        "lot_bars": (my(70), my(18)), "sscc_bars": (my(97), my(32)),
+        "content": mx(97),
+        # px por módulo admitidos: entero, sin bajar de la X mínima (el máximo nunca por debajo del mínimo)
+        "module": (math.ceil(MIN_MODULE_MM * k), max(math.ceil(MIN_MODULE_MM * k), math.floor(MAX_MODULE_MM * k))),
+    }
+
+
+# campos: (fila, columna 0/1, rótulo UX, rótulo UE, atributo de Label); DESCRIPCION y SSCC a todo el ancho
+_CELLS = [
+    (0, 0, "ITEM AS", "ITEM AS", "item_as"), (0, 1, "NAVISION", "NAVISION", "codigo_navision"),
+    (1, 0, "DESCRIPCION", "DESCRIPCION", "desc"),
+    (2, 0, "CAJAS", "CANTIDAD", "qty"), (2, 1, "", "PALET", "ux_sscc"),
+    (3, 0, "LOTE", "LOTE", "lote"), (3, 1, "CADUCIDAD", "CADUCIDAD", "exp"),
+    (4, 0, "SSCC", "SSCC", "sscc"),
+]
+_FULL_WIDTH = {"desc", "sscc"}
+
+
+def template_key(label: Label) -> Tuple[str, bool]:
+    """Plantilla de fondo de la etiqueta: tipo y si es una caja con palet."""
+    return label.kind, bool(label.ux_sscc)
+
+
+@lru_cache(maxsize=32)
+def background_ops(kind: str, on_pallet: bool, page: str = "A6", dpi: int = 300) -> Tuple[tuple, ...]:
+    """Parte fija de la etiqueta: marco, título, remitente (DA_CONSTS) y rótulos de los campos."""
+    g = _geometry(page, dpi)
+    W, H = g["size"]
+    mg, ln = g["margin"], g["line"]
+    ops: List[tuple] = [
+        ("rect", mg, mg, W - 2 * mg, ln), ("rect", mg, H - mg - ln, W - 2 * mg, ln),
+        ("rect", mg, mg, ln, H - 2 * mg), ("rect", W - mg - ln, mg, ln, H - 2 * mg),
+        ("rect", mg, g["sep"][0], W - 2 * mg, ln), ("rect", mg, g["sep"][1], W - 2 * mg, ln),
+        ("text", g["x"][0], g["title"][0], g["title"][1], "UX - PALET" if kind == "UX" else "UE - CAJA"),
+    ]
+    ship_x, ship_y = g["ship"]
+    ship = [f"PROVEEDOR {DA_CONSTS['SUPPLIERNO']}",
+            f"{DA_CONSTS['SHIPFROMNAME1']} - {DA_CONSTS['SHIPFROMCITY']}",
+            f"{DA_CONSTS['SHIPFROMCOUNTRY']} ({DA_CONSTS['SHIPFROMCOUNTRYCODE']})"]
+    for y, text in zip(ship_y, ship):
+        ops.append(("text", ship_x, y, g["caption"], _fit(_fold(text), W - mg - ship_x, g["caption"])))
+    for row, col, cap_ux, cap_ue, attr in _CELLS:
+        caption = cap_ux if kind == "UX" else cap_ue
+        if attr == "ux_sscc" and not on_pallet:
+            caption = ""
+        if caption:
+            ops.append(("text", g["x"][col], g["rows"][row], g["caption"], caption))
+    return tuple(ops)
+
+
+def _module_px(codes: Tuple[int, ...], g: dict) -> int:
+    """Mayor módulo entero de px con el que el símbolo y sus zonas de silencio caben (hasta la X máxima)."""
+    return min(g["module"][1], g["content"] // (symbol_modules(codes) + 2 * QUIET_MODULES))
+
+
+def _place_symbols(label: Label, page: str, dpi: int) -> List[tuple]:
+    """
+    (campos, valores, px por módulo, y, alto) de cada símbolo. Nunca por debajo de la X mínima:
+    si caducidad + lote no caben en un símbolo se apilan uno por AI en el mismo hueco, y si
+    aun así no caben (o no cabe el SSCC) se lanza ValueError.
+    """
+    g = _geometry(page, dpi)
+    low = g["module"][0]
+    symbols = label.symbols()
+    slots = [g["sscc_bars"]] if len(symbols) == 1 else [g["lot_bars"], g["sscc_bars"]]
+    out: List[tuple] = []
+    for fields, (y, h) in zip(symbols, slots):
+        codes = encode_gs1_128(fields)
+        m = _module_px(codes, g)
+        if m >= low:
+            out.append((fields, codes, m, y, h))
+            continue
+        parts = [((f,), encode_gs1_128((f,))) for f in fields] if len(fields) > 1 else []
+        if not parts or any(_module_px(c, g) < low for _, c in parts):
+            raise ValueError(f"Símbolo GS1-128 {hri(fields)} de la etiqueta {label.sscc} no cabe en {page} "
+                             f"a {dpi} dpi con el módulo mínimo ({MIN_MODULE_MM} mm): usa una página mayor o acorta el lote")
+        # dos símbolos (caducidad, lote) con su texto en el alto que ocupaba uno
+        h2 = (h - 2 * g["hri"]) // len(parts)
+        for i, (f, c) in enumerate(parts):
+            out.append((f, c, _module_px(c, g), y + i * (h2 + 2 * g["hri"]), h2))
+        count("labels.split_symbols")
+    return out
+
+
+def field_ops(label: Label, page: str = "A6", dpi: int = 300) -> List[tuple]:
+    """Parte variable: valores de los campos, símbolos GS1-128 y su texto legible."""
+    g = _geometry(page, dpi)
+    W = g["size"][0]
+    cap, val = g["caption"], g["value"]
+    values = label._asdict()
+    values["qty"] = f"{label.qty:g}"
+    values["exp"] = f"{label.exp[4:6]}/{label.exp[2:4]}/{label.exp[:2]}" if label.exp else ""
+    ops: List[tuple] = []
+    for row, col, _, _, attr in _CELLS:
+        value = values[attr]
+        if value:
+            width = g["full"] if attr in _FULL_WIDTH else g["half"]
+            ops.append(("text", g["x"][col], g["rows"][row] + cap + cap // 2, val, _fit(_fold(value), width, val)))
+
+    # símbolos: SSCC siempre abajo; caducidad/lote encima si hay
+    for fields, codes, m, y, h in _place_symbols(label, page, dpi):
+        ops.append(("bars", (W - symbol_modules(codes) * m) // 2, y, h, m, codes))
+        text = _fold(hri(fields))
+        x = (W - len(text) * 6 * max(1, round(g["hri"] / 7))) // 2
+        ops.append(("text", max(x, g["x"][0]), y + h + g["hri"] // 2, g["hri"], text))
+    return ops
+
+
+def label_ops(label: Label, page: str = "A6", dpi: int = 300) -> List[tuple]:
+    """Etiqueta completa: fondo de su plantilla + campos variables."""
+    return [*background_ops(*template_key(label), page, dpi), *field_ops(label, page, dpi)]
+
+
+# --- ráster 1 bit con NumPy ---
+
+_FONT_INDEX = {ch: i for i, ch in enumerate(_FONT_5X7)}
+
+
+@lru_cache(maxsize=16)
+def _atlas(scale: int) -> np.ndarray:
+    """Fuente escalada: (nº de caracteres, 7*scale, 6*scale), glifo 5x7 + columna de separación."""
+    rows = np.frombuffer(bytes.fromhex("".join(_FONT_5X7.values())), dtype=np.uint8).reshape(-1, 7)
+    bits = np.unpackbits(rows[:, :, None], axis=2)[:, :, 3:].astype(bool)
+    cells = np.zeros((len(rows), 7, 6), dtype=bool)
+    cells[:, :, :5] = bits
+    return cells.repeat(scale, axis=1).repeat(scale, axis=2)
+
+
+def _draw(ink: np.ndarray, ops: Iterable[tuple]) -> np.ndarray:
+    """Pinta las operaciones sobre la matriz booleana (alto, ancho); True = tinta."""
+    W = ink.shape[1]
+    for op in ops:
+        if op[0] == "rect":
+            _, x, y, w, h = op
+            ink[y:y + h, x:x + w] = True
+        elif op[0] == "bars":
+            _, x, y, h, m, values = op
+            row = np.repeat(np.concatenate([CODE128_MODULES[v] for v in values]), m)
+            ink[y:y + h, x:x + row.size] = row
+        else:
+            _, x, y, h, text = op
+            atlas = _atlas(max(1, round(h / 7)))
+            # texto entero de una vez: glifos del atlas puestos en fila
+            cells = atlas[[_FONT_INDEX.get(ch, _FONT_INDEX["?"]) for ch in text]]
+            block = cells.transpose(1, 0, 2).reshape(atlas.shape[1], -1)[:, :max(W - x, 0)]
+            ink[y:y + block.shape[0], x:x + block.shape[1]] |= block
+    return ink
+
+
+@lru_cache(maxsize=32)
+def background_ink(kind: str, on_pallet: bool, page: str = "A6", dpi: int = 300) -> np.ndarray:
+    """Fondo de la plantilla rasterizado una vez por proceso (solo lectura)."""
+    W, H = _geometry(page, dpi)["size"]
+    ink = _draw(np.zeros((H, W), dtype=bool), background_ops(kind, on_pallet, page, dpi))
+    ink.setflags(write=False)
+    return ink
+
+
+def raster_label(label: Label, page: str = "A6", dpi: int = 300) -> np.ndarray:
+    """Copia del fondo cacheado + solo los campos variables."""
+    ink = background_ink(*template_key(label), page, dpi).copy()
+    return _draw(ink, field_ops(label, page, dpi))
+
+
+def _idat(ink: np.ndarray) -> bytes:
+    """Filas PNG (byte de filtro 0 + 1 bit por píxel, 1 = blanco) comprimidas con zlib.
+    Vale tal cual como IDAT de PNG y como imagen PDF con /Predictor 15."""
+    rows = ~np.packbits(ink, axis=1)  # invertir ya empaquetado (8 veces menos bytes)
+    raw = np.hstack([np.zeros((ink.shape[0], 1), dtype=np.uint8), rows]).tobytes()
+    return zlib.compress(raw, PNG_COMPRESSION)
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def _png_file(idat: bytes, size: Tuple[int, int], dpi: int) -> bytes:
+    W, H = size
+    ppm = round(dpi / 0.0254)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", W, H, 1, 0, 0, 0, 0)),
+        _png_chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1)),
+        _png_chunk(b"IDAT", idat),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+def png_bytes(ink: np.ndarray, dpi: int = 300) -> bytes:
+    """Matriz de tinta -> PNG en escala de grises de 1 bit (con resolución en pHYs)."""
+    return _png_file(_idat(ink), (ink.shape[1], ink.shape[0]), dpi)
+
+
+# estado de los workers de rasterizado (página, dpi)
+_RASTER: Tuple[str, int] = ("A6", 300)
+
+
+def _init_raster(page: str, dpi: int) -> None:
+    global _RASTER
+    _RASTER = (page, dpi)
+    for kind in ("UX", "UE"):
+        for on_pallet in (False, True):
+            background_ink(kind, on_pallet, page, dpi)
+
+
+def _raster_chunk(labels: List[Label]) -> List[bytes]:
+    page, dpi = _RASTER
+    return [_idat(raster_label(label, page, dpi)) for label in labels]
+
+
+def _batches(labels: Iterable[Label], size: int) -> Iterator[List[Label]]:
+    it = iter(labels)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def raster_pages(labels: Iterable[Label], page: str = "A6", dpi: int = 300, workers: int | None = None,
+                 chunk: int = RASTER_CHUNK) -> Iterator[Tuple[Label, bytes]]:
+    """
+    Etiquetas -> (etiqueta, página comprimida de _idat) en el orden de entrada.
+    Con varios workers se rasteriza en un ProcessPoolExecutor por bloques de `chunk`
+    etiquetas, con como mucho RASTER_WINDOW bloques en vuelo por worker: la memoria
+    no depende del nº de etiquetas. Cada worker rasteriza los fondos una vez al arrancar.
+    """
+    _geometry(page, dpi)  # valida la página antes de arrancar el pool
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1:
+        for batch in _batches(labels, chunk):
+            yield from zip(batch, (_idat(raster_label(label, page, dpi)) for label in batch))
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_raster, initargs=(page, dpi)) as pool:
+        pending: deque = deque()
+        for batch in _batches(labels, chunk):
+            pending.append((batch, pool.submit(_raster_chunk, batch)))
+            if len(pending) >= workers * RASTER_WINDOW:
+                batch, fut = pending.popleft()
+                yield from zip(batch, fut.result())
+        while pending:
+            batch, fut = pending.popleft()
+            yield from zip(batch, fut.result())
+
+
+@profiled("labels.write_png")
+def write_labels_png(labels: Iterable[Label], out_dir: str | Path, page: str = "A6", dpi: int = 300,
+                     workers: int | None = 1) -> int:
+    """Un PNG por etiqueta en `out_dir` (NNNNN_<UX|UE>_<sscc>.png), rasterizado con raster_pages."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    size = _geometry(page, dpi)["size"]
+    n = 0
+    for n, (label, idat) in enumerate(raster_pages(labels, page, dpi, workers), start=1):
+        (out / f"{n:05d}_{label.kind}_{label.sscc}.png").write_bytes(_png_file(idat, size, dpi))
+    count("labels.png_files", n)
+    return n
+
+
+# --- PDF: páginas escritas según se generan ---
+
+def _pdf_glyph(widths: Tuple[int, ...]) -> bytes:
+    """Barras del símbolo en unidades de módulo (alto 1) y avance del origen tras él."""
+    x, parts = 0, []
+    for i, w in enumerate(widths):
+        if i % 2 == 0:
+            parts.append(f"{x} 0 {w} 1 re")
+        x += w
+    return (" ".join(parts) + f" f 1 0 0 1 {x} 0 cm\n").encode("ascii")
+
+
+# tabla de glifos PDF cacheada: un fragmento por valor de símbolo, encadenados con cm relativos
+_PDF_GLYPHS = tuple(_pdf_glyph(w) for w in CODE128_WIDTHS)
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_content(ops: Iterable[tuple], size: Tuple[int, int], dpi: int) -> bytes:
+    """Operaciones -> content stream PDF (puntos, origen abajo-izquierda)."""
+    k = 72.0 / dpi
+    page_h = size[1] * k
+    out = []
+    for op in ops:
+        if op[0] == "rect":
+            _, x, y, w, h = op
+            out.append(f"{x * k:.2f} {page_h - (y + h) * k:.2f} {w * k:.2f} {h * k:.2f} re f\n".encode("ascii"))
+        elif op[0] == "bars":
+            _, x, y, h, m, values = op
+            out.append(f"q {m * k:.4f} 0 0 {h * k:.2f} {x * k:.2f} {page_h - (y + h) * k:.2f} cm\n".encode("ascii"))
+            out.extend(_PDF_GLYPHS[v] for v in values)
+            out.append(b"Q\n")
+        else:
+            _, x, y, h, text = op
+            size_pt = h * k / _CAP_HEIGHT
+            out.append(f"BT /F1 {size_pt:.2f} Tf {x * k:.2f} {page_h - (y + h) * k:.2f} Td ({_pdf_text(text)}) Tj ET\n"
+                       .encode("ascii"))
+    return b"".join(out)
+
+
+class PdfLabelWriter:
+    """
+    PDF multipágina escrito en streaming: cada página va al fichero al añadirla y solo se
+    guardan los offsets (xref) y los nº de objeto de las páginas.
+    Objetos fijos: 1 catálogo, 2 árbol de páginas (se escribe al cerrar), 3 fuente.
+
+    add(): página vectorial; el fondo de cada plantilla es un Form XObject escrito una vez.
+    add_raster(): página ráster de raster_pages (imagen 1 bit, filas PNG con /Predictor 15).
+    """
+
+    def __init__(self, target: str | Path | BinaryIO, page: str = "A6", dpi: int = 300):
+        self.page, self.dpi = page, dpi
+        self.size = _geometry(page, dpi)["size"]
+        self._owns = isinstance(target, (str, Path))
+        if self._owns:
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(target, "wb")
+        else:
+            self._f = target
+        self._pos = 0
+        self._offsets = array("Q", [0, 0, 0, 0])
+        self._kids = array("Q")
+        self._forms: Dict[Tuple[str, bool], int] = {}
+        self.pages = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _write(self, data: bytes) -> None:
+        self._f.write(data)
+        self._pos += len(data)
+
+    def _obj(self, num: int | None, body: bytes) -> int:
+        if num is None:
+            num = len(self._offsets)
+            self._offsets.append(0)
+        self._offsets[num] = self._pos
+        self._write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+        return num
+
+    def _stream(self, dict_items: bytes, data: bytes) -> int:
+        return self._obj(None, b"<< %s /Length %d >>\nstream\n" % (dict_items, len(data)) + data + b"\nendstream")
+
+    def _page(self, resources: str, content: bytes) -> None:
+        contents = self._stream(b"/Filter /FlateDecode", zlib.compress(content))
+        w, h = (v * 72.0 / self.dpi for v in self.size)
+        self._kids.append(self._obj(None, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w:.2f} {h:.2f}] "
+            f"/Resources << {resources} >> /Contents {contents} 0 R >>").encode("ascii")))
+        self.pages += 1
+
+    def _form(self, key: Tuple[str, bool]) -> int:
+        num = self._forms.get(key)
+        if num is None:
+            w, h = (v * 72.0 / self.dpi for v in self.size)
+            data = zlib.compress(pdf_content(background_ops(*key, self.page, self.dpi), self.size, self.dpi))
+            num = self._forms[key] = self._stream(
+                f"/Type /XObject /Subtype /Form /BBox [0 0 {w:.2f} {h:.2f}] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Filter /FlateDecode".encode("ascii"), data)
+        return num
+
+    def add(self, label: Label) -> None:
+        form = self._form(template_key(label))
+        content = b"/T Do\n" + pdf_content(field_ops(label, self.page, self.dpi), self.size, self.dpi)
+        self._page(f"/Font << /F1 3 0 R >> /XObject << /T {form} 0 R >>", content)
+
+    def add_raster(self, idat: bytes) -> None:
+        W, H = self.size
+        image = self._stream((
+            f"/Type /XObject /Subtype /Image /Width {W} /Height {H} /ColorSpace /DeviceGray "
+            f"/BitsPerComponent 1 /Filter /FlateDecode "
+            f"/DecodeParms << /Predictor 15 /Colors 1 /BitsPerComponent 1 /Columns {W} >>").encode("ascii"), idat)
+        w, h = (v * 72.0 / self.dpi for v in self.size)
+        self._page(f"/XObject << /I {image} 0 R >>", f"q {w:.2f} 0 0 {h:.2f} 0 0 cm /I Do Q\n".encode("ascii"))
+
+    def close(self) -> None:
+        kids = " ".join(f"{k} 0 R" for k in self._kids)
+        self._obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {self.pages} >>".encode("ascii"))
+        xref = self._pos
+        n = len(self._offsets)
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % n)
+        self._write(b"".join(b"%010d 00000 n \n" % off for off in self._offsets[1:]))
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (n, xref))
+        if self._owns:
+            self._f.close()
+
+    def __enter__(self) -> "PdfLabelWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@profiled("labels.write_pdf")
+def write_labels_pdf(labels: Iterable[Label], target: str | Path | BinaryIO, page: str = "A6", dpi: int = 300,
+                     raster: bool = False, workers: int | None = 1) -> int:
+    """
+    Todas las etiquetas en un PDF multipágina (una por página); devuelve el nº de páginas.
+    raster=True: páginas rasterizadas a `dpi` en paralelo (raster_pages) y escritas en orden.
+    """
+    with PdfLabelWriter(target, page, dpi) as pdf:
+        if raster:
+            for _, idat in raster_pages(labels, page, dpi, workers):
+                pdf.add_raster(idat)
+        else:
+            for label in labels:
+                pdf.add(label)
+    count("labels.pdf_pages", pdf.pages)
+    return pdf.pages
+
+
+def write_labels(labels: Iterable[Label], out: str | Path, page: str = "A6", dpi: int = 300,
+                 raster: bool = False, workers: int | None = 1) -> int:
+    """.pdf -> un PDF multipágina (vectorial o ráster); cualquier otra ruta -> directorio con un PNG por etiqueta."""
+    if Path(out).suffix.lower() == ".pdf":
+        return write_labels_pdf(labels, out, page, dpi, raster, workers)
+    return write_labels_png(labels, out, page, dpi, workers)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+
+@pytest.fixture
+def make_cfg(tmp_path):
+    """Config DA con el contador SSCC en tmp_path: make_cfg("json" | "sqlite") -> ruta del YAML."""
+    def make(backend: str = "json") -> Path:
+        cfg = {
+            "arp_id": "154965",
+            "sscc": {"year_prefix": "26", "backend": backend, "state_path": str(tmp_path / "counters.json")},
+            "label": {"symbology": "GS1-128", "page": "A6", "dpi": 300},
+        }
+        path = tmp_path / f"config.{backend}.yaml"
+        path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+        return path
+    return make
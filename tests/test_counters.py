@@ -0,0 +1,68 @@
+from __future__ import annotations
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from src.core.counters import peek_value, reserve_block
+
+SIZES = [1, 3, 7, 2, 5] * 8
+
+
+def _reserve(args) -> list[int]:
+    kind, n, path, backend = args
+    return list(reserve_block(kind, n, path, backend))
+
+
+def _assert_contiguous(blocks: list[list[int]], start: int = 1) -> None:
+    # cada bloque es consecutivo y entre todos cubren la secuencia sin huecos ni repetidos
+    for b in blocks:
+        assert b == list(range(b[0], b[0] + len(b)))
+    seqs = sorted(s for b in blocks for s in b)
+    assert seqs == list(range(start, start + sum(len(b) for b in blocks)))
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_reserve_block_returns_consecutive_range(tmp_path, backend):
+    path = tmp_path / "counters.json"
+    assert reserve_block("UE", 3, path, backend) == range(1, 4)
+    assert reserve_block("UE", 0, path, backend) == range(0)
+    assert reserve_block("UE", 2, path, backend) == range(4, 6)
+    assert reserve_block("UX", 1, path, backend) == range(1, 2)
+    assert peek_value("UE", path, backend) == 5
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_reserve_block_rejects_bad_arguments(tmp_path, backend):
+    path = tmp_path / "counters.json"
+    with pytest.raises(ValueError):
+        reserve_block("XX", 1, path, backend)
+    with pytest.raises(ValueError):
+        reserve_block("UE", -1, path, backend)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_reserve_block_threads(tmp_path, backend):
+    path = tmp_path / "counters.json"
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        blocks = list(pool.map(_reserve, [("UE", n, path, backend) for n in SIZES]))
+    _assert_contiguous(blocks)
+    assert peek_value("UE", path, backend) == sum(SIZES)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_reserve_block_processes(tmp_path, backend):
+    path = tmp_path / "counters.json"
+    reserve_block("UX", 2, path, backend)  # conexión abierta en el padre antes del fork
+    ctx = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=4, mp_context=ctx) as pool:
+        blocks = list(pool.map(_reserve, [("UX", n, path, backend) for n in SIZES]))
+    _assert_contiguous(blocks, start=3)
+    assert peek_value("UX", path, backend) == 2 + sum(SIZES)
+
+
+def test_sqlite_continues_json_sequence(tmp_path):
+    path = tmp_path / "counters.json"
+    reserve_block("UE", 4, path, "json")
+    assert peek_value("UE", path, "sqlite") == 4
+    assert reserve_block("UE", 2, path, "sqlite") == range(5, 7)
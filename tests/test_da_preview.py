@@ -0,0 +1,58 @@
+from __future__ import annotations
+import time
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+from src.app.jobs import da_confirm_job, da_preview_job
+from src.core.counters import peek_value
+from src.core.counters import reserve_block as reserve_seqs
+from src.core.da_template import compile_template
+from src.core.sscc import make_sscc_many, validate_sscc_many
+from src.io.jobs import JobQueue
+from src.io.writers_da import DA_CSV_ENCODING, DA_CSV_SEP
+
+BASE = Path(__file__).resolve().parents[1]
+PO = BASE / "data" / "samples" / "po_sample.csv"
+TEMPLATE = BASE / "data" / "templates" / "DA_123_template.csv"
+
+
+def _wait(queue: JobQueue, job_id: str, timeout: float = 30.0):
+    t0 = time.monotonic()
+    while (job := queue.get(job_id)).active:
+        assert time.monotonic() - t0 < timeout, "el trabajo no termina"
+        time.sleep(0.02)
+    assert job.status == "done", job.error
+    return job
+
+
+def test_preview_then_confirm_writes_final_sscc(tmp_path, monkeypatch):
+    # la DA usa la config por defecto (ruta relativa): contador en tmp_path
+    monkeypatch.chdir(tmp_path)
+    state = tmp_path / "state" / "counters.json"
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.da.yaml").write_text(yaml.safe_dump(
+        {"arp_id": "154965", "sscc": {"year_prefix": "26", "backend": "json", "state_path": str(state)}}),
+        encoding="utf-8")
+    schema = compile_template(TEMPLATE)
+    queue = JobQueue(tmp_path / "jobs.sqlite", tmp_path / "out", workers=1)
+    try:
+        job = queue.submit("da_preview", da_preview_job, PO.read_bytes(), TEMPLATE)
+        _wait(queue, job)
+        da, preview = queue.result(job)
+        n = len(da)
+        provisional = da.to_frame()
+        assert n > 0 and validate_sscc_many(provisional[schema.ue_col]).all()
+        assert peek_value("UE", state) == 0 and peek_value("UX", state) == 0
+
+        reserve_seqs("UE", 2, state)  # otra reserva entre la vista previa y la confirmación
+        confirm = queue.submit("da_confirm", da_confirm_job, da, preview, TEMPLATE)
+        done = _wait(queue, confirm)
+    finally:
+        queue.shutdown()
+
+    out = pd.read_csv(done.artifacts["csv"], sep=DA_CSV_SEP, encoding=DA_CSV_ENCODING, dtype=str, keep_default_na=False)
+    assert out[schema.ue_col].tolist() == make_sscc_many("154965", range(3, 3 + n), "26").tolist()
+    assert out[schema.ux_col].tolist() == provisional[schema.ux_col].tolist()
+    assert peek_value("UE", state) == 2 + n and peek_value("UX", state) == n
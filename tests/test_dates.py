@@ -0,0 +1,52 @@
+from __future__ import annotations
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from src.io.dates import parse_dates
+
+T = pd.Timestamp
+
+
+def test_day_first_text():
+    s = pd.Series(["03/04/2024", "03/04/2024 15:45:46", "13/01/2024 08:05", "03-04-2024", "03.04.2024", "03/04/24"])
+    assert parse_dates(s, "navision").tolist() == [
+        T("2024-04-03"), T("2024-04-03 15:45:46"), T("2024-01-13 08:05"), T("2024-04-03"), T("2024-04-03"),
+        T("2024-04-03"),
+    ]
+
+
+def test_excel_serial_text_and_numbers():
+    assert parse_dates(pd.Series(["45000", "45000.5"]), "navision").tolist() == [T("2023-03-15"), T("2023-03-15 12:00")]
+    assert parse_dates(pd.Series([45000, 45000.25, None]), "navision").tolist() == [
+        T("2023-03-15"), T("2023-03-15 06:00"), pd.NaT,
+    ]
+
+
+def test_zoned_iso_keeps_local_wall_time():
+    s = pd.Series(["2024-03-31T10:00:00+02:00", "2024-03-31 08:00:00", "2024-10-27T10:00:00+01:00",
+                   "2024-03-31T10:00:00Z", "2024-03-31"])
+    out = parse_dates(s, "navision")
+    assert out.dt.tz is None
+    assert out.tolist() == [T("2024-03-31 10:00"), T("2024-03-31 08:00"), T("2024-10-27 10:00"), T("2024-03-31 10:00"),
+                            T("2024-03-31")]
+
+
+def test_zoned_datetimes_keep_local_wall_time():
+    tz = dt.timezone(dt.timedelta(hours=2))
+    s = pd.Series([dt.datetime(2024, 3, 31, 10, tzinfo=tz), dt.datetime(2024, 3, 31, 8)], dtype=object)
+    assert parse_dates(s, "navision").tolist() == [T("2024-03-31 10:00"), T("2024-03-31 08:00")]
+    aware = pd.Series(pd.to_datetime(["2024-03-31 10:00"]).tz_localize("Europe/Madrid"))
+    assert parse_dates(aware, "navision").tolist() == [T("2024-03-31 10:00")]
+
+
+def test_empty_and_unparsed_values():
+    out = parse_dates(pd.Series(["", None, "nan", "basura", "basura", "31/02/2024"]), "navision")
+    assert out.isna().all()
+    assert out.attrs["unparsed"] == {"basura": 2, "31/02/2024": 1}
+
+
+def test_unknown_source():
+    with pytest.raises(ValueError):
+        parse_dates(pd.Series(["01/01/2024"]), "otro")
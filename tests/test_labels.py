@@ -0,0 +1,72 @@
+from __future__ import annotations
+import math
+
+import pytest
+
+from src.core.labels import (CODE128_MODULES, CODE128_WIDTHS, FNC1, MIN_MODULE_MM, START_C, STOP, Label,
+                             encode_gs1_128, symbol_modules)
+from src.io.writers_labels import field_ops, raster_label
+
+
+def test_code128_patterns():
+    assert len(CODE128_WIDTHS) == 107
+    assert len(set(CODE128_WIDTHS)) == 107
+    for v, widths in enumerate(CODE128_WIDTHS[:STOP]):
+        assert len(widths) == 6 and sum(widths) == 11, v
+        assert CODE128_MODULES[v].size == 11 and CODE128_MODULES[v][0] and not CODE128_MODULES[v][-1]
+    assert CODE128_WIDTHS[STOP] == (2, 3, 3, 1, 1, 1, 2)
+    assert CODE128_WIDTHS[0] == (2, 1, 2, 2, 2, 2)
+    assert CODE128_WIDTHS[START_C] == (2, 1, 1, 2, 3, 2)
+    assert CODE128_WIDTHS[FNC1] == (4, 1, 1, 1, 3, 1)
+
+
+@pytest.mark.parametrize("fields, expected", [
+    ([("00", "123456789012345675")], (105, 102, 0, 12, 34, 56, 78, 90, 12, 34, 56, 75, 42, 106)),
+    ([("10", "AB")], (105, 102, 10, 100, 33, 34, 5, 106)),
+    # lote con cola numérica: un dígito en B y el resto en C
+    ([("17", "270131"), ("10", "AB12345")], (105, 102, 17, 27, 1, 31, 10, 100, 33, 34, 17, 99, 23, 45, 17, 106)),
+    # AI variable que no va al final: FNC1 de separación
+    ([("10", "AB"), ("17", "270131")], (105, 102, 10, 100, 33, 34, 102, 99, 17, 27, 1, 31, 83, 106)),
+])
+def test_encode_gs1_128_and_check_digit(fields, expected):
+    assert encode_gs1_128(fields) == expected
+    assert symbol_modules(expected) == 11 * (len(expected) - 1) + 13
+
+
+@pytest.mark.parametrize("fields", [[("00", "12345")], [("17", "2701")], [("10", "")], [("10", "X" * 21)]])
+def test_encode_gs1_128_rejects_bad_values(fields):
+    with pytest.raises(ValueError):
+        encode_gs1_128(fields)
+
+
+def _label(lote: str = "", exp: str = "") -> Label:
+    return Label("UE", "154965260000000017", "D5734000900000", "NAV-001", "Tornillo", 10.0, lote, exp, "")
+
+
+def _bars(label: Label, page: str = "A6", dpi: int = 300) -> list[tuple]:
+    return [op for op in field_ops(label, page, dpi) if op[0] == "bars"]
+
+
+@pytest.mark.parametrize("dpi", [203, 300, 600])
+@pytest.mark.parametrize("lote, exp", [("", ""), ("123456", "270131"), ("L2024-001", "270131")])
+def test_symbols_never_below_minimum_module(dpi, lote, exp):
+    low = math.ceil(MIN_MODULE_MM * dpi / 25.4)
+    bars = _bars(_label(lote, exp), dpi=dpi)
+    assert bars and all(m >= low for *_, m, _ in bars)
+    assert raster_label(_label(lote, exp), "A6", dpi).any()
+
+
+def test_long_lot_symbol_is_split_per_ai():
+    bars = _bars(_label("L2024-001", "270131"))
+    assert [codes for *_, codes in bars] == [encode_gs1_128([("17", "270131")]), encode_gs1_128([("10", "L2024-001")]),
+                                            encode_gs1_128([("00", "154965260000000017")])]
+    # apilados sin solaparse
+    (_, _, y0, h0, _, _), (_, _, y1, _, _, _) = bars[:2]
+    assert y1 > y0 + h0
+    # en A5 cabe en un solo símbolo
+    assert len(_bars(_label("L2024-001", "270131"), page="A5")) == 2
+
+
+def test_symbol_that_cannot_fit_raises():
+    with pytest.raises(ValueError, match="no cabe"):
+        field_ops(_label("ABCDEFGHIJKL", "270131"))
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.counters import peek_value
+from src.core.counters import reserve_block as reserve_seqs
+from src.core.sscc import (SSCCPreview, make_sscc, make_sscc_many, reserve_block, sscc_preview, validate_sscc,
+                           validate_sscc_many)
+
+
+@pytest.mark.parametrize("prefix", ["26", "", "2026"])
+def test_make_sscc_many_matches_scalar(prefix):
+    width = 10 - len(prefix)
+    seqs = [0, 1, 9, 10, 12345, 10**width - 1]
+    many = make_sscc_many("154965", seqs, prefix)
+    assert many.tolist() == [make_sscc("154965", s, prefix) for s in seqs]
+    assert make_sscc_many("154965", range(5, 9), prefix).tolist() == [make_sscc("154965", s, prefix) for s in range(5, 9)]
+
+
+def test_make_sscc_many_empty_and_errors():
+    assert make_sscc_many("154965", [], "26").tolist() == []
+    with pytest.raises(ValueError):
+        make_sscc_many("15496", [1], "26")
+    with pytest.raises(ValueError):
+        make_sscc_many("154965", [10**8], "26")
+    with pytest.raises(ValueError):
+        make_sscc_many("154965", [-1], "26")
+
+
+def test_validate_sscc_many_matches_scalar():
+    good = make_sscc("154965", 42, "26")
+    bad_check = good[:17] + str((int(good[17]) + 1) % 10)
+    values = [good, bad_check, f" {good} ", good[:17], good + "0", "A" + good[1:], "１" + good[1:], "", None, np.nan]
+    expected = [validate_sscc(v) for v in values]
+    assert validate_sscc_many(values).tolist() == expected
+    assert expected[:3] == [True, False, True]
+    s = pd.Series(values, index=range(10, 20), dtype=object)
+    out = validate_sscc_many(s)
+    assert out.index.equals(s.index) and out.tolist() == expected
+
+
+def test_preview_does_not_consume_sequences(make_cfg, tmp_path):
+    cfg = make_cfg("json")
+    state = tmp_path / "counters.json"
+    reserve_seqs("UE", 5, state)
+    with sscc_preview() as preview:
+        first = reserve_block("UE", 3, cfg)
+        second = reserve_block("UE", 2, cfg)
+    assert first == make_sscc_many("154965", range(6, 9), "26").tolist()
+    assert second == make_sscc_many("154965", range(9, 11), "26").tolist()
+    assert peek_value("UE", state) == 5
+    # misma entrada y mismo contador -> mismos SSCC provisionales
+    with sscc_preview():
+        assert reserve_block("UE", 3, cfg) == first
+    assert preview.used == {"UE": 5}
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_preview_commit_finalize(make_cfg, tmp_path, backend):
+    cfg = make_cfg(backend)
+    state = tmp_path / "counters.json"
+    with sscc_preview() as preview:
+        ue = reserve_block("UE", 3, cfg)
+        ux = reserve_block("UX", 1, cfg)
+    table = pd.DataFrame({"UE": ue, "UX": ux * 3, "otro": ["", "x", ""]})
+
+    blocks = preview.commit()
+    assert blocks == {"UE": range(1, 4), "UX": range(1, 2)}
+    assert preview.commit() is blocks  # una sola reserva
+    assert peek_value("UE", state, backend) == 3
+    # nadie reservó entre medias: los definitivos son los provisionales
+    preview.finalize_table(table, {"UE": "UE", "UX": "UX", "falta": "UE"})
+    assert table["UE"].tolist() == ue and table["UX"].tolist() == ux * 3
+    with pytest.raises(ValueError):
+        preview.allocate("UE", 1, cfg)
+
+
+def test_finalize_rewrites_when_counter_moved(make_cfg, tmp_path):
+    cfg = make_cfg("json")
+    state = tmp_path / "counters.json"
+    with sscc_preview() as preview:
+        ue = reserve_block("UE", 3, cfg)
+    reserve_seqs("UE", 10, state)  # otra reserva antes de confirmar
+    final = preview.finalize(ue + ["", "999"], "UE")
+    assert final.tolist() == make_sscc_many("154965", range(11, 14), "26").tolist() + ["", "999"]
+    assert peek_value("UE", state) == 13
+    assert preview.finalize("texto", "UE") == "texto"
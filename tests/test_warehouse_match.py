@@ -0,0 +1,79 @@
+from __future__ import annotations
+import pandas as pd
+import pytest
+
+from src.core import warehouse_match as wm
+from src.io.warehouse_store import WarehouseStore
+
+
+@pytest.fixture(autouse=True)
+def _no_event_log(monkeypatch):
+    monkeypatch.setattr(wm, "_log_event", lambda event: None)
+    monkeypatch.setattr(wm, "flush_log", lambda: None)
+
+
+def _inputs():
+    po = pd.DataFrame({
+        "PO": ["P1"] * 6,
+        "Item Number": ["A", "B", "C", "X", "A", "D"],
+        "Requested quantity": ["5", "2,5", "", "1", "50", "1"],
+    })
+    mp = pd.DataFrame({"Codigo_SAP_ItemNumber": ["A", "B", "C", "D"], "Codigo_Navision": ["N1", "N2", "N3", "N4"]})
+    wh = pd.DataFrame({
+        "Nº mov.": [5, 9, 7, 3, 4, 8, 6],
+        "Tipo documento": ["Albarán venta", "Albarán venta", "Albarán venta", "Venta", "Compra", "Albarán venta", "Venta"],
+        "Nº documento": ["A5", "A9", "A7", "A3", "C4", "A8", "A6"],
+        "PN GECI": ["N1", "N1", "N1", "N2", "N3", "N3", "N4"],
+        "Nº lote": ["L5", "L9", "L7", "L3", "L4", "L8", "L6"],
+        "Cantidad": ["10", "10", "10", "", "10", "1", "3"],
+        "Fecha registro": ["01/02/2024 10:00:00", "01/02/2024 10:00:00", "01/02/2024 10:00:00", "", "05/02/2024",
+                           "03/02/2024", "02/02/2024"],
+    })
+    return po, mp, wh
+
+
+def test_match_statuses_and_ties():
+    po, mp, wh = _inputs()
+    res = wm.match_po_to_warehouse(po, mp, wh)
+    assert res["PO Line"].tolist() == [1, 2, 3, 4, 5, 6]
+    # empate en la fecha -> mayor Nº mov.
+    assert res.loc[res["Item Number"] == "A", "Lot"].tolist() == ["L9", "L9"]
+    assert res["match_status"].tolist() == ["ok", "ok", "ok", "no_mapping", "qty_warning", "ok"]
+    # sin mapping: Codigo_Navision vacío; cantidad PO vacía -> 0; stock sin cantidad no avisa
+    assert res.loc[3, "Codigo_Navision"] == ""
+    assert res["Shipped Quantity"].tolist() == [5.0, 2.5, 0.0, 1.0, 50.0, 1.0]
+    assert res.loc[1, "Lot"] == "L3"
+    # la compra no cuenta como venta
+    assert res.loc[2, "Lot"] == "L8"
+
+
+def test_ties_without_entry_number_keep_file_order():
+    po, mp, wh = _inputs()
+    res = wm.match_po_to_warehouse(po, mp, wh.drop(columns="Nº mov."))
+    assert res.loc[0, "Lot"] == "L5"
+
+
+def test_store_matches_dataframe(tmp_path):
+    po, mp, wh = _inputs()
+    ref = wm.match_po_to_warehouse(po, mp, wh)
+    store = WarehouseStore(tmp_path / "warehouse.sqlite")
+    assert store.ingest(wh) == len(wh)
+    assert store.ingest(wh) == 0
+    pd.testing.assert_frame_equal(wm.match_po_to_warehouse(po, mp, store), ref)
+
+
+def test_header_aliases_resolve_like_canonical_names():
+    po, mp, wh = _inputs()
+    ref = wm.match_po_to_warehouse(po, mp, wh)
+    renamed = wh.rename(columns={"Tipo documento": "Tipo documento ", "Nº documento": "Albarán", "PN GECI": "Nº producto",
+                                 "Nº lote": "Lote", "Cantidad": "Qty", "Fecha registro": "Posting Date"})
+    po2 = po.rename(columns={"PO": "PO Number", "Item Number": "Material Number", "Requested quantity": "Quantity"})
+    pd.testing.assert_frame_equal(wm.match_po_to_warehouse(po2, mp, renamed), ref)
+
+
+def test_missing_warehouse_columns(tmp_path):
+    po, mp, wh = _inputs()
+    with pytest.raises(ValueError, match="Warehouse: columnas requeridas"):
+        wm.match_po_to_warehouse(po, mp, wh.drop(columns="Nº lote"))
+    with pytest.raises(ValueError, match="Warehouse: columnas requeridas"):
+        WarehouseStore(tmp_path / "w.sqlite").ingest(wh.drop(columns="Tipo documento"))